@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Benchmark the rendering pipeline on a small deterministic scene.
+#
+# Runs rendering.py headless with a fixed seed, low resolution, few samples and the
+# CPU device, then reports per-stage wall time, peak RSS and frames/hour as JSON.
+# With --baseline the result is compared against a stored report and the exit
+# status is 1 if any stage, the peak RSS or the throughput regressed.
+#
+# Example:
+#   python benchmark.py --save-baseline bench_baseline.json
+#   python benchmark.py --baseline bench_baseline.json
+#
+# With --exr-sweep the same scene is rendered once per EXR output format and the
+# report lists bytes per frame and write cost for each, smallest first:
+#   python benchmark.py --exr-sweep -- --passes diffuse_indirect,glossy_indirect
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Default EXR formats compared by --exr-sweep (codec:bits per channel)
+SWEEP_FORMATS = ["NONE:32", "ZIP:32", "PIZ:32", "ZIP:16", "PIZ:16", "DWAA:16"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark scene setup and per-frame render cost")
+    parser.add_argument("--blender", default="blender", help="Blender executable")
+    parser.add_argument("--script", default=os.path.join(SCRIPT_DIR, "rendering.py"), help="Rendering script")
+    parser.add_argument("--seed", type=int, default=0, help="Scene seed")
+    parser.add_argument("--frames", type=int, default=4, help="Number of frames to render")
+    parser.add_argument("--resolution", default="128x128", help="Render resolution as WIDTHxHEIGHT")
+    parser.add_argument("--samples", type=int, default=16, help="Samples per pixel")
+    parser.add_argument("--device", default="CPU", help="Cycles device passed as --cycles-device")
+    parser.add_argument("--repeat", type=int, default=1, help="Run several times and keep the fastest time per stage")
+    parser.add_argument("--output", default=None, help="Write the report to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Compare against this stored report")
+    parser.add_argument("--save-baseline", default=None, help="Store the report as a baseline at this path")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown before a stage counts as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Ignore stage differences smaller than this many seconds")
+    parser.add_argument("--exr-sweep", action="store_true",
+                        help="Compare EXR output formats instead of checking for regressions")
+    parser.add_argument("--sweep-formats", default=",".join(SWEEP_FORMATS),
+                        help="Comma-separated CODEC:BITS formats for --exr-sweep, e.g. ZIP:32,DWAA:16")
+    parser.add_argument("extra", nargs=argparse.REMAINDER,
+                        help="Extra arguments for rendering.py, given after '--'")
+    return parser.parse_args()
+
+
+def child_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# Render the benchmark scene once and return the stats written by rendering.py
+def run_once(options, work_dir, format_args=()):
+    stats_path = os.path.join(work_dir, "stats.json")
+    extra = options.extra[1:] if options.extra[:1] == ["--"] else options.extra
+    command = [
+        options.blender, "--background", "--factory-startup", "--python", options.script, "--",
+        "--seed", str(options.seed),
+        "--total-frames", str(options.frames),
+        "--frames-per-folder", str(options.frames),
+        "--output-dir", os.path.join(work_dir, "nlos_dataset"),
+        "--render-profile", "preview",
+        "--samples", str(options.samples),
+        "--resolution", options.resolution,
+        "--cycles-device", options.device,
+        "--no-scene-cache",
+        "--stats-json", stats_path,
+    ] + list(format_args) + extra
+
+    start = time.perf_counter()
+    log_path = os.path.join(work_dir, "blender.log")
+    with open(log_path, 'w') as log_file:
+        returncode = subprocess.call(command, stdout=log_file, stderr=subprocess.STDOUT)
+    wall_seconds = time.perf_counter() - start
+    if returncode != 0 or not os.path.exists(stats_path):
+        with open(log_path, 'r') as log_file:
+            sys.stderr.write(log_file.read()[-4000:])
+        raise Exception(f"Benchmark run failed with exit code {returncode}")
+
+    with open(stats_path, 'r') as stats_file:
+        stats = json.load(stats_file)
+    stats["process_wall_seconds"] = round(wall_seconds, 4)
+    return stats
+
+
+# Keep the fastest time per stage and the best throughput across repeated runs
+def combine_runs(runs):
+    report = dict(runs[0])
+    report["stages"] = {}
+    for name in runs[0]["stages"]:
+        report["stages"][name] = min((run["stages"][name] for run in runs if name in run["stages"]),
+                                     key=lambda entry: entry["seconds"])
+    report["frames_per_hour"] = max(run["frames_per_hour"] for run in runs)
+    report["process_wall_seconds"] = min(run["process_wall_seconds"] for run in runs)
+    report["repeat"] = len(runs)
+    return report
+
+
+# List every stage, peak RSS or throughput figure that is worse than the baseline beyond the tolerance
+def find_regressions(report, baseline, tolerance, min_seconds):
+    regressions = []
+    for name, entry in report["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        if entry["seconds"] > base["seconds"] * (1 + tolerance) and entry["seconds"] - base["seconds"] > min_seconds:
+            regressions.append(f"stage {name}: {entry['seconds']:.3f}s vs baseline {base['seconds']:.3f}s")
+    if report["frames_per_hour"] < baseline["frames_per_hour"] / (1 + tolerance):
+        regressions.append(f"frames/hour: {report['frames_per_hour']:.1f} vs baseline {baseline['frames_per_hour']:.1f}")
+    if report.get("peak_rss_mb") and baseline.get("peak_rss_mb") and \
+            report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS: {report['peak_rss_mb']:.1f} MB vs baseline {baseline['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def run_repeated(options, format_args=()):
+    runs = []
+    for _ in range(options.repeat):
+        work_dir = tempfile.mkdtemp(prefix="nlos_bench_")
+        try:
+            runs.append(run_once(options, work_dir, format_args))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return combine_runs(runs)
+
+
+def stage_seconds_per_frame(report, name):
+    entry = report["stages"].get(name)
+    return round(entry["seconds"] / entry["count"], 4) if entry and entry["count"] else 0.0
+
+
+# Render once per EXR format and report size and write cost per frame, smallest first
+def exr_sweep(options):
+    results = []
+    for spec in options.sweep_formats.split(","):
+        codec, bits = spec.strip().upper().split(":")
+        format_args = ["--exr-codec", codec] + (["--exr-half"] if bits == "16" else [])
+        report = run_repeated(options, format_args)
+        results.append({
+            "format": f"{codec}:{bits}",
+            "bytes_per_frame": report["bytes_per_frame"],
+            "exr_write_seconds_per_frame": stage_seconds_per_frame(report, "exr_write"),
+            "output_write_seconds_per_frame": stage_seconds_per_frame(report, "output_write"),
+            "frames_per_hour": report["frames_per_hour"],
+            "output_format": report["output_format"],
+        })
+    results.sort(key=lambda result: result["bytes_per_frame"])
+
+    print(f"{'format':<10} {'bytes/frame':>12} {'exr write s':>12} {'output write s':>15} {'frames/hour':>12}")
+    for result in results:
+        print(f"{result['format']:<10} {result['bytes_per_frame']:>12} {result['exr_write_seconds_per_frame']:>12.4f} "
+              f"{result['output_write_seconds_per_frame']:>15.4f} {result['frames_per_hour']:>12.1f}")
+    return {"exr_sweep": results, "resolution": options.resolution, "samples": options.samples, "seed": options.seed}
+
+
+def main():
+    options = parse_args()
+    if options.exr_sweep:
+        report = exr_sweep(options)
+        if options.output:
+            with open(options.output, 'w') as f:
+                json.dump(report, f, indent=4)
+        return
+
+    report = run_repeated(options)
+    report["child_peak_rss_mb"] = child_peak_rss_mb()
+    print(json.dumps(report, indent=4))
+
+    for path in (options.output, options.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=4)
+
+    if options.baseline:
+        with open(options.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, options.tolerance, options.min_seconds)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
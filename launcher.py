@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from nlos.pose_sink import merge_pose_files
+
+
+# Launch several headless Blender workers that each build the same seeded scene
+# and render a contiguous share of the frames into one nlos_dataset layout.
+#
+# With --scenes the workers instead split a list of scene variants: scene i uses seed
+# seed+i and folder starting-folder-number+i, and each worker renders its scenes in one
+# Blender process (rendering.py --num-scenes).
+#
+# Example:
+#   python launcher.py --seed 1234 --total-frames 1000 --workers 4
+#   python launcher.py --seed 1234 --scenes 100 --workers 4
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Render the NLOS dataset with several Blender worker processes")
+    parser.add_argument("--seed", type=int, required=True, help="Scene seed shared by every worker")
+    parser.add_argument("--total-frames", type=int, default=None,
+                        help="Total number of frames to render (frames per scene with --scenes)")
+    parser.add_argument("--scenes", type=int, default=None,
+                        help="Render this many scene variants, split across the workers")
+    parser.add_argument("--workers", type=int, required=True, help="Number of Blender worker processes")
+    parser.add_argument("--blender", default="blender", help="Blender executable")
+    parser.add_argument("--script", default=os.path.join(SCRIPT_DIR, "rendering.py"), help="Rendering script")
+    parser.add_argument("--output-dir", default="nlos_dataset/", help="Base output directory")
+    parser.add_argument("--frames-per-folder", type=int, default=1000, help="Number of frames per seq_NNNN folder")
+    parser.add_argument("--starting-folder-number", type=int, default=5, help="Folder number of the first sequence")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Render threads per worker (defaults to an equal share of the available CPUs)")
+    parser.add_argument("--no-pin", action="store_true", help="Do not pin workers to disjoint CPU sets")
+    parser.add_argument("--resume", action="store_true", help="Pass --resume to every worker")
+    parser.add_argument("extra", nargs=argparse.REMAINDER,
+                        help="Extra arguments for rendering.py, given after '--'")
+    options = parser.parse_args()
+    if options.total_frames is None and options.scenes is None:
+        parser.error("--total-frames is required unless --scenes is given")
+    return options
+
+
+# Split frames 1..total_frames into contiguous, nearly equal ranges
+def split_frames(total_frames, workers):
+    ranges = []
+    start = 1
+    for worker_id in range(workers):
+        count = total_frames // workers + (1 if worker_id < total_frames % workers else 0)
+        if count > 0:
+            ranges.append((start, start + count - 1))
+        start += count
+    return ranges
+
+
+# Split the available CPUs into disjoint sets, one per worker
+def split_cpus(workers):
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cpus) // workers)
+    return [cpus[(i * per_worker) % len(cpus):(i * per_worker) % len(cpus) + per_worker] for i in range(workers)]
+
+
+# Arguments shared by the cache warm-up run and every worker, so they all resolve the same scene
+def scene_arguments(options, first_scene=0):
+    extra = options.extra[1:] if options.extra[:1] == ["--"] else options.extra
+    return [
+        "--seed", str(options.seed + first_scene),
+        "--output-dir", options.output_dir,
+        "--frames-per-folder", str(options.frames_per_folder),
+        "--starting-folder-number", str(options.starting_folder_number + first_scene),
+        "--total-frames", str(options.total_frames or options.frames_per_folder),
+    ] + extra
+
+
+# Build the scene once and write the .blend cache before the workers start, so they all load it
+def warm_scene_cache(options, log_path):
+    command = [options.blender, "--background", "--python-exit-code", "1", "--python", options.script, "--",
+               "--build-only"] + scene_arguments(options)
+    print(f"Building scene cache, log {log_path}")
+    with open(log_path, 'w') as log_file:
+        if subprocess.call(command, stdout=log_file, stderr=subprocess.STDOUT) != 0:
+            raise Exception(f"Scene build failed, see {log_path}")
+
+
+# frame_range is a range of frames, or of 1-based scene numbers with --scenes
+def start_worker(options, worker_id, frame_range, cpus, log_path):
+    threads = options.threads or len(cpus)
+    if options.scenes:
+        share = scene_arguments(options, frame_range[0] - 1) + [
+            "--num-scenes", str(frame_range[1] - frame_range[0] + 1),
+        ]
+    else:
+        share = scene_arguments(options) + [
+            "--frame-start", str(frame_range[0]),
+            "--frame-end", str(frame_range[1]),
+        ]
+    command = [
+        options.blender, "--background", "--threads", str(threads), "--python-exit-code", "1",
+        "--python", options.script, "--",
+    ] + share + [
+        "--worker-id", str(worker_id),
+    ] + (["--resume"] if options.resume else [])
+
+    # Pin the worker to its CPU set so workers do not compete for cores
+    preexec_fn = None
+    if not options.no_pin and hasattr(os, "sched_setaffinity"):
+        preexec_fn = lambda: os.sched_setaffinity(0, cpus)
+
+    log_file = open(log_path, 'w')
+    unit = "scenes" if options.scenes else "frames"
+    print(f"Worker {worker_id}: {unit} {frame_range[0]}-{frame_range[1]}, {threads} threads, log {log_path}")
+    process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT, preexec_fn=preexec_fn)
+    return process, log_file
+
+
+# Merge the per-worker manifests and timing logs of one sequence into manifest.json / render_timing.jsonl
+def merge_sequence(sequence_path):
+    names = os.listdir(sequence_path)
+    worker_manifests = sorted(name for name in names if name.startswith("manifest.worker") and name.endswith(".json"))
+    worker_logs = sorted(name for name in names if name.startswith("render_timing.worker") and name.endswith(".jsonl"))
+
+    merged_path = os.path.join(sequence_path, "manifest.json")
+    merged = None
+    if os.path.exists(merged_path):
+        with open(merged_path, 'r') as f:
+            merged = json.load(f)
+
+    new_frames = 0
+    for name in worker_manifests:
+        with open(os.path.join(sequence_path, name), 'r') as f:
+            manifest = json.load(f)
+        if merged is None:
+            merged = {key: value for key, value in manifest.items() if key != "frames"}
+            merged["frames"] = {}
+        elif manifest["seed"] != merged["seed"]:
+            raise Exception(f"{name} in {sequence_path} was rendered with seed {manifest['seed']}, not {merged['seed']}.")
+        new_frames += len(manifest["frames"])
+        merged["frames"].update(manifest["frames"])
+
+    # Multi-camera sequence roots hold only timing logs and pose files, no manifests
+    if merged is not None:
+        merged["frames"] = dict(sorted(merged["frames"].items(), key=lambda item: int(item[0])))
+        tmp_path = merged_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(merged, f, indent=4)
+        os.replace(tmp_path, merged_path)
+
+    # Append the worker timing lines to the sequence log in frame order
+    lines = []
+    for name in worker_logs:
+        with open(os.path.join(sequence_path, name), 'r') as f:
+            lines.extend(line for line in f if line.strip())
+    if lines:
+        lines.sort(key=lambda line: json.loads(line)["frame"])
+        with open(os.path.join(sequence_path, "render_timing.jsonl"), 'a') as f:
+            f.writelines(lines)
+
+    for name in worker_manifests + worker_logs:
+        os.remove(os.path.join(sequence_path, name))
+
+    # Combine the per-worker pose files into poses.npz
+    merge_pose_files(sequence_path)
+    return new_frames
+
+
+def merge_outputs(output_dir):
+    rendered = 0
+    for name in sorted(os.listdir(output_dir)):
+        sequence_path = os.path.join(output_dir, name)
+        if name.startswith("seq_") and os.path.isdir(sequence_path):
+            # Multi-camera runs keep one manifest per camera subfolder; count each frame once
+            view_frames = [merge_sequence(os.path.join(sequence_path, view)) for view in sorted(os.listdir(sequence_path))
+                           if os.path.isdir(os.path.join(sequence_path, view))]
+            rendered += merge_sequence(sequence_path) + max(view_frames, default=0)
+    return rendered
+
+
+def main():
+    options = parse_args()
+    output_dir = os.path.abspath(options.output_dir)
+    log_dir = os.path.join(output_dir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    frame_ranges = split_frames(options.scenes or options.total_frames, options.workers)
+    cpu_sets = split_cpus(len(frame_ranges))
+
+    # Scene workers each build different scenes, so there is no shared cache to warm
+    start_time = time.time()
+    if not options.scenes:
+        warm_scene_cache(options, os.path.join(log_dir, "scene_build.log"))
+
+    workers = []
+    for worker_id, frame_range in enumerate(frame_ranges):
+        log_path = os.path.join(log_dir, f"worker_{worker_id:02d}.log")
+        workers.append(start_worker(options, worker_id, frame_range, cpu_sets[worker_id], log_path))
+
+    failed = []
+    for worker_id, (process, log_file) in enumerate(workers):
+        if process.wait() != 0:
+            failed.append(worker_id)
+        log_file.close()
+    elapsed = time.time() - start_time
+
+    rendered = merge_outputs(output_dir)
+    report = {
+        "seed": options.seed,
+        "scenes": options.scenes,
+        "workers": len(frame_ranges),
+        "frames_rendered": rendered,
+        "wall_seconds": round(elapsed, 2),
+        "frames_per_hour": round(rendered / elapsed * 3600, 2) if elapsed > 0 else 0.0,
+        "failed_workers": failed,
+    }
+    print(json.dumps(report, indent=4))
+    with open(os.path.join(log_dir, "launch_report.json"), 'w') as f:
+        json.dump(report, f, indent=4)
+
+    if failed:
+        print(f"Workers {failed} failed; rerun with --resume to finish their frames.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# Headless layer of the NLOS dataset renderer: everything that does not need Blender.
+#
+#   scene_spec       seed + config -> fully resolved scene description (JSON)
+#   placement        collision-free placement of floor objects
+#   trajectory       flying drone waypoints, validation and per-frame path
+#   poses            world-space pose math (Euler, quaternions, parent chains)
+#   pose_sink        columnar pose storage (poses.npz)
+#   instrumentation  event log, throughput tracker, stall watchdog
+#   output_writer    off-loop EXR/JSON writer process
+#   layout           where a run's per-scene files go and which worker writes them
+#
+# The modules use only the standard library and NumPy, import without side effects and
+# can be used and tested in plain CPython. rendering.py is the thin bpy layer on top.
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+
+# Instrumentation for long render jobs: a JSON-lines event log, a rolling
+# throughput/ETA tracker, a stall watchdog and a parser for Cycles render stats.
+# Nothing here needs Blender.
+
+
+class EventLog:
+    # Appends one JSON object per line: {"time": <unix seconds>, "event": <name>, ...fields}
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a')
+
+    def emit(self, event, **fields):
+        line = json.dumps({"time": round(time.time(), 3), "event": event, **fields})
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class ThroughputTracker:
+    # Rolling frames/hour and ETA over the last `window` frames
+    def __init__(self, frames_total, window=20):
+        self.frames_total = frames_total
+        self.window = window
+        self.frames_done = 0
+        self.recent = []
+        self.start_time = time.perf_counter()
+
+    def add(self, frame_seconds):
+        self.frames_done += 1
+        self.recent = (self.recent + [frame_seconds])[-self.window:]
+        return self.summary()
+
+    def summary(self):
+        mean_seconds = sum(self.recent) / len(self.recent) if self.recent else 0.0
+        remaining = max(self.frames_total - self.frames_done, 0)
+        return {
+            "frames_done": self.frames_done,
+            "frames_total": self.frames_total,
+            "mean_frame_seconds": round(mean_seconds, 3),
+            "median_frame_seconds": round(statistics.median(self.recent), 3) if self.recent else 0.0,
+            "frames_per_hour": round(3600 / mean_seconds, 2) if mean_seconds > 0 else 0.0,
+            "eta_seconds": round(remaining * mean_seconds, 1),
+            "elapsed_seconds": round(time.perf_counter() - self.start_time, 1),
+        }
+
+
+# Shortest interval between two reads of the event log by the stall watchdog
+MIN_POLL_SECONDS = 0.05
+
+
+class StallWatchdog:
+    # Emits a "stall" event when the event log shows no activity for stall_seconds.
+    # The render operator holds Blender's interpreter for the whole render, so the check
+    # runs in a child Python process that tails the event log (see watch_event_log) and
+    # still fires while a render hangs. heartbeat() logs the frame being worked on;
+    # closing the child's stdin stops it, also when Blender dies. stall_seconds <= 0
+    # disables the watchdog.
+    def __init__(self, event_log, stall_seconds, poll_seconds=5.0, python=sys.executable):
+        self.event_log = event_log
+        self.process = None
+        if stall_seconds > 0:
+            poll_seconds = max(min(poll_seconds, stall_seconds), MIN_POLL_SECONDS)
+            self.process = subprocess.Popen([python, os.path.abspath(__file__), event_log.path,
+                                             str(stall_seconds), str(poll_seconds)], stdin=subprocess.PIPE)
+
+    def heartbeat(self, **context):
+        if self.process is not None:
+            self.event_log.emit("heartbeat", **context)
+
+    def stop(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+# Tail the event log at path and append a "stall" event once whenever no new line arrives for
+# stall_seconds; the context of the last "heartbeat" is included. Returns when stopped is set.
+def watch_event_log(path, stall_seconds, poll_seconds, stopped):
+    event_log = EventLog(path)
+    last_beat = time.monotonic()
+    context = {}
+    reported = False
+    with open(path, 'r') as f:
+        f.seek(0, os.SEEK_END)
+        pending = ""
+        while not stopped.wait(poll_seconds):
+            pending += f.read()
+            lines = pending.split("\n")
+            pending = lines.pop()  # Partial line still being written
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("event") == "stall":
+                    continue
+                last_beat = time.monotonic()
+                reported = False
+                if entry.get("event") == "heartbeat":
+                    context = {key: value for key, value in entry.items() if key not in ("time", "event")}
+            idle = time.monotonic() - last_beat
+            if idle > stall_seconds and not reported:
+                reported = True
+                event_log.emit("stall", idle_seconds=round(idle, 1), **context)
+    event_log.close()
+
+
+# Memory and sample counts from a Cycles stats line, e.g.
+# "Fra:1 Mem:120.00M (Peak 140.00M) | Time:00:03.12 | Mem:80.10M, Peak:95.20M | Scene | Sample 512/1024"
+STATS_MEMORY = re.compile(r"Mem:\s*([\d.]+)M,\s*Peak:\s*([\d.]+)M")
+STATS_SAMPLES = re.compile(r"Sample\s+(\d+)/(\d+)")
+
+
+def parse_render_stats(text):
+    stats = {}
+    memory = STATS_MEMORY.search(text)
+    if memory:
+        stats["cycles_mem_mb"] = float(memory.group(1))
+        stats["cycles_peak_mem_mb"] = float(memory.group(2))
+    samples = STATS_SAMPLES.search(text)
+    if samples:
+        stats["samples"] = int(samples.group(1))
+        stats["samples_total"] = int(samples.group(2))
+    return stats
+
+
+# Child process of StallWatchdog: watch the event log until stdin closes
+def main():
+    path, stall_seconds, poll_seconds = sys.argv[1], float(sys.argv[2]), float(sys.argv[3])
+    stopped = threading.Event()
+    reader = threading.Thread(target=lambda: (sys.stdin.read(), stopped.set()), daemon=True)
+    reader.start()
+    watch_event_log(path, stall_seconds, poll_seconds, stopped)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import os
+
+
+# Output layout of a render run: where the per-scene files go and which process writes them.
+#
+# A run is frame-sharded when it renders only part of the animation (--frame-start/--frame-end,
+# as launcher.py passes to every worker of one scene), and scene-sharded when it renders whole
+# scenes of a larger set (--num-scenes, or a launcher --scenes worker given a single scene).
+# Scene-sharded runs keep scene_spec.json and flying_drone_trajectory.npz in each scene's
+# seq_NNNN folder; a single plain run keeps them in the base output directory.
+
+
+def sequence_dir(base_output_dir, folder_number):
+    return os.path.join(base_output_dir, f"seq_{folder_number:04d}")
+
+
+def is_frame_sharded(frame_start, frame_end):
+    return frame_start is not None or frame_end is not None
+
+
+def is_scene_sharded(num_scenes, worker_id, frame_start, frame_end):
+    return (num_scenes > 1 or worker_id is not None) and not is_frame_sharded(frame_start, frame_end)
+
+
+# Directory for the per-scene files of the scene rendered into folder_number
+def scene_files_dir(base_output_dir, folder_number, num_scenes, worker_id, frame_start, frame_end):
+    if is_scene_sharded(num_scenes, worker_id, frame_start, frame_end):
+        return sequence_dir(base_output_dir, folder_number)
+    return base_output_dir
+
+
+# Frame-sharded workers all render the same scene, so only worker 0 writes its per-scene files
+def writes_scene_files(worker_id, frame_start, frame_end):
+    return not is_frame_sharded(frame_start, frame_end) or worker_id in (None, 0)
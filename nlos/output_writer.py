@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+
+# Output stage for finished frames, run off the render loop.
+#
+# Blender encodes each EXR into a local scratch directory; the writer then copies it
+# to its final place in the dataset (hashing it in the same pass), writes the optional
+# per-frame JSON, fsyncs and renames into place. OutputWriter runs the jobs in a child
+# Python process, so slow or network storage never blocks the next render; at most
+# max_pending frames are in flight, which caps scratch space and memory.
+#
+# A job is a dict:
+#   source       EXR written by Blender (may equal destination, then it is only hashed)
+#   destination  final EXR path
+#   json_path    optional path of a JSON file to write with json_data
+#   json_data    optional metadata for json_path
+#   fsync        flush files and directories to stable storage
+#   entry        manifest entry, returned with "size" and "sha256" filled in
+# Any other keys (frame, folder) are passed through to the acknowledgement.
+
+CHUNK_SIZE = 1 << 20
+
+# Directories known to exist in this process, so makedirs runs once per directory
+created_dirs = set()
+
+
+def ensure_dir(path):
+    if path not in created_dirs:
+        os.makedirs(path, exist_ok=True)
+        created_dirs.add(path)
+
+
+def fsync_dir(path):
+    # Directory fsync makes the rename durable; not supported on every platform
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def hash_file(path, fsync):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+        if fsync:
+            os.fsync(f.fileno())
+    return digest.hexdigest()
+
+
+# Copy source to destination under a temporary name, hashing as it goes, then rename into place
+def copy_and_hash(source, destination, fsync):
+    digest = hashlib.sha256()
+    tmp_path = destination + ".tmp"
+    with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            dst.write(chunk)
+        if fsync:
+            dst.flush()
+            os.fsync(dst.fileno())
+    os.replace(tmp_path, destination)
+    os.remove(source)
+    return digest.hexdigest()
+
+
+def write_json(path, data, fsync):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_output(job):
+    start = time.perf_counter()
+    destination = job["destination"]
+    fsync = job.get("fsync", True)
+    directory = os.path.dirname(destination)
+    ensure_dir(directory)
+
+    if os.path.abspath(job["source"]) == os.path.abspath(destination):
+        sha256 = hash_file(destination, fsync)
+    else:
+        sha256 = copy_and_hash(job["source"], destination, fsync)
+
+    if job.get("json_path"):
+        write_json(job["json_path"], job["json_data"], fsync)
+    if fsync:
+        fsync_dir(directory)
+
+    ack = {key: value for key, value in job.items() if key not in ("json_data", "entry")}
+    ack["entry"] = dict(job.get("entry", {}), size=os.path.getsize(destination), sha256=sha256)
+    ack["write_seconds"] = round(time.perf_counter() - start, 4)
+    return ack
+
+
+class SyncOutputWriter:
+    # Runs every job inline; same interface as OutputWriter
+    def __init__(self):
+        self.done = []
+
+    def submit(self, job):
+        self.done.append(write_output(job))
+        return self.poll()
+
+    def poll(self):
+        done, self.done = self.done, []
+        return done
+
+    def flush(self):
+        return self.poll()
+
+    def close(self):
+        return self.poll()
+
+
+class OutputWriter:
+    # Runs jobs in a child process started with the given Python executable.
+    # submit() blocks while max_pending jobs are unacknowledged; every call returns the
+    # acknowledgements that arrived since the last one.
+    def __init__(self, max_pending=4, python=sys.executable):
+        self.max_pending = max_pending
+        self.pending = 0
+        self.acks = queue.Queue()
+        self.process = subprocess.Popen([python, os.path.abspath(__file__)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+        # The reader thread only waits on the pipe, so it never competes with the render for the interpreter
+        self.reader = threading.Thread(target=self.read_acks, name="output-writer-acks", daemon=True)
+        self.reader.start()
+
+    def read_acks(self):
+        for line in self.process.stdout:
+            self.acks.put(json.loads(line))
+        self.acks.put(None)
+
+    def take(self, block):
+        ack = self.acks.get(block=block)
+        if ack is None:
+            raise Exception(f"Output writer exited with code {self.process.wait()} with {self.pending} frames pending.")
+        if "error" in ack:
+            raise Exception(f"Output writer failed on {ack.get('destination')}: {ack['error']}")
+        self.pending -= 1
+        return ack
+
+    def submit(self, job):
+        done = []
+        while self.pending >= self.max_pending:
+            done.append(self.take(block=True))
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.pending += 1
+        return done + self.poll()
+
+    def poll(self):
+        done = []
+        while True:
+            try:
+                done.append(self.take(block=False))
+            except queue.Empty:
+                return done
+
+    # Wait until every submitted job is acknowledged; the writer keeps running
+    def flush(self):
+        done = []
+        while self.pending:
+            done.append(self.take(block=True))
+        return done
+
+    def close(self):
+        done = self.flush()
+        self.process.stdin.close()
+        self.process.wait()
+        return done
+
+
+# Child process: one JSON job per stdin line, one JSON acknowledgement per stdout line
+def main():
+    for line in sys.stdin:
+        job = json.loads(line)
+        try:
+            ack = write_output(job)
+        except Exception as error:
+            ack = {"destination": job.get("destination"), "error": repr(error)}
+        sys.stdout.write(json.dumps(ack) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import itertools
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from nlos.poses import euler_xyz_to_matrix
+
+
+# Collision-free placement of floor objects, without Blender.
+#
+# Each shape has a bounding description of its evaluated base mesh (unit scale, with the
+# shape's modifiers applied). After the object's rotation and scale are drawn, its
+# world-space axis-aligned bounding box is computed, the object is snapped so its lowest
+# point rests on the floor, and candidate x/y positions are tested against the footprints
+# already placed using a uniform 2D hash grid. Each test only looks at the few grid cells
+# the footprint covers, so placing n objects takes roughly O(n) time.
+
+
+# Vertices of a cone or cylinder as bmesh.ops.create_cone builds them (first vertex on +Y)
+def ring_points(segments, radius, z):
+    angle = np.arange(segments) * 2 * math.pi / segments
+    return np.column_stack([radius * np.sin(angle), radius * np.cos(angle), np.full(segments, float(z))])
+
+
+# Cylinder twisted by `twist` radians about the X axis over its width, like the SimpleDeform
+# modifier in rendering.py
+def twisted_cylinder_points(segments, twist):
+    points = np.vstack([ring_points(segments, 1.0, -1.0), ring_points(segments, 1.0, 1.0)])
+    angle = points[:, 0] * twist / 2
+    y = points[:, 1] * np.cos(angle) - points[:, 2] * np.sin(angle)
+    z = points[:, 1] * np.sin(angle) + points[:, 2] * np.cos(angle)
+    return np.column_stack([points[:, 0], y, z])
+
+
+# Every signed permutation of each point (a shape with the symmetry of the cube)
+def cube_symmetric_points(points):
+    result = set()
+    for point in points:
+        for order in itertools.permutations(point):
+            for signs in itertools.product((1.0, -1.0), repeat=3):
+                result.add(tuple(sign * value + 0.0 for sign, value in zip(signs, order)))
+    return np.array(sorted(result))
+
+
+def mirror_x_points(points):
+    points = np.asarray(points, dtype=np.float64)
+    return np.vstack([points, points[points[:, 0] > 0] * [-1.0, 1.0, 1.0]])
+
+
+# Convex hull vertices of the 2x2x2 cube after two Catmull-Clark levels (one per symmetry orbit)
+SUBDIVIDED_CUBE_HULL = [
+    (0.0, 0.0, 0.839506), (0.0, 0.33314, 0.781829), (0.0, 0.609568, 0.609568),
+    (0.29665, 0.572933, 0.572933), (0.316157, 0.316157, 0.72899), (0.5, 0.5, 0.5),
+]
+
+# Convex hull vertices of Suzanne with x >= 0 (the mesh is mirrored in x)
+MONKEY_HULL = [
+    (0.0000, -0.5781, -0.9844), (0.0000, -0.4609, -0.9766), (0.1797, -0.5547, -0.9688),
+    (0.0000, -0.6406, -0.9453), (0.3281, -0.5234, -0.9453), (0.1641, -0.6328, -0.9297),
+    (0.2344, -0.6328, -0.9141), (0.3281, -0.3984, -0.9141), (0.3672, -0.5312, -0.8906),
+    (0.0625, -0.6953, -0.8828), (0.1172, -0.7109, -0.8359), (0.2656, -0.6641, -0.8203),
+    (0.0000, -0.7344, -0.7656), (0.1094, -0.7344, -0.7188), (0.1094, -0.8281, -0.2266),
+    (0.0000, 0.6719, -0.1953), (1.0391, 0.4922, -0.0859), (1.2812, 0.4297, 0.0547),
+    (1.3125, 0.5312, 0.0547), (0.0000, 0.8281, 0.0703), (0.4453, -0.7812, 0.1562),
+    (0.3516, -0.8281, 0.2422), (1.3672, 0.5000, 0.2969), (1.3516, 0.4219, 0.3203),
+    (0.6875, -0.7266, 0.4141), (0.8594, -0.5938, 0.4297), (1.2500, 0.5469, 0.4688),
+    (1.2344, 0.4219, 0.5078), (0.0000, 0.8516, 0.5625), (0.2031, -0.8516, 0.6172),
+    (0.3125, -0.8359, 0.6406), (0.3203, -0.7344, 0.7578), (0.4531, -0.2344, 0.8516),
+    (0.4531, 0.3828, 0.8672), (0.0000, -0.2891, 0.8984), (0.0000, 0.5469, 0.8984),
+    (0.4531, 0.0703, 0.9297), (0.0000, 0.0781, 0.9844),
+]
+
+# Bounds of the evaluated base meshes:
+#   ("box", half extents)       box around the origin, rotated with the object (exact for the cube)
+#   ("sphere", radius)          rotation invariant
+#   ("torus", (major, minor))   exact extent of a ring swept by a ball
+#   ("points", points)          convex hull vertices, rotated and scaled with the object
+SHAPE_BOUNDS = {
+    "TORUS_KNOT": ("torus", (2.0, 0.3)),
+    "TWISTED_CYLINDER": ("points", twisted_cylinder_points(32, math.pi / 2)),
+    "ICOSPHERE": ("sphere", 1.0),
+    "SUBDIVIDED_CUBE": ("points", cube_symmetric_points(SUBDIVIDED_CUBE_HULL)),
+    "BOOLEAN_OBJECT": ("box", (1.0, 1.0, 1.0)),
+    "CONE": ("points", np.vstack([ring_points(6, 1.0, -1.0), [[0.0, 0.0, 1.0]]])),
+    "TORUS": ("torus", (2.0, 0.4)),
+    "MONKEY": ("points", mirror_x_points(MONKEY_HULL)),
+    "UV_SPHERE": ("sphere", 1.0),
+}
+
+
+# World-axis offsets (low, high) of a shape's bounding box from its origin after rotation
+# (XYZ Euler) and uniform scale
+def object_bounds(shape, rotation_euler, scale):
+    kind, size = SHAPE_BOUNDS[shape]
+    if kind == "sphere":
+        extent = np.full(3, size * scale)
+        return -extent, extent
+    rotation = euler_xyz_to_matrix(np.asarray(rotation_euler, dtype=np.float64).reshape(1, 3))[0]
+    if kind == "points":
+        points = size @ rotation.T * scale
+        return points.min(axis=0), points.max(axis=0)
+    if kind == "torus":
+        major, minor = size
+        normal = rotation[:, 2]
+        extent = (major * np.sqrt(np.clip(1.0 - normal ** 2, 0.0, 1.0)) + minor) * scale
+    else:
+        extent = np.abs(rotation) @ np.asarray(size, dtype=np.float64) * scale
+    return -extent, extent
+
+
+# Axis-aligned bounding box [[min x, y, z], [max x, y, z]] of an object with its origin at location
+def object_aabb(shape, location, rotation_euler, scale):
+    low, high = object_bounds(shape, rotation_euler, scale)
+    location = np.asarray(location, dtype=np.float64)
+    return [(location + low).tolist(), (location + high).tolist()]
+
+
+class SpatialGrid:
+    # Uniform 2D hash grid of axis-aligned footprints (min_x, min_y, max_x, max_y)
+    def __init__(self, cell_size=1.0):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.boxes = []
+
+    def cell_range(self, box):
+        min_x, min_y, max_x, max_y = box
+        return (range(math.floor(min_x / self.cell_size), math.floor(max_x / self.cell_size) + 1),
+                range(math.floor(min_y / self.cell_size), math.floor(max_y / self.cell_size) + 1))
+
+    # Indices of stored boxes that overlap box
+    def query(self, box):
+        xs, ys = self.cell_range(box)
+        hits = set()
+        for ix in xs:
+            for iy in ys:
+                for index in self.cells.get((ix, iy), ()):
+                    other = self.boxes[index]
+                    if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                        hits.add(index)
+        return hits
+
+    def insert(self, box):
+        index = len(self.boxes)
+        self.boxes.append(tuple(box))
+        xs, ys = self.cell_range(box)
+        for ix in xs:
+            for iy in ys:
+                self.cells[(ix, iy)].append(index)
+        return index
+
+
+class Placer:
+    # Places objects with their centres inside bounds ((min_x, max_x), (min_y, max_y)),
+    # at least margin apart, resting on floor_z
+    def __init__(self, bounds, floor_z=0.0, margin=0.0, cell_size=1.0, max_attempts=50):
+        self.bounds = bounds
+        self.floor_z = floor_z
+        self.margin = margin
+        self.max_attempts = max_attempts
+        self.grid = SpatialGrid(cell_size)
+        self.attempts = 0
+
+    # Draw positions from rng until one is free; returns (location, aabb) or None
+    def place(self, shape, rotation_euler, scale, rng):
+        low, high = object_bounds(shape, rotation_euler, scale)
+        # Rest the lowest point of the rotated, scaled shape on the floor
+        z = self.floor_z - low[2]
+        (min_x, max_x), (min_y, max_y) = self.bounds
+        pad = self.margin / 2
+        for _ in range(self.max_attempts):
+            self.attempts += 1
+            x = rng.uniform(min_x, max_x)
+            y = rng.uniform(min_y, max_y)
+            footprint = (x + low[0] - pad, y + low[1] - pad, x + high[0] + pad, y + high[1] + pad)
+            if not self.grid.query(footprint):
+                self.grid.insert(footprint)
+                location = [x, y, float(z)]
+                return location, object_aabb(shape, location, rotation_euler, scale)
+        return None
@@ -0,0 +1,160 @@
+import json
+import os
+
+import numpy as np
+
+
+# Columnar pose storage: one file per seq_NNNN folder instead of one JSON per frame.
+#
+# Pose records are nested dicts (the same layout as the per-frame JSON). They are
+# flattened into dotted column names, e.g. "drone_1_pose.position.x", and written
+# as one .npz with one array per column, sorted by timestamp.
+#
+# In streaming mode every record is also appended to a .stream.jsonl file as soon
+# as it arrives, so an interrupted run loses no poses. close() packs everything
+# into the .npz and removes the stream file.
+
+POSES_NAME = "poses"
+NPZ_SUFFIX = ".npz"
+STREAM_SUFFIX = ".stream.jsonl"
+
+
+def flatten_record(record, prefix=""):
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, name + "."))
+        elif isinstance(value, np.ndarray):
+            flat[name] = value.tolist()
+        else:
+            flat[name] = value
+    return flat
+
+
+def unflatten_record(flat):
+    record = {}
+    for name, value in flat.items():
+        parts = name.split(".")
+        node = record
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return record
+
+
+# Stack flat rows (keyed by timestamp) into one array per column, in timestamp order
+def columns_from_rows(rows):
+    ordered = [rows[timestamp] for timestamp in sorted(rows)]
+    return {name: np.array([row[name] for row in ordered]) for name in ordered[0]}
+
+
+def rows_from_columns(columns):
+    count = len(columns["timestamp"])
+    rows = {}
+    for i in range(count):
+        row = {name: values[i].tolist() for name, values in columns.items()}
+        rows[row["timestamp"]] = row
+    return rows
+
+
+def read_npz_rows(path):
+    with np.load(path) as data:
+        return rows_from_columns({name: data[name] for name in data.files})
+
+
+def read_stream_rows(path):
+    rows = {}
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                break  # Partial last line from an interrupted write
+            rows[row["timestamp"]] = row
+    return rows
+
+
+def write_npz(path, rows):
+    # Write under a temporary name first so a crash never leaves a truncated file
+    tmp_path = path[:-len(NPZ_SUFFIX)] + ".tmp" + NPZ_SUFFIX
+    np.savez(tmp_path, **columns_from_rows(rows))
+    os.replace(tmp_path, path)
+
+
+# All pose files in a sequence directory (merged, per-worker and stream files)
+def pose_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith(POSES_NAME) and ".tmp" not in name
+        and (name.endswith(NPZ_SUFFIX) or name.endswith(STREAM_SUFFIX))
+    )
+
+
+def read_file_rows(path):
+    return read_npz_rows(path) if path.endswith(NPZ_SUFFIX) else read_stream_rows(path)
+
+
+# Every pose row recorded in a sequence directory, keyed by timestamp
+def read_pose_rows(directory):
+    rows = {}
+    for path in pose_files(directory):
+        rows.update(read_file_rows(path))
+    return rows
+
+
+# Combine every pose file in a sequence directory into a single poses.npz
+def merge_pose_files(directory):
+    paths = pose_files(directory)
+    merged_path = os.path.join(directory, POSES_NAME + NPZ_SUFFIX)
+    if not paths or paths == [merged_path]:
+        return
+    rows = read_pose_rows(directory)
+    if rows:
+        write_npz(merged_path, rows)
+    for path in paths:
+        if path != merged_path:
+            os.remove(path)
+
+
+class PoseSink:
+    # Collects the pose records of one sequence and writes them as <name>.npz in directory.
+    # With resume=False any earlier files of the same name are discarded.
+    def __init__(self, directory, name=POSES_NAME, streaming=True, resume=False):
+        self.npz_path = os.path.join(directory, name + NPZ_SUFFIX)
+        self.stream_path = os.path.join(directory, name + STREAM_SUFFIX)
+        self.streaming = streaming
+        self.stream_file = None
+        self.rows = {}
+        for path in (self.npz_path, self.stream_path):
+            if os.path.exists(path):
+                if resume:
+                    self.rows.update(read_file_rows(path))
+                else:
+                    os.remove(path)
+
+    def append(self, record):
+        row = flatten_record(record)
+        self.rows[row["timestamp"]] = row
+        if self.streaming:
+            if self.stream_file is None:
+                os.makedirs(os.path.dirname(self.stream_path), exist_ok=True)
+                self.stream_file = open(self.stream_path, 'a')
+            self.stream_file.write(json.dumps(row) + "\n")
+            self.stream_file.flush()
+
+    def close(self):
+        if self.rows:
+            write_npz(self.npz_path, self.rows)
+        if self.stream_file is not None:
+            self.stream_file.close()
+            self.stream_file = None
+        if os.path.exists(self.stream_path):
+            os.remove(self.stream_path)
+
+
+def load_poses(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+
+
+# World-space pose math in batched NumPy, without Blender.
+#
+# All functions take arrays with a leading frame axis N. Rotations follow Blender's
+# conventions: XYZ Euler angles (R = Rz @ Ry @ Rx), column vectors, and quaternions
+# stored as (w, x, y, z).
+
+
+def euler_xyz_to_matrix(euler):
+    euler = np.asarray(euler, dtype=np.float64)
+    cx, cy, cz = np.cos(euler[:, 0]), np.cos(euler[:, 1]), np.cos(euler[:, 2])
+    sx, sy, sz = np.sin(euler[:, 0]), np.sin(euler[:, 1]), np.sin(euler[:, 2])
+    matrix = np.empty((len(euler), 3, 3), dtype=np.float64)
+    matrix[:, 0, 0] = cy * cz
+    matrix[:, 0, 1] = sx * sy * cz - cx * sz
+    matrix[:, 0, 2] = cx * sy * cz + sx * sz
+    matrix[:, 1, 0] = cy * sz
+    matrix[:, 1, 1] = sx * sy * sz + cx * cz
+    matrix[:, 1, 2] = cx * sy * sz - sx * cz
+    matrix[:, 2, 0] = -sy
+    matrix[:, 2, 1] = sx * cy
+    matrix[:, 2, 2] = cx * cy
+    return matrix
+
+
+# 4x4 transforms from location, XYZ Euler rotation and scale, shape (N, 4, 4)
+def compose_matrices(location, euler, scale):
+    location = np.asarray(location, dtype=np.float64)
+    matrix = np.zeros((len(location), 4, 4), dtype=np.float64)
+    matrix[:, :3, :3] = euler_xyz_to_matrix(euler) * np.asarray(scale, dtype=np.float64)[:, None, :]
+    matrix[:, :3, 3] = location
+    matrix[:, 3, 3] = 1.0
+    return matrix
+
+
+# Rotation part of 4x4 transforms with the scale divided out of each axis
+def normalized_rotation(matrix):
+    rotation = np.asarray(matrix, dtype=np.float64)[:, :3, :3]
+    return rotation / np.linalg.norm(rotation, axis=1, keepdims=True)
+
+
+def matrix_to_euler_xyz(rotation):
+    sy = np.clip(-rotation[:, 2, 0], -1.0, 1.0)
+    euler = np.empty((len(rotation), 3), dtype=np.float64)
+    euler[:, 0] = np.arctan2(rotation[:, 2, 1], rotation[:, 2, 2])
+    euler[:, 1] = np.arcsin(sy)
+    euler[:, 2] = np.arctan2(rotation[:, 1, 0], rotation[:, 0, 0])
+
+    # Gimbal lock (pitch at +-90 degrees): fold yaw into roll
+    locked = np.abs(sy) > 1.0 - 1e-9
+    euler[locked, 0] = np.arctan2(-rotation[locked, 1, 2], rotation[locked, 1, 1])
+    euler[locked, 2] = 0.0
+    return euler
+
+
+def matrix_to_quaternion(rotation):
+    m = rotation
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    # Candidate (unnormalised) quaternions for each choice of largest component; pick the best conditioned
+    candidates = np.stack([
+        np.stack([1.0 + trace, m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1]], axis=1),
+        np.stack([m[:, 2, 1] - m[:, 1, 2], 1.0 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2], m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0]], axis=1),
+        np.stack([m[:, 0, 2] - m[:, 2, 0], m[:, 0, 1] + m[:, 1, 0], 1.0 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2], m[:, 1, 2] + m[:, 2, 1]], axis=1),
+        np.stack([m[:, 1, 0] - m[:, 0, 1], m[:, 0, 2] + m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1], 1.0 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2]], axis=1),
+    ], axis=1)
+    diagonal = np.stack([trace, m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]], axis=1)
+    best = candidates[np.arange(len(m)), np.argmax(diagonal, axis=1)]
+    quaternion = best / np.linalg.norm(best, axis=1, keepdims=True)
+    # Keep w non-negative so every frame uses the same hemisphere
+    return np.where(quaternion[:, :1] < 0, -quaternion, quaternion)
+
+
+# Chain local transforms up a parent hierarchy.
+#
+# chain lists (local_matrices, matrix_parent_inverse) pairs from the root down to the
+# object; local_matrices has shape (N, 4, 4) and matrix_parent_inverse (4, 4).
+def world_matrices(chain):
+    world = None
+    for local, parent_inverse in chain:
+        if world is None:
+            world = local
+        else:
+            world = world @ np.asarray(parent_inverse, dtype=np.float64) @ local
+    return world
+
+
+# Position, orientation (XYZ Euler), quaternion and full matrix for every frame
+def pose_arrays(world):
+    rotation = normalized_rotation(world)
+    return {
+        "position": world[:, :3, 3].copy(),
+        "euler": matrix_to_euler_xyz(rotation),
+        "quaternion": matrix_to_quaternion(rotation),
+        "matrix_world": world,
+    }
+
+
+# Nested pose record for frame index i, in the layout of the per-frame JSON
+def pose_record(pose, i):
+    position = pose["position"][i]
+    euler = pose["euler"][i]
+    quaternion = pose["quaternion"][i]
+    return {
+        "position": {"x": float(position[0]), "y": float(position[1]), "z": float(position[2])},
+        "orientation": {"roll": float(euler[0]), "pitch": float(euler[1]), "yaw": float(euler[2])},
+        "quaternion": {"w": float(quaternion[0]), "x": float(quaternion[1]), "y": float(quaternion[2]), "z": float(quaternion[3])},
+        "matrix_world": pose["matrix_world"][i].tolist(),
+    }
+
+
+# Write per-frame world poses of several objects as one .npz ("<name>.<field>" columns plus "frames")
+def save_ground_truth(path, frames, poses):
+    columns = {"frames": np.asarray(frames)}
+    for name, pose in poses.items():
+        for key, values in pose.items():
+            columns[f"{name}.{key}"] = values
+    tmp_path = path[:-len(".npz")] + f".{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **columns)
+    os.replace(tmp_path, path)
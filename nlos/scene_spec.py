@@ -0,0 +1,334 @@
+import argparse
+import copy
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from nlos.placement import Placer, object_aabb
+from nlos.trajectory import SEGMENT_FRAMES, SegmentChecker, count_segments, generate_valid_waypoints, generate_waypoints
+
+
+# Scene specs: a seed plus a config resolved into a fully explicit, serializable scene.
+#
+# generate_scene_spec() draws every random choice (floor objects, materials, carpet,
+# lights, flying drone waypoints) from its own random.Random(seed), so the same seed
+# and config always give the same spec on any machine, without Blender. rendering.py
+# builds the scene from the spec alone.
+#
+# Floor objects are packed without overlaps and rest on the carpet (placement.py).
+# The flying drone's waypoints are checked against the clutter, lights, hovering drone,
+# room and speed limits (trajectory.py). With "placement": "legacy" and
+# "trajectory_validation": false the draw order and placement of the original script
+# are kept, so a seed describes the same scene it did before specs existed.
+#
+# Command line:
+#   python -m nlos.scene_spec generate --seed 0 --count 1000 --output-dir specs/
+#   python -m nlos.scene_spec diff specs/scene_00000000.json specs/scene_00000001.json
+#   python -m nlos.scene_spec validate --seed 0 --count 1000
+
+# Bumped whenever the spec layout changes; load_scene_spec() rejects any other version.
+#   2: per-object "aabb", "placement" statistics, room bounds and trajectory validation config
+SCENE_SPEC_VERSION = 2
+
+DEFAULT_CONFIG = {
+    "num_objects": 10,
+    "object_bounds": [[-7, 7], [-7, 7]],
+    "object_scale": [0.5, 0.9],
+    "placement": "packed",
+    "placement_attempts": 50,
+    "placement_margin": 0.05,
+    "placement_cell_size": 1.0,
+    "floor_z": 0.1,
+    "object_shapes": ["TORUS_KNOT", "TWISTED_CYLINDER", "ICOSPHERE", "SUBDIVIDED_CUBE",
+                      "BOOLEAN_OBJECT", "CONE", "TORUS", "MONKEY", "UV_SPHERE"],
+    "material_types": ["Metal", "Plastic", "Wood", "Glass", "Stone"],
+    "num_lights": 10,
+    "light_bounds": [[-10, 10], [-10, 10], [10, 15]],
+    "light_energy": [50, 150],
+    "carpet_style": "plain",
+    "frame_start": 1,
+    "frame_end": 1000,
+    "flying_drone_start": [0, 0, 6],
+    "segment_frames": SEGMENT_FRAMES,
+    "trajectory_validation": True,
+    "room_bounds": [[-10, 10], [-10, 10], [0, 49]],
+    "drone_clearance": 0.3,
+    "max_speed": 30.0,
+    "max_acceleration": 60.0,
+    "fps": 24,
+    "waypoint_attempts": 100,
+}
+
+# Obstacles the flying drone must avoid besides the clutter: the hovering drone (at (0, 0, 3)
+# in rendering.py) and the area lights, as half extents around their centres
+HOVERING_DRONE_LOCATION = [0, 0, 3]
+HOVERING_DRONE_HALF_EXTENTS = [0.5, 0.5, 0.5]
+LIGHT_HALF_EXTENTS = [0.5, 0.5, 0.05]
+
+# Height of each shape before scaling, as the original script read it from obj.dimensions.z
+# to rest the object on the floor (z = height / 2, ignoring rotation and scale; legacy placement only)
+SHAPE_HEIGHTS = {
+    "TORUS_KNOT": 0.6,
+    "TWISTED_CYLINDER": 2.0,
+    "ICOSPHERE": 2.0,
+    "SUBDIVIDED_CUBE": 2.0,
+    "BOOLEAN_OBJECT": 2.0,
+    "CONE": 2.0,
+    "TORUS": 0.8,
+    "MONKEY": 1.97,
+    "UV_SPHERE": 2.0,
+}
+
+
+def resolve_config(config=None):
+    resolved = copy.deepcopy(DEFAULT_CONFIG)
+    for key, value in (config or {}).items():
+        if key not in DEFAULT_CONFIG:
+            raise Exception(f"Unknown scene config key '{key}'.")
+        resolved[key] = value
+    return resolved
+
+
+def load_config(path):
+    with open(path, 'r') as f:
+        return resolve_config(json.load(f))
+
+
+# Principled BSDF inputs for one material type
+def material_spec(material_type, rng):
+    if material_type == 'Metal':
+        return {"type": material_type, "base_color": [0.8, 0.8, 0.8, 1], "metallic": 1, "roughness": 0.2}
+    if material_type == 'Plastic':
+        return {"type": material_type, "base_color": [rng.random(), rng.random(), rng.random(), 1],
+                "metallic": 0, "roughness": 0.4}
+    if material_type == 'Wood':
+        return {"type": material_type, "base_color": [0.6, 0.3, 0.1, 1], "metallic": 0, "roughness": 0.7}
+    if material_type == 'Glass':
+        return {"type": material_type, "base_color": [1, 1, 1, 0.1], "metallic": 0, "roughness": 0.05,
+                "transmission": 1}
+    if material_type == 'Stone':
+        return {"type": material_type, "base_color": [0.5, 0.5, 0.5, 1], "metallic": 0, "roughness": 0.8}
+    raise Exception(f"Unknown material type '{material_type}'.")
+
+
+# Original placement: independent x/y, z from the unrotated, unscaled height
+def legacy_object_spec(config, rng):
+    shape = rng.choice(config["object_shapes"])
+    (min_x, max_x), (min_y, max_y) = config["object_bounds"]
+    x = rng.uniform(min_x, max_x)
+    y = rng.uniform(min_y, max_y)
+    rotation = [rng.uniform(0, math.pi) for _ in range(3)]
+    scale = rng.uniform(*config["object_scale"])
+    material = material_spec(rng.choice(config["material_types"]), rng)
+    location = [x, y, SHAPE_HEIGHTS[shape] / 2]
+    return {
+        "shape": shape,
+        "location": location,
+        "rotation_euler": rotation,
+        "scale": [scale, scale, scale],
+        "aabb": object_aabb(shape, location, rotation, scale),
+        "material": material,
+    }
+
+
+# Packed placement: draw the object, then search for a free footprint; None if there is no room
+def packed_object_spec(config, placer, rng):
+    shape = rng.choice(config["object_shapes"])
+    rotation = [rng.uniform(0, math.pi) for _ in range(3)]
+    scale = rng.uniform(*config["object_scale"])
+    material = material_spec(rng.choice(config["material_types"]), rng)
+    placed = placer.place(shape, rotation, scale, rng)
+    if placed is None:
+        return None
+    location, aabb = placed
+    return {
+        "shape": shape,
+        "location": location,
+        "rotation_euler": rotation,
+        "scale": [scale, scale, scale],
+        "aabb": aabb,
+        "material": material,
+    }
+
+
+def object_specs(config, rng):
+    if config["placement"] == "legacy":
+        objects = [legacy_object_spec(config, rng) for _ in range(config["num_objects"])]
+        return objects, {"requested": len(objects), "placed": len(objects)}
+    if config["placement"] != "packed":
+        raise Exception(f"Unknown placement '{config['placement']}'; use packed or legacy.")
+
+    placer = Placer(config["object_bounds"], floor_z=config["floor_z"], margin=config["placement_margin"],
+                    cell_size=config["placement_cell_size"], max_attempts=config["placement_attempts"])
+    objects = []
+    for _ in range(config["num_objects"]):
+        spec = packed_object_spec(config, placer, rng)
+        if spec is not None:
+            objects.append(spec)
+    return objects, {"requested": config["num_objects"], "placed": len(objects), "attempts": placer.attempts}
+
+
+def carpet_spec(config, rng):
+    if config["carpet_style"] == "realistic":
+        return {
+            "style": "realistic",
+            "noise_scale": rng.uniform(5, 15),
+            "noise_detail": rng.uniform(2, 10),
+            "voronoi_scale": rng.uniform(10, 30),
+            "mix_factor": rng.random(),
+            "roughness": rng.uniform(0.6, 0.9),
+            "bump_strength": rng.uniform(0.1, 0.3),
+        }
+    color = [rng.uniform(0.3, 0.5), rng.uniform(0.1, 0.3), rng.uniform(0.0, 0.2), 1]
+    return {"style": "plain", "base_color": color, "roughness": rng.uniform(0.7, 0.9)}
+
+
+def light_spec(config, rng):
+    location = [rng.uniform(low, high) for low, high in config["light_bounds"]]
+    return {"type": "AREA", "location": location, "energy": rng.uniform(*config["light_energy"])}
+
+
+def box_around(center, half_extents):
+    return [[c - h for c, h in zip(center, half_extents)], [c + h for c, h in zip(center, half_extents)]]
+
+
+# Checker for the flying drone: clutter, lights and the hovering drone are obstacles
+def trajectory_checker(config, objects, lights):
+    obstacles = [obj["aabb"] for obj in objects]
+    obstacles += [box_around(light["location"], LIGHT_HALF_EXTENTS) for light in lights]
+    obstacles.append(box_around(HOVERING_DRONE_LOCATION, HOVERING_DRONE_HALF_EXTENTS))
+    return SegmentChecker(obstacles, config["room_bounds"], config["drone_clearance"], config["max_speed"],
+                          config["max_acceleration"], config["segment_frames"] / config["fps"])
+
+
+# Waypoints for the flying drone, checked against the scene's obstacles unless validation is off
+def flying_drone_waypoints(config, objects, lights, rng):
+    segments = count_segments(config["frame_start"], config["frame_end"], config["segment_frames"])
+    if not config["trajectory_validation"]:
+        return generate_waypoints(segments, rng), None
+    checker = trajectory_checker(config, objects, lights)
+    return generate_valid_waypoints(config["flying_drone_start"], segments, checker, rng, config["waypoint_attempts"])
+
+
+# Segments of a spec's flying drone path that break the config's limits, as (index, reason) pairs
+def invalid_segments(spec):
+    checker = trajectory_checker(spec["config"], spec["objects"], spec["lights"])
+    reasons = checker.check_path(spec["flying_drone"]["start"], spec["flying_drone"]["waypoints"])
+    return [(index, reason) for index, reason in enumerate(reasons) if reason is not None]
+
+
+def generate_scene_spec(seed, config=None):
+    config = resolve_config(config)
+    rng = random.Random(seed)
+    objects, placement = object_specs(config, rng)
+    carpet = carpet_spec(config, rng)
+    lights = [light_spec(config, rng) for _ in range(config["num_lights"])]
+    waypoints, validation = flying_drone_waypoints(config, objects, lights, rng)
+    return {
+        "version": SCENE_SPEC_VERSION,
+        "seed": seed,
+        "config": config,
+        "objects": objects,
+        "placement": placement,
+        "carpet": carpet,
+        "lights": lights,
+        "animation": {"frame_start": config["frame_start"], "frame_end": config["frame_end"]},
+        "flying_drone": {
+            "start": list(config["flying_drone_start"]),
+            "segment_frames": config["segment_frames"],
+            "waypoints": waypoints.tolist(),
+            "validation": validation,
+        },
+    }
+
+
+def spec_hash(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def save_scene_spec(path, spec):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(spec, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def load_scene_spec(path):
+    with open(path, 'r') as f:
+        spec = json.load(f)
+    if spec.get("version") != SCENE_SPEC_VERSION:
+        raise Exception(f"{path} has scene spec version {spec.get('version')}, expected {SCENE_SPEC_VERSION}.")
+    return spec
+
+
+# Paths and values that differ between two specs, as (dotted path, a, b) tuples
+def diff_specs(a, b, prefix=""):
+    if isinstance(a, dict) and isinstance(b, dict):
+        differences = []
+        for key in sorted(set(a) | set(b), key=str):
+            differences.extend(diff_specs(a.get(key), b.get(key), f"{prefix}{key}."))
+        return differences
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        differences = []
+        for index, (item_a, item_b) in enumerate(zip(a, b)):
+            differences.extend(diff_specs(item_a, item_b, f"{prefix}{index}."))
+        return differences
+    return [] if a == b else [(prefix.rstrip("."), a, b)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and compare scene specs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write one spec per seed")
+    generate.add_argument("--seed", type=int, default=0, help="First seed")
+    generate.add_argument("--count", type=int, default=1, help="Number of consecutive seeds")
+    generate.add_argument("--config", default=None, help="JSON file overriding the default scene config")
+    generate.add_argument("--output-dir", default="scene_specs/", help="Directory for scene_<seed>.json files")
+
+    diff = commands.add_parser("diff", help="List the differences between two specs")
+    diff.add_argument("a")
+    diff.add_argument("b")
+
+    validate = commands.add_parser("validate", help="Check flying drone paths against their scene")
+    validate.add_argument("specs", nargs="*", help="Spec files (default: generate --count specs from --seed)")
+    validate.add_argument("--seed", type=int, default=0, help="First seed")
+    validate.add_argument("--count", type=int, default=1000, help="Number of consecutive seeds")
+    validate.add_argument("--config", default=None, help="JSON file overriding the default scene config")
+
+    options = parser.parse_args()
+    if options.command == "generate":
+        config = load_config(options.config) if options.config else None
+        for seed in range(options.seed, options.seed + options.count):
+            spec = generate_scene_spec(seed, config)
+            save_scene_spec(os.path.join(options.output_dir, f"scene_{seed:08d}.json"), spec)
+        print(f"Wrote {options.count} scene specs to {options.output_dir}")
+    elif options.command == "validate":
+        start = time.perf_counter()
+        if options.specs:
+            specs = (load_scene_spec(path) for path in options.specs)
+        else:
+            config = load_config(options.config) if options.config else None
+            specs = (generate_scene_spec(seed, config) for seed in range(options.seed, options.seed + options.count))
+        checked = invalid = 0
+        for spec in specs:
+            checked += 1
+            problems = invalid_segments(spec)
+            if problems:
+                invalid += 1
+                print(f"seed {spec['seed']}: {problems}")
+        print(f"Validated {checked} trajectories in {time.perf_counter() - start:.2f}s, {invalid} invalid")
+        if invalid:
+            sys.exit(1)
+    else:
+        for path, value_a, value_b in diff_specs(load_scene_spec(options.a), load_scene_spec(options.b)):
+            print(f"{path}: {value_a!r} -> {value_b!r}")
+
+
+if __name__ == "__main__":
+    main()
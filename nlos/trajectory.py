@@ -0,0 +1,226 @@
+import math
+import os
+import random
+
+import numpy as np
+
+from nlos.placement import SpatialGrid
+
+
+# Flying drone trajectory, computed in batched NumPy without Blender.
+#
+# The drone flies straight lines between random waypoints. Each segment lasts
+# SEGMENT_FRAMES frames and the drone faces the direction of travel while its
+# camera keeps pointing down (roll fixed at 90 degrees).
+
+# Waypoint bounds (min, max) for X, Y and Z
+WAYPOINT_BOUNDS = ((-8, 8), (-8, 8), (3, 5))
+
+# Number of frames spent flying between two waypoints
+SEGMENT_FRAMES = 20
+
+
+def generate_random_point(rng=random):
+    x = rng.uniform(*WAYPOINT_BOUNDS[0])
+    y = rng.uniform(*WAYPOINT_BOUNDS[1])
+    z = rng.uniform(*WAYPOINT_BOUNDS[2])
+    return (x, y, z)
+
+
+def count_segments(frame_start, frame_end, segment_frames=SEGMENT_FRAMES):
+    return len(range(frame_start, frame_end + 1, segment_frames))
+
+
+# Draw one waypoint per segment from rng (the random module or a random.Random instance)
+def generate_waypoints(num_segments, rng=random):
+    return np.array([generate_random_point(rng) for _ in range(num_segments)], dtype=np.float64).reshape(-1, 3)
+
+
+# Compute the full path: one location and rotation per frame.
+#
+# Segments start every segment_frames frames from frame_start, so the last segment
+# may run past frame_end. Returns a dict of arrays:
+#   frames          (N,)   frame numbers
+#   location        (N, 3) drone position
+#   rotation_euler  (N, 3) XYZ Euler rotation
+#   waypoints       (S, 3) segment end points
+def compute_trajectory(start, frame_start, frame_end, segment_frames=SEGMENT_FRAMES, waypoints=None, rng=random):
+    if waypoints is None:
+        waypoints = generate_waypoints(count_segments(frame_start, frame_end, segment_frames), rng)
+    waypoints = np.asarray(waypoints, dtype=np.float64).reshape(-1, 3)
+    num_segments = len(waypoints)
+
+    # Segment start points: the initial position followed by every waypoint but the last
+    starts = np.vstack([np.asarray(start, dtype=np.float64).reshape(1, 3), waypoints[:-1]])
+    deltas = waypoints - starts
+
+    # Linear interpolation within each segment (t = 0, 1/n, ..., (n-1)/n)
+    t = np.arange(segment_frames, dtype=np.float64) / segment_frames
+    location = (starts[:, None, :] + deltas[:, None, :] * t[None, :, None]).reshape(-1, 3)
+
+    # Face the direction of movement while keeping the camera down
+    heading = np.arctan2(deltas[:, 1], deltas[:, 0])
+    rotation_euler = np.zeros((num_segments * segment_frames, 3), dtype=np.float64)
+    rotation_euler[:, 0] = math.pi / 2
+    rotation_euler[:, 2] = np.repeat(heading, segment_frames)
+
+    frames = frame_start + np.arange(num_segments * segment_frames)
+    return {
+        "frames": frames,
+        "location": location,
+        "rotation_euler": rotation_euler,
+        "waypoints": waypoints,
+    }
+
+
+def save_trajectory(path, trajectory):
+    # Write under a per-process temporary name and rename, so readers never see a torn file
+    tmp_path = path[:-len(".npz")] + f".{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **trajectory)
+    os.replace(tmp_path, path)
+
+
+def load_trajectory(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+# Trajectory validation.
+#
+# Waypoints are drawn one segment at a time and each segment is checked before it is
+# accepted: it must stay inside the room, keep `clearance` away from every obstacle box
+# (clutter, lights, the hovering drone) and respect the speed and acceleration limits.
+# Small obstacle sets are tested all at once in one NumPy slab test; past
+# GRID_MIN_OBSTACLES boxes they are indexed in a 2D hash grid, so a segment is only
+# tested against the boxes under its own footprint. A rejected waypoint is redrawn; when
+# every attempt fails the drone holds its position for that segment.
+#
+# check_path() re-checks a whole stored trajectory in one batched pass, so thousands of
+# specs can be validated in seconds without Blender.
+
+# Below this many obstacles a direct test of every box is cheaper than a grid lookup
+GRID_MIN_OBSTACLES = 64
+
+
+# Slab test of segments starts[i] -> ends[i] against boxes [low, high]; returns (segments, boxes) hits
+def segment_box_hits(starts, ends, low, high):
+    starts = starts[:, None, :]
+    direction = (ends - starts[:, 0])[:, None, :]
+    inside = (starts >= low) & (starts <= high)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t0 = (low - starts) / direction
+        t1 = (high - starts) / direction
+    parallel = direction == 0
+    t_near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t0, t1))
+    t_far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t0, t1))
+    enter = np.max(t_near, axis=2)
+    leave = np.min(t_far, axis=2)
+    return (enter <= leave) & (leave >= 0.0) & (enter <= 1.0)
+
+class SegmentChecker:
+    # obstacles: list of [[min x, y, z], [max x, y, z]] boxes
+    # room_bounds: ((min_x, max_x), (min_y, max_y), (min_z, max_z))
+    # max_speed in units per second, max_acceleration in units per second squared;
+    # acceleration is the change of segment velocity over one segment
+    def __init__(self, obstacles, room_bounds, clearance, max_speed, max_acceleration, segment_seconds, cell_size=1.0):
+        self.room_bounds = np.asarray(room_bounds, dtype=np.float64)
+        self.clearance = clearance
+        self.max_speed = max_speed
+        self.max_acceleration = max_acceleration
+        self.segment_seconds = segment_seconds
+        boxes = np.asarray(obstacles, dtype=np.float64).reshape(-1, 2, 3)
+        self.box_min = boxes[:, 0] - clearance
+        self.box_max = boxes[:, 1] + clearance
+        self.grid = None
+        if len(boxes) >= GRID_MIN_OBSTACLES:
+            self.grid = SpatialGrid(cell_size)
+            for low, high in zip(self.box_min, self.box_max):
+                self.grid.insert((low[0], low[1], high[0], high[1]))
+        # Room limits for the drone's centre, as plain floats for the per-draw checks
+        self.room_low = (self.room_bounds[:, 0] + clearance).tolist()
+        self.room_high = (self.room_bounds[:, 1] - clearance).tolist()
+
+    def inside_room(self, point):
+        return all(low <= value <= high for value, low, high in zip(point, self.room_low, self.room_high))
+
+    # Slab test of the segment start -> end against the boxes under its footprint
+    def hits_obstacle(self, start, end):
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        low, high = self.box_min, self.box_max
+        if self.grid is not None:
+            # Pad by a hair so segments along an axis still touch the cells they lie on
+            candidates = sorted(self.grid.query((min(start[0], end[0]) - 1e-9, min(start[1], end[1]) - 1e-9,
+                                                 max(start[0], end[0]) + 1e-9, max(start[1], end[1]) + 1e-9)))
+            low, high = low[candidates], high[candidates]
+        if not len(low):
+            return False
+        return bool(segment_box_hits(start[None], end[None], low, high).any())
+
+    # Reason the segment is rejected ("room", "speed", "acceleration", "collision") or None
+    def check(self, start, end, previous_velocity):
+        if not self.inside_room(end):
+            return "room"
+        velocity = [(b - a) / self.segment_seconds for a, b in zip(start, end)]
+        if self.max_speed and math.hypot(*velocity) > self.max_speed:
+            return "speed"
+        if self.max_acceleration and previous_velocity is not None and \
+                math.hypot(*(v - p for v, p in zip(velocity, previous_velocity))) / self.segment_seconds > self.max_acceleration:
+            return "acceleration"
+        if self.hits_obstacle(start, end):
+            return "collision"
+        return None
+
+    # Reasons for every segment of start -> waypoints[0] -> waypoints[1] ..., checked in one
+    # batched pass (None for valid segments). Held segments (zero length) are exempt from the
+    # speed and acceleration limits, as in generate_valid_waypoints.
+    def check_path(self, start, waypoints):
+        ends = np.asarray(waypoints, dtype=np.float64).reshape(-1, 3)
+        starts = np.vstack([np.asarray(start, dtype=np.float64).reshape(1, 3), ends[:-1]])
+        velocity = (ends - starts) / self.segment_seconds
+        held = np.all(ends == starts, axis=1)
+
+        outside = np.any(ends < self.room_low, axis=1) | np.any(ends > self.room_high, axis=1)
+        too_fast = np.zeros(len(ends), dtype=bool)
+        if self.max_speed:
+            too_fast = (np.linalg.norm(velocity, axis=1) > self.max_speed) & ~held
+        too_sharp = np.zeros(len(ends), dtype=bool)
+        if self.max_acceleration:
+            change = np.linalg.norm(np.diff(velocity, axis=0), axis=1) / self.segment_seconds
+            too_sharp[1:] = (change > self.max_acceleration) & ~held[1:]
+        collides = np.zeros(len(ends), dtype=bool)
+        if len(self.box_min):
+            collides = segment_box_hits(starts, ends, self.box_min, self.box_max).any(axis=1)
+
+        reasons = []
+        for checks in zip(outside, too_fast, too_sharp, collides):
+            failed = [reason for reason, hit in zip(("room", "speed", "acceleration", "collision"), checks) if hit]
+            reasons.append(failed[0] if failed else None)
+        return reasons
+
+
+# Draw num_segments waypoints that pass checker, redrawing rejected ones up to max_attempts times.
+# Returns the (S, 3) waypoints and rejection statistics.
+def generate_valid_waypoints(start, num_segments, checker, rng=random, max_attempts=100):
+    stats = {"segments": num_segments, "draws": 0, "held_segments": 0,
+             "rejected": {"room": 0, "speed": 0, "acceleration": 0, "collision": 0},
+             "start_clear": checker.inside_room(start) and not checker.hits_obstacle(start, start)}
+    waypoints = []
+    previous = np.asarray(start, dtype=np.float64)
+    previous_velocity = None
+    for _ in range(num_segments):
+        for _ in range(max_attempts):
+            point = np.asarray(generate_random_point(rng), dtype=np.float64)
+            stats["draws"] += 1
+            reason = checker.check(previous, point, previous_velocity)
+            if reason is None:
+                break
+            stats["rejected"][reason] += 1
+        else:
+            # No valid waypoint found: hover in place for this segment
+            point = previous
+            stats["held_segments"] += 1
+        waypoints.append(point)
+        previous_velocity = (point - previous) / checker.segment_seconds
+        previous = point
+    return np.array(waypoints, dtype=np.float64).reshape(-1, 3), stats
@@ -0,0 +1,333 @@
+import argparse
+import collections
+import json
+import os
+import random
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from nlos.pose_sink import read_pose_rows, unflatten_record
+
+
+# Dataset loader for rendered sequences, without Blender.
+#
+# A sequence directory (nlos_dataset/seq_NNNN/, or one camera subfolder of it) is indexed
+# once: a single directory listing, the manifests and poses.npz. Frames are then joined with
+# their pose records and decoded only when they are accessed. Uncompressed EXRs are memory
+# mapped, ZIP/ZIPS/RLE EXRs are decoded with zlib and NumPy, and any other codec is read
+# through the OpenEXR package when it is installed. zlib and NumPy release the interpreter
+# lock, so the prefetching batch iterator keeps several frames decoding in threads.
+#
+# Example:
+#   dataset = FrameDataset.from_root("nlos_dataset/")
+#   for batch in dataset.iter_batches(batch_size=16, shuffle=True, workers=8):
+#       images, positions = batch["images"], batch["poses"]["drone_2_pose.position.x"]
+#
+# Command line (reads every frame and reports throughput):
+#   python nlos_loader.py nlos_dataset/ --batch-size 16 --workers 8
+
+EXR_MAGIC = 20000630
+EXR_TILED = 0x200
+EXR_NON_IMAGE = 0x800
+EXR_MULTIPART = 0x1000
+
+# Compression codes and the number of scanlines stored per chunk
+COMPRESSIONS = {0: "NONE", 1: "RLE", 2: "ZIPS", 3: "ZIP", 4: "PIZ", 5: "PXR24", 6: "B44", 7: "B44A",
+                8: "DWAA", 9: "DWAB"}
+LINES_PER_CHUNK = {"NONE": 1, "RLE": 1, "ZIPS": 1, "ZIP": 16, "PIZ": 32, "PXR24": 16, "B44": 32, "B44A": 32,
+                   "DWAA": 32, "DWAB": 256}
+PIXEL_TYPES = {0: np.dtype('<u4'), 1: np.dtype('<f2'), 2: np.dtype('<f4')}
+
+HEADER_READ_SIZE = 1 << 16
+
+
+class ExrHeader:
+    # Layout of a single-part scanline EXR: channels (name, dtype) in file order, size,
+    # compression and the chunk offset table
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read(HEADER_READ_SIZE)
+            magic, version = struct.unpack_from('<ii', data, 0)
+            if magic != EXR_MAGIC:
+                raise Exception(f"{path} is not an OpenEXR file.")
+            if version & (EXR_TILED | EXR_NON_IMAGE | EXR_MULTIPART):
+                raise Exception(f"{path} is tiled, deep or multi-part; only scanline images are supported.")
+
+            attributes, position = {}, 8
+            while data[position] != 0:
+                name_end = data.index(b'\0', position)
+                type_end = data.index(b'\0', name_end + 1)
+                name = data[position:name_end].decode()
+                (size,) = struct.unpack_from('<i', data, type_end + 1)
+                value_start = type_end + 5
+                if value_start + size >= len(data):
+                    f.seek(0)
+                    data = f.read(value_start + size + HEADER_READ_SIZE)
+                attributes[name] = data[value_start:value_start + size]
+                position = value_start + size
+
+            self.channels = parse_channels(attributes["channels"])
+            self.compression = COMPRESSIONS[attributes["compression"][0]]
+            x_min, y_min, x_max, y_max = struct.unpack('<iiii', attributes["dataWindow"])
+            self.y_min = y_min
+            self.width, self.height = x_max - x_min + 1, y_max - y_min + 1
+            self.lines_per_chunk = LINES_PER_CHUNK[self.compression]
+            chunks = -(-self.height // self.lines_per_chunk)
+
+            f.seek(position + 1)
+            self.offsets = np.frombuffer(f.read(8 * chunks), dtype='<u8')
+        self.path = path
+        # One scanline holds width values of every channel in turn
+        self.line_dtype = np.dtype([(name, dtype, (self.width,)) for name, dtype in self.channels])
+
+
+def parse_channels(data):
+    channels, position = [], 0
+    while data[position] != 0:
+        name_end = data.index(b'\0', position)
+        pixel_type, _, x_sampling, y_sampling = struct.unpack_from('<iB3xii', data, name_end + 1)
+        if x_sampling != 1 or y_sampling != 1:
+            raise Exception("Subsampled EXR channels are not supported.")
+        channels.append((data[position:name_end].decode(), PIXEL_TYPES[pixel_type]))
+        position = name_end + 17
+    return channels
+
+
+# Undo the byte predictor and the even/odd byte split that ZIP and RLE apply before compressing
+def unpredict(data):
+    values = np.frombuffer(data, dtype=np.uint8).copy()
+    values[1:] -= 128
+    values = np.cumsum(values, dtype=np.uint8)
+    half = (len(values) + 1) // 2
+    out = np.empty_like(values)
+    out[0::2] = values[:half]
+    out[1::2] = values[half:]
+    return out.tobytes()
+
+
+def rle_decode(data):
+    out, position = bytearray(), 0
+    while position < len(data):
+        count = struct.unpack_from('<b', data, position)[0]
+        position += 1
+        if count < 0:
+            out += data[position:position - count]
+            position -= count
+        else:
+            out += data[position:position + 1] * (count + 1)
+            position += 1
+    return bytes(out)
+
+
+# Scanlines of one chunk as a structured array of shape (lines,)
+def decode_chunk(header, packed, lines):
+    expected = lines * header.line_dtype.itemsize
+    if len(packed) == expected:
+        raw = packed  # Chunks that do not shrink are stored as they are
+    elif header.compression in ("ZIP", "ZIPS"):
+        raw = unpredict(zlib.decompress(packed))
+    elif header.compression == "RLE":
+        raw = unpredict(rle_decode(packed))
+    else:
+        raise Exception(f"{header.path}: {header.compression} chunks need the OpenEXR package.")
+    return np.frombuffer(raw, dtype=header.line_dtype, count=lines)
+
+
+# Uncompressed files with contiguous chunks map straight onto (y, size, scanline) records
+def memmap_lines(header):
+    record = np.dtype([("y", '<i4'), ("size", '<i4'), ("line", header.line_dtype)])
+    expected = header.offsets[0] + np.arange(header.height, dtype=np.uint64) * record.itemsize
+    if header.compression != "NONE" or not np.array_equal(header.offsets, expected):
+        return None
+    lines = np.memmap(header.path, dtype=record, mode='r', offset=int(header.offsets[0]), shape=(header.height,))
+    return lines["line"]
+
+
+def read_lines(header):
+    lines = memmap_lines(header)
+    if lines is not None:
+        return lines
+    out = np.empty(header.height, dtype=header.line_dtype)
+    with open(header.path, 'rb') as f:
+        for offset in header.offsets:
+            f.seek(int(offset))
+            y, size = struct.unpack('<ii', f.read(8))
+            start = y - header.y_min
+            count = min(header.lines_per_chunk, header.height - start)
+            out[start:start + count] = decode_chunk(header, f.read(size), count)
+    return out
+
+
+# Channels present in a header, RGBA first in that order, otherwise by name
+def default_channels(names):
+    rgba = [name for name in ("R", "G", "B", "A") if name in names]
+    return rgba or sorted(names)
+
+
+def read_exr_with_openexr(path, channels, dtype):
+    import OpenEXR
+    import Imath
+    exr = OpenEXR.InputFile(path)
+    header = exr.header()
+    window = header["dataWindow"]
+    width, height = window.max.x - window.min.x + 1, window.max.y - window.min.y + 1
+    channels = channels or default_channels(list(header["channels"]))
+    pixel_type = Imath.PixelType(Imath.PixelType.FLOAT)
+    planes = [np.frombuffer(exr.channel(name, pixel_type), dtype=np.float32).reshape(height, width)
+              for name in channels]
+    return np.stack(planes, axis=-1).astype(dtype or np.float32, copy=False)
+
+
+# Image as an (height, width, channels) array, row 0 at the top
+def read_exr(path, channels=None, dtype=np.float32):
+    header = ExrHeader(path)
+    if header.compression not in ("NONE", "RLE", "ZIPS", "ZIP"):
+        try:
+            return read_exr_with_openexr(path, channels, dtype)
+        except ImportError:
+            raise Exception(f"{path} uses {header.compression}; install the OpenEXR package to read it.")
+    names = [name for name, _ in header.channels]
+    channels = channels or default_channels(names)
+    missing = [name for name in channels if name not in names]
+    if missing:
+        raise Exception(f"{path} has no channels {missing}; available: {names}.")
+    lines = read_lines(header)
+    image = np.empty((header.height, header.width, len(channels)), dtype=dtype or header.channels[0][1])
+    for index, name in enumerate(channels):
+        image[:, :, index] = lines[name]
+    return image
+
+
+def read_manifests(directory, names):
+    frames = {}
+    for name in sorted(name for name in names if name.startswith("manifest") and name.endswith(".json")):
+        with open(os.path.join(directory, name), 'r') as f:
+            frames.update(json.load(f)["frames"])
+    return frames
+
+
+class FrameDataset:
+    # Frames of one or more sequence directories joined with their pose records.
+    # view selects a camera subfolder (e.g. "flying_camera") of multi-camera sequences.
+    # Only frames with both an image on disk and a pose record are indexed; with verify=True
+    # the sizes recorded in the manifest must match as well.
+    def __init__(self, directories, view=None, channels=None, dtype=np.float32, verify=True):
+        self.view = view
+        self.channels = channels
+        self.dtype = dtype
+        self.paths = []
+        self.frames = []
+        self.rows = []
+        for directory in directories:
+            self.index_sequence(directory, verify)
+        self.frames = np.array(self.frames, dtype=np.int64)
+
+    @classmethod
+    def from_root(cls, root, **options):
+        directories = sorted(entry.path for entry in os.scandir(root) if entry.is_dir() and entry.name.startswith("seq_"))
+        return cls(directories, **options)
+
+    def index_sequence(self, directory, verify):
+        image_dir = os.path.join(directory, self.view) if self.view else directory
+        listing = {entry.name: entry for entry in os.scandir(image_dir)}
+        recorded = read_manifests(image_dir, listing)
+        pose_column = f"image_paths.{self.view}" if self.view else "image_path"
+        for timestamp, row in sorted(read_pose_rows(directory).items()):
+            entry = recorded.get(str(timestamp))
+            if entry is not None:
+                name = entry["image_path"]
+            elif pose_column in row:
+                name = os.path.basename(row[pose_column])
+            else:
+                name = os.path.basename(row["image_path"])
+            if name not in listing:
+                continue
+            if verify and entry is not None and listing[name].stat().st_size != entry["size"]:
+                continue
+            self.paths.append(os.path.join(image_dir, name))
+            self.frames.append(timestamp)
+            self.rows.append(row)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        return {"frame": int(self.frames[index]), "path": self.paths[index], "image": self.image(index),
+                "pose": unflatten_record(self.rows[index])}
+
+    def image(self, index):
+        return read_exr(self.paths[index], self.channels, self.dtype)
+
+    # Numeric pose columns for the given frame indices, one array per flattened field
+    def pose_columns(self, indices):
+        columns = {}
+        for name, value in self.rows[indices[0]].items():
+            if isinstance(value, str):
+                continue
+            columns[name] = np.array([self.rows[index][name] for index in indices])
+        return columns
+
+    def batch(self, indices, images=None):
+        indices = list(indices)
+        if images is None:
+            images = [self.image(index) for index in indices]
+        return {"frames": self.frames[indices], "images": np.stack(images), "poses": self.pose_columns(indices)}
+
+    # Batches in order (or shuffled), with up to prefetch batches decoding ahead on worker threads
+    def iter_batches(self, batch_size, shuffle=False, seed=None, workers=4, prefetch=2, drop_last=False):
+        order = list(range(len(self)))
+        if shuffle:
+            random.Random(seed).shuffle(order)
+        batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+        if drop_last and batches and len(batches[-1]) < batch_size:
+            batches.pop()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for indices in batches:
+                pending.append((indices, [executor.submit(self.image, index) for index in indices]))
+                if len(pending) > prefetch:
+                    ready, futures = pending.popleft()
+                    yield self.batch(ready, [future.result() for future in futures])
+            while pending:
+                ready, futures = pending.popleft()
+                yield self.batch(ready, [future.result() for future in futures])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read a rendered dataset and report loader throughput")
+    parser.add_argument("root", help="Dataset directory holding seq_NNNN folders")
+    parser.add_argument("--view", default=None, help="Camera subfolder of multi-camera sequences")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4, help="Decoding threads")
+    parser.add_argument("--prefetch", type=int, default=2, help="Batches decoded ahead")
+    parser.add_argument("--shuffle", action="store_true")
+    options = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = FrameDataset.from_root(options.root, view=options.view)
+    index_seconds = time.perf_counter() - start
+    print(f"Indexed {len(dataset)} frames in {index_seconds:.2f}s")
+
+    file_bytes = sum(os.path.getsize(path) for path in dataset.paths)
+    start = time.perf_counter()
+    frames = 0
+    for batch in dataset.iter_batches(options.batch_size, shuffle=options.shuffle, workers=options.workers,
+                                      prefetch=options.prefetch):
+        frames += len(batch["frames"])
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        "frames": frames,
+        "index_seconds": round(index_seconds, 3),
+        "read_seconds": round(seconds, 3),
+        "frames_per_second": round(frames / seconds, 1) if seconds > 0 else 0.0,
+        "file_mb_per_second": round(file_bytes / seconds / 1e6, 1) if seconds > 0 else 0.0,
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    main()
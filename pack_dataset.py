@@ -0,0 +1,266 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import time
+
+
+# Pack finished sequences into a few tar shards with a JSON index, without Blender.
+#
+# Copying a seq_NNNN folder file by file is dominated by per-file overhead, so every file of
+# the sequence (EXRs in frame order, camera subfolders, poses.npz, manifests, logs) is streamed
+# into shards of about --shard-size bytes. Files are copied in chunks and hashed on the way, so
+# memory stays bounded whatever the sequence size. The index records for each member its shard,
+# the byte offset of its data and its SHA-256, so a reader can seek straight to one frame in an
+# uncompressed shard. Each EXR's hash is checked against the one recorded in the render manifest
+# while packing, and `verify` re-reads the shards later.
+#
+# EXRs are already compressed, so shards are plain tar by default; --gzip trades packing time
+# for smaller logs and pose files (offsets then refer to the decompressed stream).
+#
+# Command line:
+#   python pack_dataset.py pack nlos_dataset/seq_0005 nlos_dataset/seq_0006 --output-dir packed/
+#   python pack_dataset.py verify packed/seq_0005.index.json
+
+CHUNK_SIZE = 1 << 20
+INDEX_VERSION = 1
+
+# Files left behind by interrupted writes are never packed
+SKIPPED_SUFFIXES = (".tmp", ".stream.jsonl")
+
+
+def parse_size(text):
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+class HashingReader:
+    # File object wrapper that hashes everything read through it
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_manifest(name):
+    base = os.path.basename(name)
+    return base.startswith("manifest") and base.endswith(".json")
+
+
+# Expected SHA-256 per member name from the manifests of a sequence (camera subfolders included),
+# given as {member name: parsed manifest}
+def manifest_hashes(manifests):
+    expected = {}
+    for name, manifest in manifests.items():
+        directory = os.path.dirname(name)
+        for frame, entry in manifest["frames"].items():
+            expected[os.path.join(directory, entry["image_path"])] = {"frame": int(frame), "sha256": entry["sha256"]}
+    return expected
+
+
+def read_manifests(sequence_dir, members):
+    manifests = {}
+    for name in filter(is_manifest, members):
+        with open(os.path.join(sequence_dir, name), 'r') as f:
+            manifests[name] = json.load(f)
+    return manifests
+
+
+# Member names relative to the sequence folder: EXRs in frame order first, then everything else
+def sequence_members(sequence_dir):
+    members = []
+    for directory, _, names in os.walk(sequence_dir):
+        for name in names:
+            if not name.endswith(SKIPPED_SUFFIXES):
+                members.append(os.path.relpath(os.path.join(directory, name), sequence_dir))
+    return sorted(members, key=lambda name: (not name.endswith(".exr"), name))
+
+
+class ShardWriter:
+    # Writes members into <prefix>-NNNNN.tar[.gz], starting a new shard past shard_size bytes
+    def __init__(self, output_dir, prefix, shard_size, gzip):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.gzip = gzip
+        self.shards = []
+        self.tar = None
+
+    def open_shard(self):
+        suffix = ".tar.gz" if self.gzip else ".tar"
+        name = f"{self.prefix}-{len(self.shards):05d}{suffix}"
+        self.path = os.path.join(self.output_dir, name)
+        self.tar = tarfile.open(self.path + ".tmp", 'w:gz' if self.gzip else 'w', format=tarfile.PAX_FORMAT)
+        self.shards.append({"name": name, "members": 0})
+        self.written = 0
+
+    def close_shard(self):
+        self.tar.close()
+        self.tar = None
+        os.replace(self.path + ".tmp", self.path)
+        shard = self.shards[-1]
+        shard["size"] = os.path.getsize(self.path)
+        shard["sha256"] = file_sha256(self.path)
+
+    def add(self, path, name):
+        if self.tar is None or (self.written and self.written + os.path.getsize(path) > self.shard_size):
+            if self.tar is not None:
+                self.close_shard()
+            self.open_shard()
+        info = self.tar.gettarinfo(path, arcname=name)
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        with open(path, 'rb') as f:
+            reader = HashingReader(f)
+            self.tar.addfile(info, reader)
+        self.written += info.size
+        self.shards[-1]["members"] += 1
+        # addfile leaves the archive at the end of the member's data, padded to whole blocks
+        blocks = -(-info.size // tarfile.BLOCKSIZE)
+        offset = self.tar.offset - blocks * tarfile.BLOCKSIZE
+        return {"shard": len(self.shards) - 1, "offset": offset, "size": info.size,
+                "sha256": reader.digest.hexdigest()}
+
+    def close(self):
+        if self.tar is not None:
+            self.close_shard()
+        return self.shards
+
+
+def pack_sequence(sequence_dir, output_dir, shard_size, gzip=False):
+    start = time.perf_counter()
+    sequence = os.path.basename(os.path.normpath(sequence_dir))
+    os.makedirs(output_dir, exist_ok=True)
+    members = sequence_members(sequence_dir)
+    expected = manifest_hashes(read_manifests(sequence_dir, members))
+
+    writer = ShardWriter(output_dir, sequence, shard_size, gzip)
+    index_members = {}
+    for name in members:
+        entry = writer.add(os.path.join(sequence_dir, name), name)
+        if name in expected:
+            if entry["sha256"] != expected[name]["sha256"]:
+                writer.close()
+                raise Exception(f"{sequence}/{name} does not match the SHA-256 in its manifest.")
+            entry["frame"] = expected[name]["frame"]
+        index_members[name] = entry
+    shards = writer.close()
+
+    missing = sorted(set(expected) - set(index_members))
+    if missing:
+        raise Exception(f"{sequence}: {len(missing)} frames in the manifest are missing on disk, e.g. {missing[0]}.")
+
+    index = {
+        "version": INDEX_VERSION,
+        "sequence": sequence,
+        "compression": "gzip" if gzip else None,
+        "shards": shards,
+        "members": index_members,
+        "frames": len(expected),
+        "bytes": sum(entry["size"] for entry in index_members.values()),
+    }
+    index_path = os.path.join(output_dir, f"{sequence}.index.json")
+    with open(index_path + ".tmp", 'w') as f:
+        json.dump(index, f, indent=4)
+    os.replace(index_path + ".tmp", index_path)
+    seconds = time.perf_counter() - start
+    print(f"Packed {sequence}: {len(index_members)} files ({len(expected)} frames, {index['bytes'] / 1e6:.1f} MB) "
+          f"into {len(shards)} shards in {seconds:.1f}s")
+    return index_path
+
+
+# Re-read every shard and check shard and member hashes against the index, and every frame
+# against the render manifests packed with it; returns a list of problems
+def verify_index(index_path):
+    with open(index_path, 'r') as f:
+        index = json.load(f)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    by_shard = {}
+    for name, entry in index["members"].items():
+        by_shard.setdefault(entry["shard"], {})[name] = entry
+
+    problems = []
+    hashes = {}
+    manifests = {}
+    for number, shard in enumerate(index["shards"]):
+        path = os.path.join(directory, shard["name"])
+        if not os.path.exists(path):
+            problems.append(f"{shard['name']}: missing")
+            continue
+        if file_sha256(path) != shard["sha256"]:
+            problems.append(f"{shard['name']}: SHA-256 does not match the index")
+        expected = by_shard.get(number, {})
+        seen = set()
+        with tarfile.open(path, 'r:*') as tar:
+            for info in tar:
+                entry = expected.get(info.name)
+                if entry is None:
+                    problems.append(f"{shard['name']}: unexpected member {info.name}")
+                    continue
+                seen.add(info.name)
+                reader = HashingReader(tar.extractfile(info))
+                if is_manifest(info.name):
+                    manifests[info.name] = json.loads(reader.read())
+                while reader.read(CHUNK_SIZE):
+                    pass
+                hashes[info.name] = reader.digest.hexdigest()
+                if hashes[info.name] != entry["sha256"] or info.size != entry["size"]:
+                    problems.append(f"{shard['name']}: {info.name} does not match the index")
+        for name in sorted(set(expected) - seen):
+            problems.append(f"{shard['name']}: {name} is missing")
+
+    for name, entry in sorted(manifest_hashes(manifests).items()):
+        if hashes.get(name) != entry["sha256"]:
+            problems.append(f"{name}: frame {entry['frame']} does not match its manifest")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack rendered sequences into tar shards and verify them")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack", help="Pack sequence folders into shards")
+    pack.add_argument("sequences", nargs="+", help="seq_NNNN folders")
+    pack.add_argument("--output-dir", default="packed/", help="Directory for shards and indexes")
+    pack.add_argument("--shard-size", default="1G", help="Target shard size, e.g. 512M or 2G")
+    pack.add_argument("--gzip", action="store_true", help="Compress shards with gzip")
+
+    verify = commands.add_parser("verify", help="Check shards against their index")
+    verify.add_argument("indexes", nargs="+", help="<sequence>.index.json files")
+
+    options = parser.parse_args()
+    if options.command == "pack":
+        for sequence_dir in options.sequences:
+            pack_sequence(sequence_dir, options.output_dir, parse_size(options.shard_size), options.gzip)
+        return
+
+    failed = False
+    for index_path in options.indexes:
+        problems = verify_index(index_path)
+        for problem in problems:
+            print(problem)
+        print(f"{index_path}: {'FAILED' if problems else 'OK'}")
+        failed = failed or bool(problems)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,517 @@
 import bpy
+import bmesh
 import math
 import random
 import os
-from mathutils import Vector, Euler
+import sys
+import argparse
+import hashlib
 import json
-
-
-# Set the number of frames per folder
-frames_per_folder = 1000
-
-# Starting folder number (change this)
-starting_folder_number = 5
-
-
-
-
-# Clear existing objects
-bpy.ops.object.select_all(action='SELECT')
-bpy.ops.object.delete()
-
-# Set render engine to Cycles
-bpy.context.scene.render.engine = 'CYCLES'
-
-# Set device to GPU
-bpy.context.scene.cycles.device = 'GPU'
-
-# Enable all available GPUs
-bpy.context.preferences.addons['cycles'].preferences.get_devices()
-for d in bpy.context.preferences.addons['cycles'].preferences.devices:
-    d.use = True
-
-# Optionally, set tile size for GPU rendering (e.g. 256x256)
-bpy.context.scene.cycles.tile_x = 1024
-bpy.context.scene.cycles.tile_y = 1024
-
-# Set maximum bounces for the Cycles renderer
-bpy.context.scene.cycles.max_bounces = 36  # Set a higher value (default is 12)
-
-# Set diffuse bounces (light bouncing off surfaces)
-bpy.context.scene.cycles.diffuse_bounces = 12  # Increase for more light scattering (default is 4)
-
-# Set specular bounces (light reflections on shiny surfaces)
-bpy.context.scene.cycles.specular_bounces = 12  # Increase for better reflections (default is 8)
-
-# Set transmission bounces (light passing through transparent materials)
-bpy.context.scene.cycles.transmission_bounces = 12  # Increase for more refraction (default is 12)
-
-# Set volume bounces (light scattering in volumes like smoke or fog)
-bpy.context.scene.cycles.volume_bounces = 2  # Increase for more volume interaction (default is 2)
-
-# Optional: You can also increase the number of light paths for better light sampling
-bpy.context.scene.cycles.samples = 1024 # Increase samples for higher quality renders (default is 128)
-
+import time
+import contextlib
+import shutil
+import tempfile
+import numpy as np
+from bpy_extras.object_utils import world_to_camera_view
+from mathutils import Vector
+
+# Make the nlos package next to this script importable inside Blender
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlos.trajectory import compute_trajectory, save_trajectory
+from nlos.pose_sink import PoseSink, read_pose_rows
+from nlos.poses import compose_matrices, world_matrices, pose_arrays, pose_record, save_ground_truth
+from nlos.scene_spec import generate_scene_spec, load_config, load_scene_spec, save_scene_spec, spec_hash
+from nlos.instrumentation import EventLog, ThroughputTracker, StallWatchdog, parse_render_stats
+from nlos.output_writer import OutputWriter, SyncOutputWriter, ensure_dir
+from nlos import layout
+
+
+# Command-line options of the render script
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Render the NLOS drone dataset")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for scene generation (a random seed is drawn and recorded if omitted)")
+    parser.add_argument("--scene-config", default=None,
+                        help="JSON file overriding the scene generator config (object/light counts, bounds, ...)")
+    parser.add_argument("--scene-spec", default=None,
+                        help="Build exactly the scene described by this spec file (its seed overrides --seed)")
+    parser.add_argument("--num-scenes", type=int, default=1,
+                        help="Render this many scene variants in one Blender process (seeds seed, seed+1, ...; one seq folder each)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse the seed stored in the sequence manifest and skip frames that are already complete")
+    parser.add_argument("--output-dir", default="nlos_dataset/",
+                        help="Base output directory for the seq_NNNN folders")
+    parser.add_argument("--frames-per-folder", type=int, default=1000,
+                        help="Number of frames per seq_NNNN folder")
+    parser.add_argument("--starting-folder-number", type=int, default=5,
+                        help="Folder number of the first sequence")
+    parser.add_argument("--total-frames", type=int, default=None,
+                        help="Length of the animation in frames (defaults to one folder)")
+    parser.add_argument("--frame-start", type=int, default=None,
+                        help="First frame this process renders (defaults to the start of the animation)")
+    parser.add_argument("--frame-end", type=int, default=None,
+                        help="Last frame this process renders (defaults to the end of the animation)")
+    parser.add_argument("--worker-id", type=int, default=None,
+                        help="Worker index when launched by launcher.py; manifests and logs get a per-worker suffix")
+    parser.add_argument("--render-profile", default="reference", choices=["preview", "train", "reference"],
+                        help="Named sampling/light-path profile (reference matches the original 1024-sample settings)")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="Override the profile's sample count (also disables its time limit)")
+    parser.add_argument("--cycles-device", default="GPU",
+                        help="CPU, GPU (all devices of the configured backend), or a GPU backend such as CUDA, OPTIX, HIP or METAL")
+    parser.add_argument("--resolution", default=None,
+                        help="Output resolution as WIDTHxHEIGHT (defaults to the scene's resolution)")
+    parser.add_argument("--resolution-percentage", type=int, default=None,
+                        help="Render at this percentage of the resolution (e.g. 50 renders a quarter of the pixels)")
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="Cycles tile size in pixels (defaults to Blender's automatic tiling)")
+    parser.add_argument("--border", default=None,
+                        help="Render only this region, as MIN_X,MIN_Y,MAX_X,MAX_Y fractions of the frame (origin bottom left)")
+    parser.add_argument("--roi", default=None,
+                        help="Comma-separated objects whose projection in the hovering camera sets the render border, "
+                             "e.g. 'NLOS Surface'")
+    parser.add_argument("--roi-size", default=None,
+                        help="Fixed WIDTHxHEIGHT pixel crop centred on the --roi region (e.g. 256x256)")
+    parser.add_argument("--no-crop", action="store_true",
+                        help="Keep the full frame size with a border (pixels outside it stay empty)")
+    parser.add_argument("--cameras", default="camera",
+                        help="Comma-separated cameras rendered for every frame: camera (hovering drone), flying_camera")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Static-camera mode: render the background once at full quality and each frame at low "
+                             "samples, compositing background + (frame - low-sample background)")
+    parser.add_argument("--incremental-samples", type=int, default=64,
+                        help="Samples of the per-frame and low-sample background renders in --incremental mode")
+    parser.add_argument("--incremental-check", type=int, default=50,
+                        help="Compare every Nth incremental frame against a full render (0 disables the check)")
+    parser.add_argument("--incremental-max-error", type=float, default=0.02,
+                        help="Relative mean absolute error above which incremental mode falls back to full renders")
+    parser.add_argument("--exr-codec", default="ZIP",
+                        choices=["NONE", "ZIP", "ZIPS", "PIZ", "PXR24", "RLE", "B44", "DWAA", "DWAB"],
+                        help="EXR compression codec (PXR24, B44, DWAA and DWAB are lossy)")
+    parser.add_argument("--exr-half", action="store_true",
+                        help="Store half-float (16-bit) channels instead of full float")
+    parser.add_argument("--no-alpha", action="store_true",
+                        help="Write RGB instead of RGBA")
+    parser.add_argument("--passes", default="",
+                        help="Comma-separated extra render passes written as a multilayer EXR: "
+                             "depth, normal, diffuse_direct, diffuse_indirect, glossy_direct, glossy_indirect")
+    parser.add_argument("--stall-seconds", type=float, default=1800.0,
+                        help="Log a stall event when no frame finishes for this many seconds (0 disables the check)")
+    parser.add_argument("--stats-json", default=None,
+                        help="Write per-stage wall times, peak RSS and frames/hour to this JSON file when done")
+    parser.add_argument("--pose-json", action="store_true",
+                        help="Also write the legacy per-frame pose JSON files next to the columnar poses.npz")
+    parser.add_argument("--no-pose-streaming", action="store_true",
+                        help="Keep pose records in memory until the end instead of streaming them to disk")
+    parser.add_argument("--output-writer", default="async", choices=["async", "sync"],
+                        help="Copy, hash and fsync finished frames in a background process (async) or inline (sync)")
+    parser.add_argument("--writer-queue", type=int, default=4,
+                        help="Maximum number of frames waiting for the async writer")
+    parser.add_argument("--scratch-dir", default=None,
+                        help="Local directory Blender writes EXRs to before the async writer moves them (defaults to a temp dir)")
+    parser.add_argument("--no-fsync", action="store_true",
+                        help="Do not fsync output files (faster on local disks, less safe on crashes)")
+    parser.add_argument("--scene-cache", default="scene_cache/",
+                        help="Directory of cached .blend scenes keyed by seed and generator parameters")
+    parser.add_argument("--no-scene-cache", action="store_true",
+                        help="Always build the scene from scratch and do not write a cache file")
+    parser.add_argument("--build-only", action="store_true",
+                        help="Build (or load) the scene, write the cache and exit without rendering")
+    options = parser.parse_args(argv)
+    if options.stall_seconds < 0:
+        parser.error("--stall-seconds must be 0 (disabled) or a positive number of seconds")
+    return options
+
+# Per-sequence manifest (frame -> EXR path, size, checksum, render seconds).
+# Workers write their own shard, which launcher.py merges into manifest.json.
+MANIFEST_NAME = "manifest.json"
+
+# Cameras rendered for every frame, by ground-truth name. With more than one camera each one
+# writes to its own subfolder (seq_NNNN/<camera>/) with its own manifest; poses stay shared per sequence.
+CAMERA_OBJECTS = {"camera": "Drone Camera", "flying_camera": "Flying Drone Camera"}
+
+# Subfolder a camera's images and manifest go to ("" keeps them in the sequence folder)
+def view_of(camera_name):
+    return camera_name if multi_view else ""
+
+# Per-view manifests written by this process, keyed by (folder number, view)
+manifests = {}
+
+# Frames recorded by any manifest of the view (this or earlier runs and workers), keyed by (folder number, view)
+recorded_frames = {}
+
+# Timestamps with a pose row in any pose file of the sequence, keyed by folder number
+recorded_poses = {}
+
+# Columnar pose sinks written by this process, keyed by folder number
+pose_sinks = {}
+
+def sequence_dir(folder_number):
+    return layout.sequence_dir(base_output_dir, folder_number)
+
+def view_dir(folder_number, view):
+    return os.path.join(sequence_dir(folder_number), view) if view else sequence_dir(folder_number)
+
+def read_manifest(directory, name=MANIFEST_NAME):
+    manifest_path = os.path.join(directory, name)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+def read_all_manifests(directory):
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.startswith("manifest") and name.endswith(".json"))
+    return [read_manifest(directory, name) for name in names]
+
+def get_manifest(folder_number, view):
+    key = (folder_number, view)
+    if key not in manifests:
+        manifest = read_manifest(view_dir(folder_number, view), manifest_name) if args.resume else None
+        if manifest is None:
+            manifest = {"seed": seed, "scene_spec": spec_hash(scene_spec), "frames_per_folder": frames_per_folder,
+                        "render_profile": args.render_profile, "render_settings": render_settings,
+                        "output_format": output_format, "framing": framing,
+                        "trajectory_validation": scene_spec["flying_drone"].get("validation"),
+                        "incremental": incremental_state if args.incremental else None, "frames": {}}
+            if view:
+                manifest["camera"] = view
+        manifests[key] = manifest
+    return manifests[key]
+
+def get_recorded_frames(folder_number, view):
+    key = (folder_number, view)
+    if key not in recorded_frames:
+        frames = {}
+        for manifest in read_all_manifests(view_dir(folder_number, view)):
+            if manifest["seed"] != seed:
+                raise Exception(f"Manifest for seq_{folder_number:04d} was rendered with seed {manifest['seed']}, not {seed}.")
+            # The same seed with another --scene-config or --scene-spec is a different scene
+            if manifest.get("scene_spec") != spec_hash(scene_spec):
+                raise Exception(f"Manifest for seq_{folder_number:04d} was rendered from scene spec "
+                                f"{manifest.get('scene_spec')}, not {spec_hash(scene_spec)}.")
+            frames.update(manifest["frames"])
+        recorded_frames[key] = frames
+    return recorded_frames[key]
+
+def get_recorded_poses(folder_number):
+    if folder_number not in recorded_poses:
+        recorded_poses[folder_number] = set(read_pose_rows(sequence_dir(folder_number)))
+    return recorded_poses[folder_number]
+
+def get_pose_sink(folder_number):
+    if folder_number not in pose_sinks:
+        pose_sinks[folder_number] = PoseSink(sequence_dir(folder_number), f"poses{worker_suffix}",
+                                             streaming=not args.no_pose_streaming, resume=args.resume)
+    return pose_sinks[folder_number]
+
+def close_pose_sinks():
+    for sink in pose_sinks.values():
+        sink.close()
+    pose_sinks.clear()
+
+def write_manifest(folder_number, view):
+    # Write to a temporary file first so a crash never leaves a truncated manifest
+    manifest_path = os.path.join(view_dir(folder_number, view), manifest_name)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w') as manifest_file:
+        json.dump(manifests[(folder_number, view)], manifest_file, indent=4)
+    os.replace(tmp_path, manifest_path)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# A view of a frame is complete when its manifest entry exists and the files on disk still match it
+def view_is_complete(folder_number, view, frame):
+    entry = get_recorded_frames(folder_number, view).get(str(frame))
+    if entry is None:
+        return False
+    output_dir = view_dir(folder_number, view)
+    image_path = os.path.join(output_dir, entry["image_path"])
+    if not os.path.exists(image_path):
+        return False
+    if entry["json_path"] and not os.path.exists(os.path.join(output_dir, entry["json_path"])):
+        return False
+    if os.path.getsize(image_path) != entry["size"]:
+        return False
+    return file_sha256(image_path) == entry["sha256"]
+
+# A frame is complete when its pose row and every camera's image are recorded
+def frame_is_complete(folder_number, frame):
+    if frame not in get_recorded_poses(folder_number):
+        return False
+    return all(view_is_complete(folder_number, view_of(camera_name), frame) for camera_name in render_cameras)
+
+# Fully resolved scene description; every random choice of the scene is made here
+def make_scene_spec(scene_seed):
+    scene_config = load_config(args.scene_config) if args.scene_config else {}
+    scene_config["frame_end"] = args.total_frames or frames_per_folder
+    return generate_scene_spec(scene_seed, scene_config)
+
+# Wall time spent in each pipeline stage (written with --stats-json)
+stage_times = {}
+
+def record_stage(name, seconds):
+    entry = stage_times.setdefault(name, {"seconds": 0.0, "count": 0})
+    entry["seconds"] += seconds
+    entry["count"] += 1
+
+@contextlib.contextmanager
+def timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+# Peak resident set size of this process in MB (None where the resource module is unavailable)
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# Named render profiles: sampling, noise threshold, time limit and light paths applied as a unit.
+# "reference" reproduces the original settings; denoising stays off in every profile to preserve NLOS signals.
+RENDER_PROFILES = {
+    "preview": {
+        "samples": 64,
+        "use_adaptive_sampling": True,
+        "adaptive_threshold": 0.1,
+        "adaptive_min_samples": 16,
+        "time_limit": 10.0,
+        "max_bounces": 8,
+        "diffuse_bounces": 4,
+        "glossy_bounces": 4,
+        "transmission_bounces": 4,
+        "volume_bounces": 0,
+        "use_denoising": False,
+    },
+    "train": {
+        "samples": 256,
+        "use_adaptive_sampling": True,
+        "adaptive_threshold": 0.02,
+        "adaptive_min_samples": 64,
+        "time_limit": 0.0,
+        "max_bounces": 24,
+        "diffuse_bounces": 8,
+        "glossy_bounces": 8,
+        "transmission_bounces": 8,
+        "volume_bounces": 2,
+        "use_denoising": False,
+    },
+    "reference": {
+        "samples": 1024,
+        "use_adaptive_sampling": False,
+        "adaptive_threshold": 0.0,
+        "adaptive_min_samples": 0,
+        "time_limit": 0.0,
+        "max_bounces": 36,
+        "diffuse_bounces": 12,
+        "glossy_bounces": 12,
+        "transmission_bounces": 12,
+        "volume_bounces": 2,
+        "use_denoising": False,
+    },
+}
+
+# Settings actually applied by the active profile (recorded in each frame's metadata)
+render_settings = {}
+
+def apply_render_profile(name):
+    cycles = bpy.context.scene.cycles
+    settings = dict(RENDER_PROFILES[name])
+    if args.samples is not None:
+        settings["samples"] = args.samples
+        settings["time_limit"] = 0.0
+    render_settings.clear()
+    for key, value in settings.items():
+        # Skip settings this Blender version does not have
+        if hasattr(cycles, key):
+            setattr(cycles, key, value)
+            render_settings[key] = value
+    print(f"Render profile '{name}': {render_settings}")
+
+# Render passes that can be added to the EXR, mapped to their view layer flags
+RENDER_PASSES = {
+    "depth": "use_pass_z",
+    "normal": "use_pass_normal",
+    "diffuse_direct": "use_pass_diffuse_direct",
+    "diffuse_indirect": "use_pass_diffuse_indirect",
+    "glossy_direct": "use_pass_glossy_direct",
+    "glossy_indirect": "use_pass_glossy_indirect",
+}
+
+# Output format actually applied (recorded in each sequence manifest)
+output_format = {}
+
+def configure_output_format():
+    passes = [name.strip() for name in args.passes.split(",") if name.strip()]
+    for name in passes:
+        if name not in RENDER_PASSES:
+            raise Exception(f"Unknown render pass '{name}'; choose from {', '.join(RENDER_PASSES)}.")
+
+    # Extra passes only survive in a multilayer EXR
+    view_layer = bpy.context.view_layer
+    for name, flag in RENDER_PASSES.items():
+        setattr(view_layer, flag, name in passes)
+
+    image_settings = bpy.context.scene.render.image_settings
+    image_settings.file_format = 'OPEN_EXR_MULTILAYER' if passes else 'OPEN_EXR'
+    image_settings.color_mode = 'RGB' if args.no_alpha else 'RGBA'
+    image_settings.color_depth = '16' if args.exr_half else '32'
+    image_settings.exr_codec = args.exr_codec
+
+    output_format.clear()
+    output_format.update({
+        "file_format": image_settings.file_format,
+        "color_mode": image_settings.color_mode,
+        "color_depth": image_settings.color_depth,
+        "exr_codec": image_settings.exr_codec,
+        "passes": passes,
+    })
+    print(f"Output format: {output_format}")
+
+# Render settings are applied on every run, after the scene has been built or loaded from the cache
+def configure_render_settings():
+    # Set render engine to Cycles
+    bpy.context.scene.render.engine = 'CYCLES'
+
+    if args.cycles_device == 'CPU':
+        bpy.context.scene.cycles.device = 'CPU'
+    else:
+        # Select the GPU backend if one was named
+        cycles_preferences = bpy.context.preferences.addons['cycles'].preferences
+        if args.cycles_device != 'GPU':
+            cycles_preferences.compute_device_type = args.cycles_device
+
+        # Set device to GPU
+        bpy.context.scene.cycles.device = 'GPU'
+
+        # Enable all available GPUs
+        cycles_preferences.get_devices()
+        for d in cycles_preferences.devices:
+            d.use = True
+
+    # Override the output resolution
+    if args.resolution:
+        width, height = (int(value) for value in args.resolution.lower().split("x"))
+        bpy.context.scene.render.resolution_x = width
+        bpy.context.scene.render.resolution_y = height
+        bpy.context.scene.render.resolution_percentage = 100
+    if args.resolution_percentage:
+        bpy.context.scene.render.resolution_percentage = args.resolution_percentage
+
+    # Tile size: Cycles X tiles only split very large images, older versions tile per render
+    if args.tile_size:
+        cycles = bpy.context.scene.cycles
+        if hasattr(cycles, "tile_size"):
+            cycles.use_auto_tile = True
+            cycles.tile_size = args.tile_size
+        elif hasattr(bpy.context.scene.render, "tile_x"):
+            bpy.context.scene.render.tile_x = args.tile_size
+            bpy.context.scene.render.tile_y = args.tile_size
+
+    # Sampling and light-path settings come from the selected render profile
+    apply_render_profile(args.render_profile)
+
+    # EXR codec, precision, alpha and render passes
+    configure_output_format()
+
+    # Keep the BVH and scene data between renders so extra cameras only cost their render time
+    if multi_view:
+        bpy.context.scene.render.use_persistent_data = True
+
+
+# Resolution, tiling and border actually applied (recorded in each sequence manifest)
+framing = {}
+
+def parse_fractions(text):
+    values = [float(value) for value in text.split(",")]
+    if len(values) != 4 or not (0 <= values[0] < values[2] <= 1 and 0 <= values[1] < values[3] <= 1):
+        raise Exception(f"Border '{text}' must be MIN_X,MIN_Y,MAX_X,MAX_Y with 0 <= min < max <= 1.")
+    return values
+
+# Frame region [min_x, min_y, max_x, max_y] covered by the named objects as seen from the camera.
+# Points are sampled over each object's bounding box so that parts behind the camera or outside
+# the frame are simply left out.
+def roi_border(object_names, camera_object, samples=9):
+    scene = bpy.context.scene
+    scene.frame_set(scene.frame_start)
+    steps = np.linspace(0.0, 1.0, samples)
+    projected = []
+    for name in object_names:
+        obj = bpy.data.objects.get(name)
+        if obj is None:
+            raise Exception(f"ROI object '{name}' is not in the scene.")
+        corners = np.array([obj.matrix_world @ Vector(corner) for corner in obj.bound_box])
+        low, high = corners.min(axis=0), corners.max(axis=0)
+        for fx in steps:
+            for fy in steps:
+                for fz in steps:
+                    point = low + (high - low) * np.array([fx, fy, fz])
+                    view = world_to_camera_view(scene, camera_object, Vector(point))
+                    if view.z > 0 and 0 <= view.x <= 1 and 0 <= view.y <= 1:
+                        projected.append((view.x, view.y))
+    if not projected:
+        raise Exception(f"ROI objects {object_names} are not visible from {camera_object.name}.")
+    projected = np.array(projected)
+    return [*projected.min(axis=0).tolist(), *projected.max(axis=0).tolist()]
+
+# Fixed-size pixel window centred on border, shifted to stay inside the frame
+def fixed_size_border(border, width, height):
+    render = bpy.context.scene.render
+    frame_width = render.resolution_x * render.resolution_percentage / 100
+    frame_height = render.resolution_y * render.resolution_percentage / 100
+    if width > frame_width or height > frame_height:
+        raise Exception(f"--roi-size {width}x{height} is larger than the {frame_width:.0f}x{frame_height:.0f} frame.")
+    size_x, size_y = width / frame_width, height / frame_height
+    min_x = min(max((border[0] + border[2] - size_x) / 2, 0.0), 1.0 - size_x)
+    min_y = min(max((border[1] + border[3] - size_y) / 2, 0.0), 1.0 - size_y)
+    return [min_x, min_y, min_x + size_x, min_y + size_y]
+
+def configure_framing():
+    render = bpy.context.scene.render
+    border = None
+    if args.border:
+        border = parse_fractions(args.border)
+    elif args.roi:
+        border = roi_border([name.strip() for name in args.roi.split(",")], bpy.data.objects[CAMERA_OBJECTS["camera"]])
+        if args.roi_size:
+            width, height = (int(value) for value in args.roi_size.lower().split("x"))
+            border = fixed_size_border(border, width, height)
+
+    render.use_border = border is not None
+    render.use_crop_to_border = border is not None and not args.no_crop
+    if border is not None:
+        render.border_min_x, render.border_min_y, render.border_max_x, render.border_max_y = border
+
+    scale = render.resolution_percentage / 100
+    width, height = int(render.resolution_x * scale), int(render.resolution_y * scale)
+    framing.clear()
+    framing.update({
+        "resolution": [render.resolution_x, render.resolution_y],
+        "resolution_percentage": render.resolution_percentage,
+        "tile_size": args.tile_size,
+        "border": [round(value, 6) for value in border] if border else None,
+        "crop": render.use_crop_to_border,
+        "roi": args.roi,
+    })
+    if border:
+        width = round(width * (border[2] - border[0]))
+        height = round(height * (border[3] - border[1]))
+    framing["rendered_pixels"] = [width, height]
+    print(f"Framing: {framing}")
 
 def check_gpu_usage():
     if bpy.context.scene.cycles.device == 'GPU':
@@ -59,9 +519,6 @@ def check_gpu_usage():
     else:
         print("GPU rendering is not enabled.")
 
-# Check GPU usage before rendering
-check_gpu_usage()
-
 # Create room (with top and taller walls)
 def create_room():
     # Define vertices for the room, now with a top
@@ -96,274 +553,303 @@ def create_room():
     
     return obj
 
-# Create the room
-room = create_room()
 
 
 
 
+# Material library: one shared material per type, whatever the number of objects.
+# Types whose colour varies per object read it from the object's color attribute (Object Info > Color),
+# so they still compile to a single shader.
+PER_OBJECT_COLOR_TYPES = {"Plastic"}
 
-# Function to create a realistic material 
-def create_realistic_material():
-    material_type = random.choice(['Metal', 'Plastic', 'Wood', 'Glass', 'Stone'])
-    mat = bpy.data.materials.new(name=f"Realistic_{material_type}")
+def get_library_material(material):
+    name = f"Library_{material['type']}"
+    mat = bpy.data.materials.get(name)
+    if mat is not None:
+        return mat
+
+    mat = bpy.data.materials.new(name=name)
     mat.use_nodes = True  # Enable node-based material
+    mat.use_fake_user = True  # Keep the preset across multi-scene resets and orphan purges
     bsdf = mat.node_tree.nodes["Principled BSDF"]
-
-    if material_type == 'Metal':
-        # Metal Material
-        bsdf.inputs['Base Color'].default_value = (0.8, 0.8, 0.8, 1)  # Light gray metal
-        bsdf.inputs['Metallic'].default_value = 1  # Fully metallic
-        bsdf.inputs['Roughness'].default_value = 0.2  # Slightly rough for a more realistic look
-    
-    elif material_type == 'Plastic':
-        # Plastic Material
-        bsdf.inputs['Base Color'].default_value = (random.random(), random.random(), random.random(), 1)  # Random plastic color
-        bsdf.inputs['Metallic'].default_value = 0  # Non-metallic
-        bsdf.inputs['Roughness'].default_value = 0.4  # Slightly rough plastic finish
-    
-    elif material_type == 'Wood':
-        # Wood Material
-        bsdf.inputs['Base Color'].default_value = (0.6, 0.3, 0.1, 1)  # Wood-like color
-        bsdf.inputs['Metallic'].default_value = 0  # Non-metallic
-        bsdf.inputs['Roughness'].default_value = 0.7  # Rough texture for wood
-    
-    elif material_type == 'Glass':
-        # Glass Material
-        bsdf.inputs['Base Color'].default_value = (1, 1, 1, 0.1)  # Transparent color (white with low alpha)
-        bsdf.inputs['Metallic'].default_value = 0  # Non-metallic
-        bsdf.inputs['Roughness'].default_value = 0.05  # Low roughness for glass
-        if "Transmission" in bsdf.inputs:
-            bsdf.inputs['Transmission'].default_value = 1  # Full transparency (glass effect)
-    
-    elif material_type == 'Stone':
-        # Stone Material
-        bsdf.inputs['Base Color'].default_value = (0.5, 0.5, 0.5, 1)  # Gray stone color
-        bsdf.inputs['Metallic'].default_value = 0  # Non-metallic
-        bsdf.inputs['Roughness'].default_value = 0.8  # High roughness for stone
-
+    bsdf.inputs['Base Color'].default_value = material["base_color"]
+    bsdf.inputs['Metallic'].default_value = material["metallic"]
+    bsdf.inputs['Roughness'].default_value = material["roughness"]
+    if "transmission" in material and "Transmission" in bsdf.inputs:
+        bsdf.inputs['Transmission'].default_value = material["transmission"]  # Glass effect
+    if material["type"] in PER_OBJECT_COLOR_TYPES:
+        object_info = mat.node_tree.nodes.new(type="ShaderNodeObjectInfo")
+        object_info.location = (-300, 0)
+        mat.node_tree.links.new(object_info.outputs["Color"], bsdf.inputs['Base Color'])
     return mat
 
-# Function to add random complex shapes on the floor
-def add_complex_random_objects_on_floor(num_objects, min_x, max_x, min_y, max_y, max_size=2.0):
-    for _ in range(num_objects):
-        # Randomly choose the object type (complex shapes)
-        object_type = random.choice(['TORUS_KNOT', 'TWISTED_CYLINDER', 'ICOSPHERE', 'SUBDIVIDED_CUBE', 
-                                     'BOOLEAN_OBJECT', 'CONE', 'TORUS', 'MONKEY', 'UV_SPHERE'])
-        
-        # Create the object based on the type
-        if object_type == 'TORUS_KNOT':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_torus_add(major_radius=2, minor_radius=0.3, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Torus Knot"
-
-        elif object_type == 'TWISTED_CYLINDER':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_cylinder_add(radius=1, depth=2, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Twisted Cylinder"
-            obj.rotation_euler.x = math.radians(90)  # Rotate to make it stand upright
-            # Add twist modifier
-            bpy.ops.object.modifier_add(type='SIMPLE_DEFORM')
-            obj.modifiers["SimpleDeform"].deform_method = 'TWIST'
-            obj.modifiers["SimpleDeform"].angle = math.radians(90)  # Twist by 90 degrees
-
-        elif object_type == 'ICOSPHERE':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=3, radius=1, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Icosphere"
-        
-        elif object_type == 'SUBDIVIDED_CUBE':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_cube_add(size=2, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Subdivided Cube"
-            # Add subdivision surface modifier
-            bpy.ops.object.modifier_add(type='SUBSURF')
-            obj.modifiers["Subdivision"].levels = 2  # Add 2 levels of subdivision
-
-        elif object_type == 'BOOLEAN_OBJECT':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_cube_add(size=2, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Boolean Object"
-            
-            # Add a sphere and use boolean modifier to subtract it from the cube
-            bpy.ops.mesh.primitive_uv_sphere_add(radius=1, location=(0, 0, 0))
-            sphere = bpy.context.object
-            sphere.name = "Sphere"
-            
-            # Add Boolean modifier to the cube and subtract the sphere
-            boolean_mod = obj.modifiers.new(name="Boolean", type='BOOLEAN')
-            boolean_mod.operation = 'DIFFERENCE'
-            boolean_mod.use_self = True
-            boolean_mod.object = sphere
-            
-            # Apply the boolean modifier
-            bpy.context.view_layer.objects.active = obj  # Make the cube the active object
-            bpy.ops.object.modifier_apply(modifier=boolean_mod.name)
-            bpy.data.objects.remove(sphere)  # Remove the sphere after operation
-
-        elif object_type == 'CONE':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_cone_add(vertices=6, radius1=1, depth=2, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Cone"
-            obj.rotation_euler.x = math.radians(90)  # Align cone to lie on the floor
-
-        elif object_type == 'TORUS':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_torus_add(major_radius=2, minor_radius=0.4, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Torus"
-            obj.rotation_euler.x = math.radians(90)  # Align torus to lie flat on the floor
-
-        elif object_type == 'MONKEY':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_monkey_add(location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "Suzanne"
-
-        elif object_type == 'UV_SPHERE':
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.mesh.primitive_uv_sphere_add(radius=1, location=(0, 0, 0))
-            obj = bpy.context.object
-            obj.name = "UV Sphere"
-
-        # Randomize position within specified bounds on the X and Y axes (floor level at Z=0)
-        obj.location.x = random.uniform(min_x, max_x)
-        obj.location.y = random.uniform(min_y, max_y)
-
-        # Correct the Z-axis position to place the object correctly on the floor
-        # Compute the object's bounding box size
-        obj_dim = obj.dimensions.z
-        obj.location.z = obj_dim / 2  # Position it so the bottom is at Z=0
-
-        # Randomize rotation (Euler angles)
-        obj.rotation_euler.x = random.uniform(0, math.pi)
-        obj.rotation_euler.y = random.uniform(0, math.pi)
-        obj.rotation_euler.z = random.uniform(0, math.pi)
-
-        # Optionally, randomize the scale of the object within a maximum size limit
-        scale_factor = random.uniform(0.5, max_size)  # Random scale factor up to max_size
-        obj.scale = (scale_factor, scale_factor, scale_factor)
+# Assign a spec material to an object: the shared preset plus the object's own colour.
+# The slot is linked to the object, so objects sharing a mesh can use different materials.
+def assign_material(obj, material):
+    obj.color = material["base_color"]
+    if not obj.material_slots:
+        obj.data.materials.append(None)
+    obj.material_slots[0].link = 'OBJECT'
+    obj.material_slots[0].material = get_library_material(material)
+
+# Object factory: every floor shape is built once as a base mesh with bmesh/bpy.data (no operators,
+# no undo or depsgraph work per object) and shared by all objects of that shape.
+# Modifiers stay per object; materials are linked to the object so the shared mesh carries no material.
+FLOOR_OBJECT_NAMES = {
+    "TORUS_KNOT": "Torus Knot",
+    "TWISTED_CYLINDER": "Twisted Cylinder",
+    "ICOSPHERE": "Icosphere",
+    "SUBDIVIDED_CUBE": "Subdivided Cube",
+    "BOOLEAN_OBJECT": "Boolean Object",
+    "CONE": "Cone",
+    "TORUS": "Torus",
+    "MONKEY": "Suzanne",
+    "UV_SPHERE": "UV Sphere",
+}
+
+# bmesh primitives take radius arguments since Blender 3.0 and "diameter" arguments (with the same meaning) before
+def bmesh_primitive(op, bm, **kwargs):
+    try:
+        return op(bm, **kwargs)
+    except TypeError:
+        return op(bm, **{key.replace("radius", "diameter"): value for key, value in kwargs.items()})
+
+def bmesh_to_mesh(name, build):
+    bm = bmesh.new()
+    build(bm)
+    mesh = bpy.data.meshes.new(name)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
+
+# Torus with Blender's default 48 x 12 segments, built from NumPy coordinates
+def torus_mesh(name, major_radius, minor_radius, major_segments=48, minor_segments=12):
+    u = np.repeat(np.arange(major_segments) * 2 * math.pi / major_segments, minor_segments)
+    v = np.tile(np.arange(minor_segments) * 2 * math.pi / minor_segments, major_segments)
+    ring = major_radius + minor_radius * np.cos(v)
+    verts = np.column_stack([ring * np.cos(u), ring * np.sin(u), minor_radius * np.sin(v)])
+    i, j = np.meshgrid(np.arange(major_segments), np.arange(minor_segments), indexing="ij")
+    i2, j2 = (i + 1) % major_segments, (j + 1) % minor_segments
+    faces = np.stack([i * minor_segments + j, i2 * minor_segments + j,
+                      i2 * minor_segments + j2, i * minor_segments + j2], axis=-1).reshape(-1, 4)
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(verts.tolist(), [], faces.tolist())
+    return mesh
+
+# Cube minus sphere, evaluated once through the depsgraph instead of modifier_apply per object
+def boolean_mesh(name):
+    cube = bpy.data.objects.new("Boolean Cube", bmesh_to_mesh("Boolean Cube", lambda bm: bmesh.ops.create_cube(bm, size=2)))
+    sphere = bpy.data.objects.new("Sphere", bmesh_to_mesh("Sphere", lambda bm: bmesh_primitive(
+        bmesh.ops.create_uvsphere, bm, u_segments=32, v_segments=16, radius=1)))
+    for obj in (cube, sphere):
+        bpy.context.scene.collection.objects.link(obj)
+    boolean_mod = cube.modifiers.new(name="Boolean", type='BOOLEAN')
+    boolean_mod.operation = 'DIFFERENCE'
+    boolean_mod.use_self = True
+    boolean_mod.object = sphere
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    mesh = bpy.data.meshes.new_from_object(cube.evaluated_get(depsgraph))
+    mesh.name = name
+    for obj in (cube, sphere):
+        temporary_mesh = obj.data
+        bpy.data.objects.remove(obj, do_unlink=True)
+        bpy.data.meshes.remove(temporary_mesh)
+    return mesh
+
+def build_base_mesh(shape, name):
+    if shape == 'TORUS_KNOT':
+        return torus_mesh(name, major_radius=2, minor_radius=0.3)
+    if shape == 'TWISTED_CYLINDER':
+        return bmesh_to_mesh(name, lambda bm: bmesh_primitive(
+            bmesh.ops.create_cone, bm, cap_ends=True, segments=32, radius1=1, radius2=1, depth=2))
+    if shape == 'ICOSPHERE':
+        return bmesh_to_mesh(name, lambda bm: bmesh_primitive(bmesh.ops.create_icosphere, bm, subdivisions=3, radius=1))
+    if shape == 'SUBDIVIDED_CUBE':
+        return bmesh_to_mesh(name, lambda bm: bmesh.ops.create_cube(bm, size=2))
+    if shape == 'BOOLEAN_OBJECT':
+        return boolean_mesh(name)
+    if shape == 'CONE':
+        return bmesh_to_mesh(name, lambda bm: bmesh_primitive(
+            bmesh.ops.create_cone, bm, cap_ends=True, segments=6, radius1=1, radius2=0, depth=2))
+    if shape == 'TORUS':
+        return torus_mesh(name, major_radius=2, minor_radius=0.4)
+    if shape == 'MONKEY':
+        return bmesh_to_mesh(name, lambda bm: bmesh.ops.create_monkey(bm))
+    if shape == 'UV_SPHERE':
+        return bmesh_to_mesh(name, lambda bm: bmesh_primitive(
+            bmesh.ops.create_uvsphere, bm, u_segments=32, v_segments=16, radius=1))
+    raise Exception(f"Unknown floor shape '{shape}'.")
+
+# Shared base mesh for a shape, built on first use (also found again in a cached .blend)
+def get_base_mesh(shape):
+    name = f"Base_{FLOOR_OBJECT_NAMES[shape]}"
+    mesh = bpy.data.meshes.get(name)
+    if mesh is None:
+        mesh = build_base_mesh(shape, name)
+        mesh.materials.append(None)  # One slot, filled per object
+        mesh.use_fake_user = True  # Keep it across multi-scene resets and orphan purges
+    return mesh
+
+# Per-object modifiers of the shapes that have them
+def add_shape_modifiers(obj, shape):
+    if shape == 'TWISTED_CYLINDER':
+        twist = obj.modifiers.new(name="SimpleDeform", type='SIMPLE_DEFORM')
+        twist.deform_method = 'TWIST'
+        twist.angle = math.radians(90)  # Twist by 90 degrees
+    elif shape == 'SUBDIVIDED_CUBE':
+        subdivision = obj.modifiers.new(name="Subdivision", type='SUBSURF')
+        subdivision.levels = 2  # Add 2 levels of subdivision
+        subdivision.render_levels = 2
+
+# Add the complex floor shapes described by the scene spec
+def add_floor_objects(object_specs):
+    collection = bpy.context.collection
+    for object_spec in object_specs:
+        shape = object_spec["shape"]
+        obj = bpy.data.objects.new(FLOOR_OBJECT_NAMES[shape], get_base_mesh(shape))
+        collection.objects.link(obj)
+        add_shape_modifiers(obj, shape)
+
+        # Transform resolved by the spec
+        obj.location = object_spec["location"]
+        obj.rotation_euler = object_spec["rotation_euler"]
+        obj.scale = object_spec["scale"]
 
         # Add a realistic material to the object
-        material = create_realistic_material()
-        obj.data.materials.append(material)
-
-add_complex_random_objects_on_floor(10, -7, 7, -7, 7, max_size=0.9)
-
+        assign_material(obj, object_spec["material"])
 
 
+####### DRONE ASSET #########
 
-####### HOVERING DRONE #########
-
-# Import the drone FBX file
 fbx_file_path = "drone.fbx"  # Update this path to your actual FBX file location
-bpy.ops.import_scene.fbx(filepath=fbx_file_path)
 
-# Get all imported objects
-if bpy.context.selected_objects:
-    drone_parts = bpy.context.selected_objects[:]  # This stores the list of imported drone parts
-else:
-    raise Exception("No objects selected after import. Check your FBX file.")
-
-# Scale down the imported drone parts
-scale_factor = 0.001  # Adjust this value as needed (e.g., 0.5 for half size)
-for part in drone_parts:
-    part.scale = (scale_factor, scale_factor, scale_factor)
-
-# Create an empty object to serve as the parent for all drone parts
-bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0), rotation=(0, 0, 0))
-hovering_drone = bpy.context.active_object
+# Native .blend copy of the imported drone, keyed by the FBX file identity
+def drone_asset_cache_path():
+    if args.no_scene_cache:
+        return None
+    fbx_stat = os.stat(fbx_file_path)
+    key = hashlib.sha256(f"{os.path.abspath(fbx_file_path)}:{fbx_stat.st_size}:{fbx_stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return os.path.join(os.path.abspath(args.scene_cache), f"drone_{key}.blend")
+
+# Import drone.fbx once, or append its parts from the pre-converted .blend copy when one exists
+def load_drone_parts():
+    asset_path = drone_asset_cache_path()
+    if asset_path and os.path.exists(asset_path):
+        with bpy.data.libraries.load(asset_path, link=False) as (data_from, data_to):
+            data_to.objects = data_from.objects
+        drone_parts = [part for part in data_to.objects if part is not None]
+        for part in drone_parts:
+            bpy.context.collection.objects.link(part)
+        print(f"Loaded drone asset: {asset_path}")
+        return drone_parts
+
+    # Import the drone FBX file
+    bpy.ops.import_scene.fbx(filepath=fbx_file_path)
+
+    # Get all imported objects
+    if bpy.context.selected_objects:
+        drone_parts = bpy.context.selected_objects[:]  # This stores the list of imported drone parts
+    else:
+        raise Exception("No objects selected after import. Check your FBX file.")
+
+    # Save the parts in Blender's native format so later builds skip the FBX parser
+    if asset_path:
+        os.makedirs(os.path.dirname(asset_path), exist_ok=True)
+        tmp_path = asset_path[:-len(".blend")] + f".{os.getpid()}.tmp.blend"
+        bpy.data.libraries.write(tmp_path, set(drone_parts), path_remap='ABSOLUTE')
+        os.replace(tmp_path, asset_path)
+        print(f"Saved drone asset: {asset_path}")
+    return drone_parts
+
+# Linked-data duplicate of the drone: new objects that share the mesh and material datablocks
+def instance_drone_parts(drone_parts):
+    part_copies = []
+    for part in drone_parts:
+        part_copy = part.copy()
+        bpy.context.collection.objects.link(part_copy)
+        part_copies.append(part_copy)
+    return part_copies
 
-hovering_drone.location = (0, 0, 3)
-hovering_drone.rotation_euler = (math.radians(90), 0, 0)
 
-# Parent all the drone parts to the empty object
-for part in drone_parts:
-    part.select_set(True)  # Select each drone part
-    part.parent = hovering_drone  # Set the parent
+####### HOVERING DRONE #########
 
-# Add camera to hovering drone
-bpy.ops.object.camera_add(location=(0.07, 0.1, 0.1), rotation=(math.radians(-90), math.radians(-90), 0))
-camera = bpy.context.active_object
-camera.parent = hovering_drone
-camera.name = 'Drone Camera'
+def add_hovering_drone(drone_parts):
+    # Scale down the imported drone parts
+    scale_factor = 0.001  # Adjust this value as needed (e.g., 0.5 for half size)
+    for part in drone_parts:
+        part.scale = (scale_factor, scale_factor, scale_factor)
 
-# Set camera as active
-bpy.context.scene.camera = camera
+    # Create an empty object to serve as the parent for all drone parts
+    bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0), rotation=(0, 0, 0))
+    hovering_drone = bpy.context.active_object
+    hovering_drone.name = 'Hovering Drone'
 
-# Adjust camera settings for a larger field of view (wider view)
-camera.data.lens = 18  # Decrease the focal length (default is 50) for a wider field of view
-camera.data.sensor_width = 100  # Standard full-frame sensor width (you can increase this for even wider FOV)
+    hovering_drone.location = (0, 0, 3)
+    hovering_drone.rotation_euler = (math.radians(90), 0, 0)
 
-# Optional: If you want to increase the camera's clipping distance (to see more objects in the scene)
-camera.data.clip_start = 0.1  # Set the start clipping distance to a smaller value
-camera.data.clip_end = frames_per_folder  # Set the end clipping distance to a larger value
+    # Parent all the drone parts to the empty object
+    for part in drone_parts:
+        part.select_set(True)  # Select each drone part
+        part.parent = hovering_drone  # Set the parent
 
+    # Add camera to hovering drone
+    bpy.ops.object.camera_add(location=(0.07, 0.1, 0.1), rotation=(math.radians(-90), math.radians(-90), 0))
+    camera = bpy.context.active_object
+    camera.parent = hovering_drone
+    camera.name = 'Drone Camera'
 
+    # Set camera as active
+    bpy.context.scene.camera = camera
 
-####### FLYING DRONE #########
+    # Adjust camera settings for a larger field of view (wider view)
+    camera.data.lens = 18  # Decrease the focal length (default is 50) for a wider field of view
+    camera.data.sensor_width = 100  # Standard full-frame sensor width (you can increase this for even wider FOV)
 
-# Create flying drone
-#bpy.ops.mesh.primitive_cube_add(size=0.3)
+    # Optional: If you want to increase the camera's clipping distance (to see more objects in the scene)
+    camera.data.clip_start = 0.1  # Set the start clipping distance to a smaller value
+    camera.data.clip_end = frames_per_folder  # Set the end clipping distance to a larger value
 
-# Import the drone FBX file
-fbx_file_path = "drone.fbx"  # Update this path to your actual FBX file location
-bpy.ops.import_scene.fbx(filepath=fbx_file_path)
 
-# Get all imported objects
-if bpy.context.selected_objects:
-    drone_parts = bpy.context.selected_objects[:]  # This stores the list of imported drone parts
-else:
-    raise Exception("No objects selected after import. Check your FBX file.")
-    
-# Scale down the imported drone parts
-scale_factor = 0.001  # Adjust this value as needed (e.g., 0.5 for half size)
-for part in drone_parts:
-    part.scale = (scale_factor, scale_factor, scale_factor)
 
+####### FLYING DRONE #########
 
-# Create an empty object to serve as the parent for all drone parts
-bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0), rotation=(0, 0, 0))
-flying_drone = bpy.context.active_object
+def add_flying_drone(drone_parts, start):
+    # Scale down the imported drone parts
+    scale_factor = 0.001  # Adjust this value as needed (e.g., 0.5 for half size)
+    for part in drone_parts:
+        part.scale = (scale_factor, scale_factor, scale_factor)
 
-# Adjust the position and rotation of the flying drone (parent object)
-flying_drone.location = (0, 0, 3)
-flying_drone.rotation_euler = (math.radians(90), 0, 0)
 
-# Parent all the drone parts to the empty object (flying_drone)
-for part in drone_parts:
-    part.select_set(True)  # Select each drone part
-    part.parent = flying_drone  # Set the parent
-    part.select_set(False)  # Deselect after setting the parent
+    # Create an empty object to serve as the parent for all drone parts
+    bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0), rotation=(0, 0, 0))
+    flying_drone = bpy.context.active_object
+    flying_drone.name = 'Flying Drone'
 
-## Add camera to hovering drone
-#bpy.ops.object.camera_add(location=(0.07, 0.1, 0.1), rotation=(math.radians(-90), math.radians(-90), 0))
-#hovering_camera = bpy.context.active_object
-#hovering_camera.name = 'Hovering Drone Camera'
+    # Adjust the position and rotation of the flying drone (parent object)
+    flying_drone.location = (0, 0, 3)
+    flying_drone.rotation_euler = (math.radians(90), 0, 0)
 
-# Now move the flying_drone empty to a higher position
-flying_drone.location = (0, 0, 6)  # Start above the hovering drone
+    # Parent all the drone parts to the empty object (flying_drone)
+    for part in drone_parts:
+        part.select_set(True)  # Select each drone part
+        part.parent = flying_drone  # Set the parent
+        part.select_set(False)  # Deselect after setting the parent
 
-# Add camera to flying drone (facing downward)
-bpy.ops.object.camera_add(location=(0.07, 0.1, 0.1), rotation=(math.pi, 0, 0))
-secondary_camera = bpy.context.active_object
-secondary_camera.name = 'Flying Drone Camera'
+    # Now move the flying_drone empty to its start position (above the hovering drone by default)
+    flying_drone.location = start
 
-# Parent the secondary camera to the flying drone
-secondary_camera.parent = flying_drone
+    # Add camera to flying drone (facing downward)
+    bpy.ops.object.camera_add(location=(0.07, 0.1, 0.1), rotation=(math.pi, 0, 0))
+    secondary_camera = bpy.context.active_object
+    secondary_camera.name = 'Flying Drone Camera'
 
-# Make sure the primary camera is parented correctly to the drone structure
-#hovering_camera.parent = flying_drone  # Parent the hovering camera to the flying drone
+    # Parent the secondary camera to the flying drone
+    secondary_camera.parent = flying_drone
 
 
 
-def add_carpet():
+def add_carpet(carpet_spec):
     # Create a plane for the carpet
     bpy.ops.mesh.primitive_plane_add(size=20, location=(0, 0, 0.1))  # Create a plane just above the floor
     carpet = bpy.context.active_object
@@ -377,41 +863,36 @@ def add_carpet():
     mat.use_nodes = True  # Enable nodes for material
     bsdf = mat.node_tree.nodes["Principled BSDF"]
 
-    # Randomly decide whether to create a realistic or plain carpet
-    # if random.choice([True, False]):  # Randomly choose between realistic or plain carpet
-    if False:
+    if carpet_spec["style"] == "realistic":
         # Create a realistic carpet with texture
         print("Creating realistic carpet")
 
         # Create a procedural pattern for the carpet using Noise Texture
         noise_texture = mat.node_tree.nodes.new(type="ShaderNodeTexNoise")
         noise_texture.location = (-400, 0)
-        noise_texture.inputs["Scale"].default_value = random.uniform(5, 15)  # Random scale for randomness
-        noise_texture.inputs["Detail"].default_value = random.uniform(2, 10)  # Add detail for carpet fibers
+        noise_texture.inputs["Scale"].default_value = carpet_spec["noise_scale"]
+        noise_texture.inputs["Detail"].default_value = carpet_spec["noise_detail"]  # Add detail for carpet fibers
         
         # Optionally, use a Voronoi Texture for a different pattern
         voronoi_texture = mat.node_tree.nodes.new(type="ShaderNodeTexVoronoi")
         voronoi_texture.location = (-600, 0)
-        voronoi_texture.inputs["Scale"].default_value = random.uniform(10, 30)  # Random scale for Voronoi pattern
+        voronoi_texture.inputs["Scale"].default_value = carpet_spec["voronoi_scale"]
         
         # Mix the noise and Voronoi textures to get a more varied pattern
         mix_shader = mat.node_tree.nodes.new(type="ShaderNodeMixRGB")
         mix_shader.location = (-200, 0)
-        mix_shader.inputs["Fac"].default_value = random.random()  # Randomize the blending between noise and Voronoi
+        mix_shader.inputs["Fac"].default_value = carpet_spec["mix_factor"]
         mat.node_tree.links.new(mix_shader.inputs[1], noise_texture.outputs["Color"])
         mat.node_tree.links.new(mix_shader.inputs[2], voronoi_texture.outputs["Color"])
-        
-        # Set base color for the realistic carpet (random color range for variation)
-        base_color = (random.uniform(0.3, 0.5), random.uniform(0.1, 0.3), random.uniform(0.0, 0.2), 1)  # Limited color range
         mat.node_tree.links.new(bsdf.inputs["Base Color"], mix_shader.outputs["Color"])
 
         # Set roughness to give a carpet-like surface (higher roughness for a matte look)
-        bsdf.inputs["Roughness"].default_value = random.uniform(0.6, 0.9)  # Higher roughness for a non-glossy, matte appearance
+        bsdf.inputs["Roughness"].default_value = carpet_spec["roughness"]
         
         # Add bump mapping to simulate carpet fibers (using Noise Texture)
         bump_node = mat.node_tree.nodes.new(type="ShaderNodeBump")
         bump_node.location = (-400, -200)
-        bump_node.inputs["Strength"].default_value = random.uniform(0.1, 0.3)  # Random bump strength
+        bump_node.inputs["Strength"].default_value = carpet_spec["bump_strength"]
         
         # Use the noise texture for bump mapping
         mat.node_tree.links.new(bump_node.inputs["Height"], noise_texture.outputs["Color"])
@@ -422,13 +903,10 @@ def add_carpet():
     else:
         # Create a plain carpet (solid color)
         print("Creating plain carpet")
+        bsdf.inputs["Base Color"].default_value = carpet_spec["base_color"]
 
-        # Set base color for plain carpet (solid color)
-        base_color = (random.uniform(0.3, 0.5), random.uniform(0.1, 0.3), random.uniform(0.0, 0.2), 1)  # Solid color
-        bsdf.inputs["Base Color"].default_value = base_color
-
-        # Set roughness to give a carpet-like surface (higher roughness for a matte look)
-        bsdf.inputs["Roughness"].default_value = random.uniform(0.7, 0.9)  # Higher roughness for a matte finish
+        # Set roughness to give a carpet-like surface (higher roughness for a matte finish)
+        bsdf.inputs["Roughness"].default_value = carpet_spec["roughness"]
     
     # Assign the material to the carpet
     if carpet.data.materials:
@@ -436,124 +914,424 @@ def add_carpet():
     else:
         carpet.data.materials.append(mat)
 
-# Add the carpet (either plain or realistic)
-add_carpet()
-
 
-# Function to add a random light at a location within specified min/max X, Y, Z limits
-def add_random_light(min_x, max_x, min_y, max_y, min_z, max_z):
-    # Randomly select a location within the provided bounds for X, Y, and Z
-    location = (random.uniform(min_x, max_x), 
-                random.uniform(min_y, max_y), 
-                random.uniform(min_z, max_z))  
-    light_data = bpy.data.lights.new(name="Light", type='AREA')
-    light_data.energy = random.uniform(50, 150)  # Random energy range
+# Function to add a light from its spec (type, location, energy)
+def add_light(light_spec):
+    light_data = bpy.data.lights.new(name="Light", type=light_spec["type"])
+    light_data.energy = light_spec["energy"]
     light_object = bpy.data.objects.new(name="Light", object_data=light_data)
     bpy.context.collection.objects.link(light_object)
-    light_object.location = location
-
-# Function to add multiple random lights
-def add_multiple_random_lights(num_lights, min_x, max_x, min_y, max_y, min_z, max_z):
-    for _ in range(num_lights):
-        add_random_light(min_x, max_x, min_y, max_y, min_z, max_z)
-
-# Example: Add x random lights within the bounds of min_x, max_x, min_y, max_y, min_z, max_z
-add_multiple_random_lights(10, -10, 10, -10, 10, 10, 15)
-
-
-# Animation settings
-scene = bpy.context.scene
-scene.frame_start = 1
-scene.frame_end = frames_per_folder  # Increased frame count for longer animation
-
-def generate_random_point():
-    x = random.uniform(-8, 8)
-    y = random.uniform(-8, 8)
-    z = random.uniform(3, 5)
-    return Vector((x, y, z))
-
-def animate_flying_drone():
-    current_point = Vector(flying_drone.location)
-    
-    for frame in range(scene.frame_start, scene.frame_end + 1, 20):
-        next_point = generate_random_point()
-        direction = (next_point - current_point).normalized()
-        
-        # Calculate rotation to face the direction of movement while keeping camera down
-        rotation = Euler((math.pi / 2 , 0 , math.atan2(direction.y, direction.x)))
-        
-        # Interpolate between current_point and next_point
-        for i in range(20):
-            t = i / 20
-            interpolated_point = current_point.lerp(next_point, t)
-            
-            flying_drone.location = interpolated_point
-            flying_drone.rotation_euler = rotation
-            flying_drone.keyframe_insert(data_path="location", frame=frame + i)
-            flying_drone.keyframe_insert(data_path="rotation_euler", frame=frame + i)
-        
-        current_point = next_point
-    
-    # Set interpolation to smooth the movement
-    if flying_drone.animation_data and flying_drone.animation_data.action:
-        for fc in flying_drone.animation_data.action.fcurves:
-            for kf in fc.keyframe_points:
-                kf.interpolation = 'BEZIER'
-                kf.handle_left_type = 'AUTO'
-                kf.handle_right_type = 'AUTO'
-
-
-print("Starting animation...")
-animate_flying_drone()
-print("Animation complete.")
-
-# Define the base output directory
-base_output_dir = bpy.path.abspath("nlos_dataset/")
-
-# Function to save the image and JSON file
-def save_image_and_json(frame, folder_name, frame_within_batch, drone_1_pose, drone_2_pose):
+    light_object.location = light_spec["location"]
+
+# Function to add every light of the scene spec
+def add_lights(light_specs):
+    for light_spec in light_specs:
+        add_light(light_spec)
+
+# Enum values for bulk keyframe writes with foreach_set
+def keyframe_enum_value(prop_name, item):
+    return bpy.types.Keyframe.bl_rna.properties[prop_name].enum_items[item].value
+
+# Write per-frame values into new F-curves in bulk instead of one keyframe_insert per frame
+def keyframe_trajectory(obj, trajectory):
+    frames = trajectory["frames"]
+    count = len(frames)
+    obj.animation_data_create()
+    action = bpy.data.actions.new(name=f"{obj.name}Action")
+    obj.animation_data.action = action
+
+    bezier = keyframe_enum_value("interpolation", 'BEZIER')
+    auto = keyframe_enum_value("handle_left_type", 'AUTO')
+    for data_path in ("location", "rotation_euler"):
+        values = trajectory[data_path]
+        for index in range(3):
+            fc = action.fcurves.new(data_path, index=index, action_group="Object Transforms")
+            fc.keyframe_points.add(count)
+
+            # Interleaved (frame, value) pairs
+            co = np.empty(2 * count, dtype=np.float32)
+            co[0::2] = frames
+            co[1::2] = values[:, index]
+            fc.keyframe_points.foreach_set("co", co)
+
+            # Set interpolation to smooth the movement
+            fc.keyframe_points.foreach_set("interpolation", np.full(count, bezier, dtype=np.int32))
+            fc.keyframe_points.foreach_set("handle_left_type", np.full(count, auto, dtype=np.int32))
+            fc.keyframe_points.foreach_set("handle_right_type", np.full(count, auto, dtype=np.int32))
+            fc.update()
+
+# Read the keyed per-frame values back from the F-curves in bulk (works for cached scenes too)
+def read_keyframed_trajectory(obj):
+    trajectory = {}
+    for fc in obj.animation_data.action.fcurves:
+        co = np.empty(2 * len(fc.keyframe_points), dtype=np.float32)
+        fc.keyframe_points.foreach_get("co", co)
+        trajectory["frames"] = co[0::2].round().astype(np.int64)
+        trajectory.setdefault(fc.data_path, np.zeros((len(co) // 2, 3)))[:, fc.array_index] = co[1::2]
+    return trajectory
+
+def animate_flying_drone(flying_drone, scene, flight):
+    # Interpolation and heading between the spec's waypoints for every frame in one batched pass
+    trajectory = compute_trajectory(flight["start"], scene.frame_start, scene.frame_end,
+                                    segment_frames=flight["segment_frames"], waypoints=flight["waypoints"])
+    keyframe_trajectory(flying_drone, trajectory)
+    return trajectory
+
+# Count render invocations so the timing log can prove each frame is path-traced once
+render_invocations = 0
+
+# Persistent so the handler survives loading the scene cache
+@bpy.app.handlers.persistent
+def count_render_invocation(*args):
+    global render_invocations
+    render_invocations += 1
+
+# Latest Cycles statistics (memory, samples) reported during the current render
+last_render_stats = {}
+
+@bpy.app.handlers.persistent
+def capture_render_stats(*args):
+    if args and isinstance(args[0], str):
+        last_render_stats.update(parse_render_stats(args[0]))
+
+# Local transform of obj at every frame, evaluated straight from its F-curves (no frame_set).
+# Constraints and drivers are not evaluated; the scene does not use them.
+def local_matrices(obj, frames):
+    if obj.rotation_mode != 'XYZ':
+        raise Exception(f"{obj.name} uses rotation mode {obj.rotation_mode}; ground truth supports XYZ Euler only.")
+    channels = {
+        "location": np.tile(np.array(obj.location), (len(frames), 1)),
+        "rotation_euler": np.tile(np.array(obj.rotation_euler), (len(frames), 1)),
+        "scale": np.tile(np.array(obj.scale), (len(frames), 1)),
+    }
+    if obj.animation_data and obj.animation_data.action:
+        for fc in obj.animation_data.action.fcurves:
+            if fc.data_path in channels:
+                channels[fc.data_path][:, fc.array_index] = [fc.evaluate(frame) for frame in frames]
+    return compose_matrices(channels["location"], channels["rotation_euler"], channels["scale"])
+
+# World-space poses of obj for every frame, chaining its parents' transforms
+def world_poses(obj, frames):
+    chain = []
+    node = obj
+    while node is not None:
+        chain.append((local_matrices(node, frames), np.array(node.matrix_parent_inverse)))
+        node = node.parent
+    return pose_arrays(world_matrices(reversed(chain)))
+
+# Ground-truth poses of both drones and both cameras for every frame, in one batched pass
+def compute_ground_truth(frames):
+    ground_truth_objects = {
+        "drone_1": hovering_drone,
+        "drone_2": flying_drone,
+        "camera": camera,
+        "flying_camera": secondary_camera,
+    }
+    return {name: world_poses(obj, frames) for name, obj in ground_truth_objects.items()}
+
+# Frame pipeline stage: render every requested camera, encode the EXRs, record the shared pose and
+# hand the files to the output writer. The scene is evaluated once per frame (frame_set in the caller);
+# the cameras only differ in their render call.
+# Pose records go to the sequence's columnar pose file; per-frame JSON is only written with --pose-json.
+# Manifest entries are written when the writer acknowledges each image (see record_written_frame).
+def render_and_record_frame(frame, folder_name, frame_within_batch, ground_truth, index):
     # File paths
-    image_file_name = f"seq_{folder_name}_{frame_within_batch:04d}.exr"
-    json_file_name = f"seq_{folder_name}_{frame_within_batch:04d}.json"
+    image_file_name = f"seq_{folder_name:04d}_{frame_within_batch:04d}.exr"
+    json_file_name = f"seq_{folder_name:04d}_{frame_within_batch:04d}.json"
     
     # Output directory for the current batch
-    output_dir = os.path.join(base_output_dir, f"seq_{folder_name:04d}")
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Set image filepath
-    bpy.context.scene.render.filepath = os.path.join(output_dir, image_file_name)
-    
-    # Render the image
-    bpy.ops.render.render(write_still=True)
-    print(f"Rendered image: {bpy.context.scene.render.filepath}")
-    
+    output_dir = sequence_dir(folder_name)
+    json_file_path = os.path.join(output_dir, json_file_name)
+
+    # Image renders (one per camera) and incremental check renders are counted separately
+    render_calls = 0
+    check_render_calls = 0
+    render_seconds = 0.0
+    exr_write_seconds = 0.0
+    views = []
+    for camera_name in render_cameras:
+        view = view_of(camera_name)
+        ensure_dir(view_dir(folder_name, view))
+        image_path = os.path.join(view_dir(folder_name, view), image_file_name)
+
+        # Blender writes to local scratch in async mode; the writer moves the file to image_path
+        scratch_name = f"{view}_{image_file_name}" if view else image_file_name
+        bpy.context.scene.render.filepath = os.path.join(scratch_dir, scratch_name) if scratch_dir else image_path
+        bpy.context.scene.camera = bpy.data.objects[CAMERA_OBJECTS[camera_name]]
+
+        # Render the image (the only render call for this camera and frame)
+        last_render_stats.clear()
+        renders_before = render_invocations
+        render_start = time.perf_counter()
+        bpy.ops.render.render()
+        view_render_seconds = time.perf_counter() - render_start
+        render_calls += render_invocations - renders_before
+        record_stage("render", view_render_seconds)
+        render_seconds += view_render_seconds
+
+        # Encode the EXR from the render result
+        write_start = time.perf_counter()
+        bpy.data.images['Render Result'].save_render(filepath=bpy.context.scene.render.filepath)
+        exr_write_seconds += time.perf_counter() - write_start
+        print(f"Rendered image: {image_path}")
+
+        if incremental_state["active"] and args.incremental_check and index % args.incremental_check == 0:
+            renders_before = render_invocations
+            check_incremental_frame(frame, bpy.context.scene.render.filepath)
+            check_render_calls += render_invocations - renders_before
+        views.append((camera_name, view, bpy.context.scene.render.filepath, image_path, view_render_seconds))
+    record_stage("exr_write", exr_write_seconds)
     
+    # World-space poses precomputed for this frame
     json_data = {
         "timestamp": frame,
-        "drone_1_pose": {
-            "position": {"x": drone_1_pose.location.x, "y": drone_1_pose.location.y, "z": drone_1_pose.location.z},
-            "orientation": {
-                "roll": drone_1_pose.rotation_euler.x,
-                "pitch": drone_1_pose.rotation_euler.y,
-                "yaw": drone_1_pose.rotation_euler.z
-            }
-        },
-        "drone_2_pose": {
-            "position": {"x": drone_2_pose.location.x, "y": drone_2_pose.location.y, "z": drone_2_pose.location.z},
-            "orientation": {
-                "roll": drone_2_pose.rotation_euler.x,
-                "pitch": drone_2_pose.rotation_euler.y,
-                "yaw": drone_2_pose.rotation_euler.z
+        "drone_1_pose": pose_record(ground_truth["drone_1"], index),
+        "drone_2_pose": pose_record(ground_truth["drone_2"], index),
+        "camera_pose": pose_record(ground_truth["camera"], index),
+        "image_path": views[0][3],
+        "render_profile": args.render_profile,
+        "render_settings": render_settings
+    }
+    if args.incremental:
+        json_data["incremental"] = incremental_state["active"]
+    if multi_view:
+        json_data["flying_camera_pose"] = pose_record(ground_truth["flying_camera"], index)
+        json_data["image_paths"] = {camera_name: image_path for camera_name, _, _, image_path, _ in views}
+
+    # Append the pose record to the sequence's pose file
+    record_start = time.perf_counter()
+    get_pose_sink(folder_name).append(json_data)
+    record_seconds = time.perf_counter() - record_start
+    record_stage("pose_write", record_seconds)
+
+    # Append to the per-sequence timing log (one JSON object per line)
+    timing = {
+        "frame": frame,
+        "render_calls": render_calls,
+        "render_seconds": round(render_seconds, 4),
+        "exr_write_seconds": round(exr_write_seconds, 4),
+        "record_seconds": round(record_seconds, 4),
+        "image_path": views[0][3]
+    }
+    if check_render_calls:
+        timing["check_render_calls"] = check_render_calls
+    if multi_view:
+        timing["cameras"] = render_cameras
+    with open(os.path.join(output_dir, timing_log_name), 'a') as log_file:
+        log_file.write(json.dumps(timing) + "\n")
+
+    # Hand each EXR (and the legacy per-frame JSON, with the first camera) to the writer;
+    # blocks only when its queue is full
+    submit_start = time.perf_counter()
+    for position, (camera_name, view, source, image_path, view_render_seconds) in enumerate(views):
+        write_json = args.pose_json and position == 0
+        acks = output_writer.submit({
+            "frame": frame,
+            "folder": folder_name,
+            "view": view,
+            "source": source,
+            "destination": image_path,
+            "json_path": json_file_path if write_json else None,
+            "json_data": json_data if write_json else None,
+            "fsync": not args.no_fsync,
+            "entry": {
+                "image_path": image_file_name,
+                "json_path": os.path.relpath(json_file_path, view_dir(folder_name, view)) if write_json else None,
+                "render_seconds": round(view_render_seconds, 4)
             }
+        })
+        for ack in acks:
+            record_written_frame(ack)
+    submit_seconds = time.perf_counter() - submit_start
+    record_stage("writer_wait", submit_seconds)
+
+    # Per-frame details for the event log
+    pixels = framing["rendered_pixels"][0] * framing["rendered_pixels"][1]
+    samples = last_render_stats.get("samples", render_settings.get("samples", 0))
+    return {
+        "render_calls": render_calls,
+        "check_render_calls": check_render_calls,
+        "stages": {
+            "render": round(render_seconds, 4),
+            "exr_write": round(exr_write_seconds, 4),
+            "pose_write": round(record_seconds, 4),
+            "writer_wait": round(submit_seconds, 4),
         },
-        "image_path": bpy.context.scene.render.filepath
+        "cycles": dict(last_render_stats),
+        "samples_per_second": round(samples * pixels * len(views) / render_seconds, 1) if render_seconds > 0 else 0.0,
     }
 
-    # Save JSON file
-    json_file_path = os.path.join(output_dir, json_file_name)
-    with open(json_file_path, 'w') as json_file:
-        json.dump(json_data, json_file, indent=4)
-    print(f"Saved JSON: {json_file_path}")
+# Total size of the EXRs written by this run
+output_bytes_written = 0
+
+# Record a frame the output writer has finished in the sequence manifest
+def record_written_frame(ack):
+    global output_bytes_written
+    output_bytes_written += ack["entry"]["size"]
+    with timed_stage("manifest"):
+        get_manifest(ack["folder"], ack["view"])["frames"][str(ack["frame"])] = ack["entry"]
+        write_manifest(ack["folder"], ack["view"])
+    record_stage("output_write", ack["write_seconds"])
+    event_log.emit("frame_written", frame=ack["frame"], folder=ack["folder"], camera=ack["view"] or render_cameras[0],
+                   write_seconds=ack["write_seconds"],
+                   output_bytes=ack["entry"]["size"])
+    print(f"Wrote {ack['destination']} ({ack['entry']['size']} bytes)")
+
+
+# Incremental static-camera rendering.
+#
+# The hovering camera never moves and only the flying drone is animated, so the scene without
+# the flying drone is rendered once at full quality (bg_hq) and once at low samples (bg_lq).
+# Each frame is then rendered at the same low sample count with the same fixed seed and the
+# compositor outputs bg_hq + (frame_lq - bg_lq). Light paths that never meet the flying drone
+# are sampled identically in frame_lq and bg_lq and cancel, so the full-quality background
+# shows through, while the drone, its shadows and its indirect light come from the low-sample
+# difference. Every --incremental-check frames a full render checks the error bound; if it is
+# exceeded that frame is replaced by the full render and the rest of the scene renders in full.
+INCREMENTAL_SEED = 0
+
+incremental_state = {"active": False, "checks": 0, "max_error": 0.0, "fallback_frame": None}
+
+def set_cycles_settings(settings):
+    cycles = bpy.context.scene.cycles
+    for key, value in settings.items():
+        if hasattr(cycles, key):
+            setattr(cycles, key, value)
+
+def low_sample_settings():
+    return {"samples": args.incremental_samples, "use_adaptive_sampling": False, "time_limit": 0.0,
+            "seed": INCREMENTAL_SEED, "use_animated_seed": False}
+
+def flying_drone_objects():
+    objects = [flying_drone]
+    for obj in objects:
+        objects.extend(child for child in obj.children if child not in objects)
+    return objects
+
+def set_flying_drone_visible(visible):
+    for obj in flying_drone_objects():
+        obj.hide_render = not visible
+
+# Render the current scene without compositing and save it. Backgrounds are saved losslessly
+# as full-float RGBA; otherwise the configured output format is used, so the image can stand
+# in for a sequence frame.
+def render_still(path, lossless=True):
+    render = bpy.context.scene.render
+    render.use_compositing = False
+    if lossless:
+        image_settings = render.image_settings
+        image_settings.file_format = 'OPEN_EXR'
+        image_settings.color_mode = 'RGBA'
+        image_settings.color_depth = '32'
+        image_settings.exr_codec = 'ZIP'
+    bpy.ops.render.render()
+    bpy.data.images['Render Result'].save_render(filepath=path)
+    if lossless:
+        configure_output_format()
+
+def read_exr_pixels(path):
+    image = bpy.data.images.load(path, check_existing=False)
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    bpy.data.images.remove(image)
+    return pixels.reshape(-1, 4)[:, :3]
+
+def load_compositor_image(name, path):
+    image = bpy.data.images.get(name)
+    if image is not None:
+        bpy.data.images.remove(image)
+    image = bpy.data.images.load(path, check_existing=False)
+    image.name = name
+    return image
+
+# Compositor graph: composite = bg_hq + (render - bg_lq)
+def build_difference_compositor(background_hq, background_lq):
+    scene = bpy.context.scene
+    scene.use_nodes = True
+    tree = scene.node_tree
+    tree.nodes.clear()
+    render_layers = tree.nodes.new(type="CompositorNodeRLayers")
+    image_hq = tree.nodes.new(type="CompositorNodeImage")
+    image_hq.image = background_hq
+    image_lq = tree.nodes.new(type="CompositorNodeImage")
+    image_lq.image = background_lq
+    difference = tree.nodes.new(type="CompositorNodeMixRGB")
+    difference.blend_type = 'SUBTRACT'
+    difference.inputs[0].default_value = 1.0
+    total = tree.nodes.new(type="CompositorNodeMixRGB")
+    total.blend_type = 'ADD'
+    total.inputs[0].default_value = 1.0
+    composite = tree.nodes.new(type="CompositorNodeComposite")
+    tree.links.new(render_layers.outputs["Image"], difference.inputs[1])
+    tree.links.new(image_lq.outputs["Image"], difference.inputs[2])
+    tree.links.new(image_hq.outputs["Image"], total.inputs[1])
+    tree.links.new(difference.outputs["Image"], total.inputs[2])
+    tree.links.new(total.outputs["Image"], composite.inputs["Image"])
+    scene.render.use_compositing = True
+
+# Backgrounds are cached per scene spec, render settings and resolution
+def background_cache_paths():
+    key = hashlib.sha256(json.dumps({
+        "scene_spec": spec_hash(scene_spec),
+        "render_settings": render_settings,
+        "incremental_samples": args.incremental_samples,
+        "framing": framing,
+        "fbx": scene_cache_key(scene_spec),
+    }, sort_keys=True).encode()).hexdigest()[:16]
+    directory = os.path.abspath(args.scene_cache)
+    return (os.path.join(directory, f"background_{key}_hq.exr"), os.path.join(directory, f"background_{key}_lq.exr"))
+
+def setup_incremental_rendering():
+    incremental_state.update({"samples": args.incremental_samples, "check_every": args.incremental_check,
+                              "error_bound": args.incremental_max_error, "active": True, "checks": 0,
+                              "max_error": 0.0, "fallback_frame": None})
+    bpy.context.scene.render.use_persistent_data = True
+    hq_path, lq_path = background_cache_paths()
+    if not (os.path.exists(hq_path) and os.path.exists(lq_path)):
+        os.makedirs(os.path.dirname(hq_path), exist_ok=True)
+        bpy.context.scene.frame_set(bpy.context.scene.frame_start)
+        set_flying_drone_visible(False)
+        with timed_stage("background_hq"):
+            apply_render_profile(args.render_profile)
+            render_still(hq_path)
+        with timed_stage("background_lq"):
+            set_cycles_settings(low_sample_settings())
+            render_still(lq_path)
+        set_flying_drone_visible(True)
+        print(f"Rendered incremental backgrounds: {hq_path}")
+    build_difference_compositor(load_compositor_image("Background HQ", hq_path),
+                                load_compositor_image("Background LQ", lq_path))
+    set_cycles_settings(low_sample_settings())
+
+def disable_incremental_rendering():
+    incremental_state["active"] = False
+    bpy.context.scene.render.use_compositing = False
+    apply_render_profile(args.render_profile)
+
+# Compare an incremental frame against a full render of the same frame; on a bound violation
+# the full render replaces the frame and incremental mode is switched off
+def check_incremental_frame(frame, path):
+    reference_path = path[:-len(".exr")] + ".reference.exr"
+    with timed_stage("incremental_check"):
+        apply_render_profile(args.render_profile)
+        # In the sequence's output format: on a fallback it replaces the frame
+        render_still(reference_path, lossless=False)
+        reference = read_exr_pixels(reference_path)
+        error = float(np.mean(np.abs(read_exr_pixels(path) - reference)) / max(np.mean(np.abs(reference)), 1e-8))
+    incremental_state["checks"] += 1
+    incremental_state["max_error"] = max(incremental_state["max_error"], error)
+    exceeded = error > args.incremental_max_error
+    event_log.emit("incremental_check", frame=frame, error=round(error, 6), bound=args.incremental_max_error,
+                   fallback=exceeded)
+    print(f"Incremental check at frame {frame}: error {error:.4f} (bound {args.incremental_max_error})")
+    if exceeded:
+        os.replace(reference_path, path)
+        incremental_state["fallback_frame"] = frame
+        disable_incremental_rendering()
+        return
+    os.remove(reference_path)
+    set_cycles_settings(low_sample_settings())
+    bpy.context.scene.render.use_compositing = True
 
 
 # Set up NLOS simulation 
@@ -595,50 +1373,416 @@ def setup_nlos_simulation():
     links.new(node_emission.outputs['Emission'], node_mix.inputs[2])
     links.new(node_mix.outputs['Shader'], node_output.inputs['Surface'])
 
-# Set up NLOS simulation
-setup_nlos_simulation()
 
-# Set render engine to Cycles for better lighting simulation
-bpy.context.scene.render.engine = 'CYCLES'
+# Everything a scene spec randomizes (floor objects, carpet, lights) lives in this collection,
+# so multi-scene runs can swap it out while the room, drones, cameras and render settings stay loaded
+RANDOMIZED_COLLECTION = "Randomized"
+
+# Add the spec's floor objects, carpet and lights to the randomized collection and animate the flying drone
+def populate_randomized(spec):
+    scene = bpy.context.scene
+    collection = bpy.data.collections.get(RANDOMIZED_COLLECTION)
+    if collection is None:
+        collection = bpy.data.collections.new(RANDOMIZED_COLLECTION)
+        scene.collection.children.link(collection)
+
+    # New objects are linked to the active collection
+    view_layer = bpy.context.view_layer
+    previous_collection = view_layer.active_layer_collection
+    view_layer.active_layer_collection = view_layer.layer_collection.children[RANDOMIZED_COLLECTION]
+    with timed_stage("scene_construction"):
+        add_floor_objects(spec["objects"])
+
+        # Add the carpet (either plain or realistic)
+        add_carpet(spec["carpet"])
+
+        add_lights(spec["lights"])
+    view_layer.active_layer_collection = previous_collection
+
+    # Animation settings
+    scene.frame_start = spec["animation"]["frame_start"]
+    scene.frame_end = spec["animation"]["frame_end"]
+
+    print("Starting animation...")
+    with timed_stage("animation_keyframing"):
+        flying_drone = bpy.data.objects['Flying Drone']
+        flying_drone.location = spec["flying_drone"]["start"]
+        animate_flying_drone(flying_drone, scene, spec["flying_drone"])
+    print("Animation complete.")
+
+# Remove the randomized objects, the flying drone's animation and every datablock left without users
+def clear_randomized():
+    collection = bpy.data.collections[RANDOMIZED_COLLECTION]
+    for obj in list(collection.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+
+    flying_drone = bpy.data.objects['Flying Drone']
+    action = flying_drone.animation_data.action if flying_drone.animation_data else None
+    if action is not None:
+        flying_drone.animation_data.action = None
+        bpy.data.actions.remove(action)
+
+    # Meshes, materials and lights of the removed objects are now orphans
+    if hasattr(bpy.data, "orphans_purge"):
+        try:
+            bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+        except TypeError:
+            # Before Blender 3.2 the purge takes no arguments and is not recursive
+            while bpy.data.orphans_purge():
+                pass
+    else:
+        for datablocks in (bpy.data.meshes, bpy.data.materials, bpy.data.lights, bpy.data.node_groups):
+            for datablock in list(datablocks):
+                if datablock.users == 0:
+                    datablocks.remove(datablock)
+
+# Datablock counts logged per scene to show that multi-scene runs do not accumulate data
+def datablock_counts():
+    return {name: len(getattr(bpy.data, name)) for name in ("objects", "meshes", "materials", "lights", "actions", "images")}
+
+# Build the whole scene from scratch, exactly as described by the scene spec
+def build_scene(spec):
+    with timed_stage("scene_construction"):
+        # Clear existing objects
+        bpy.ops.object.select_all(action='SELECT')
+        bpy.ops.object.delete()
+
+        # Create the room
+        create_room()
+
+    # Import the drone once; the flying drone shares its mesh data
+    with timed_stage("fbx_import"):
+        drone_parts = load_drone_parts()
+
+    with timed_stage("scene_construction"):
+        add_hovering_drone(drone_parts)
+        add_flying_drone(instance_drone_parts(drone_parts), spec["flying_drone"]["start"])
+
+    populate_randomized(spec)
+
+    # Set up NLOS simulation
+    with timed_stage("scene_construction"):
+        setup_nlos_simulation()
+
+
+# Scene cache: the built scene is saved as a .blend keyed by the scene spec and generator parameters,
+# so later runs and workers load it instead of rebuilding and re-importing everything
+SCENE_CACHE_VERSION = 4
+
+def scene_cache_key(spec):
+    fbx_stat = os.stat(fbx_file_path)
+    params = {
+        "version": SCENE_CACHE_VERSION,
+        "scene_spec": spec_hash(spec),
+        "frames_per_folder": frames_per_folder,
+        "drone_fbx": [os.path.abspath(fbx_file_path), fbx_stat.st_size, fbx_stat.st_mtime_ns],
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+def save_scene_cache(cache_path):
+    # Save a copy under a temporary name and rename it so concurrent workers never load a partial file
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path[:-len(".blend")] + f".{os.getpid()}.tmp.blend"
+    bpy.ops.wm.save_as_mainfile(filepath=tmp_path, copy=True)
+    os.replace(tmp_path, cache_path)
+    print(f"Saved scene cache: {cache_path}")
+
+def load_or_build_scene(spec):
+    if args.no_scene_cache:
+        build_scene(spec)
+        return
+    cache_path = os.path.join(os.path.abspath(args.scene_cache), f"scene_{scene_cache_key(spec)}.blend")
+    if os.path.exists(cache_path):
+        with timed_stage("scene_cache_load"):
+            bpy.ops.wm.open_mainfile(filepath=cache_path, load_ui=False)
+        print(f"Loaded scene cache: {cache_path}")
+    else:
+        build_scene(spec)
+        with timed_stage("scene_cache_save"):
+            save_scene_cache(cache_path)
+
+
+def folder_number_of(frame):
+    return (frame - 1) // frames_per_folder + starting_folder_number
 
-# Set up render settings
-bpy.context.scene.render.image_settings.file_format = 'OPEN_EXR'
-bpy.context.scene.render.image_settings.color_mode = 'RGBA' 
-bpy.context.scene.render.filepath = "nlos_dataset/"
+# Per-scene files go to the output directory, or to the scene's sequence folder when scene-sharded
+def scene_output_dir():
+    return layout.scene_files_dir(base_output_dir, starting_folder_number, args.num_scenes, args.worker_id,
+                                  args.frame_start, args.frame_end)
 
-# Ensure the output directory exists
-output_dir = bpy.path.abspath(bpy.context.scene.render.filepath)
-os.makedirs(output_dir, exist_ok=True)
+# Only worker 0 of a frame-sharded run writes the per-scene files; scene-sharded workers write their own
+def writes_scene_outputs():
+    return layout.writes_scene_files(args.worker_id, args.frame_start, args.frame_end)
 
-# Set the hovering drone's camera as the active camera
-bpy.context.scene.camera = camera
+def export_scene_outputs():
+    if not writes_scene_outputs():
+        return
+    directory = scene_output_dir()
+    os.makedirs(directory, exist_ok=True)
 
-# Render settings to preserve NLOS signals
-bpy.context.scene.cycles.use_denoising = False  # Disable denoising to preserve NLOS signals
+    # Export the flying drone's path as arrays for ground-truth generation outside Blender
+    flying_drone_trajectory = read_keyframed_trajectory(flying_drone)
+    save_trajectory(os.path.join(directory, "flying_drone_trajectory.npz"), flying_drone_trajectory)
 
+    # Keep the spec next to the data so any worker can rebuild this exact scene with --scene-spec
+    save_scene_spec(os.path.join(directory, "scene_spec.json"), scene_spec)
 
 # Function to render images and save corresponding JSON files
 def render_images_and_json():
-    for frame in range(scene.frame_start, scene.frame_end + 1):
+    # Render only this process's share of the animation when a frame range is given
+    first_frame = args.frame_start or scene.frame_start
+    last_frame = args.frame_end or scene.frame_end
+
+    # Ground truth for the whole animation is available before the first render;
+    # each touched sequence gets its frames written to ground_truth.npz. In a frame-sharded
+    # run worker 0 writes it for every sequence of the animation and the other workers none.
+    with timed_stage("ground_truth"):
+        frames = np.arange(scene.frame_start, scene.frame_end + 1)
+        ground_truth = compute_ground_truth(frames)
+        frame_folders = folder_number_of(frames)
+        if args.worker_id is None:
+            written_folders = range(folder_number_of(first_frame), folder_number_of(last_frame) + 1)
+        elif writes_scene_outputs():
+            written_folders = range(folder_number_of(scene.frame_start), folder_number_of(scene.frame_end) + 1)
+        else:
+            written_folders = []
+        for folder_number in written_folders:
+            in_folder = frame_folders == folder_number
+            os.makedirs(sequence_dir(folder_number), exist_ok=True)
+            save_ground_truth(os.path.join(sequence_dir(folder_number), "ground_truth.npz"), frames[in_folder],
+                              {name: {key: values[in_folder] for key, values in pose.items()} for name, pose in ground_truth.items()})
+
+    frames_rendered = 0
+    loop_start = time.perf_counter()
+    throughput = ThroughputTracker(last_frame - first_frame + 1)
+    watchdog = StallWatchdog(event_log, args.stall_seconds)
+
+    for frame in range(first_frame, last_frame + 1):
         # Determine the folder number (batch number)
-        folder_number = (frame - 1) // frames_per_folder + starting_folder_number
+        folder_number = folder_number_of(frame)
         frame_within_batch = (frame - 1) % frames_per_folder + 1  # Frame number within the current batch
 
-        bpy.context.scene.frame_set(frame)
-        bpy.ops.render.render(write_still=True)
-
-        # Get the poses of both drones (hovering_drone and flying_drone)
-        drone_1_pose = hovering_drone
-        drone_2_pose = flying_drone
-        
-        # Save image and corresponding JSON file
-        save_image_and_json(frame, folder_number, frame_within_batch, drone_1_pose, drone_2_pose)
-
-
-# Start rendering the frames and saving JSON data
-render_images_and_json()
+        # Skip frames a previous run already rendered and recorded
+        if args.resume and frame_is_complete(folder_number, frame):
+            print(f"Skipping frame {frame}: already complete in seq_{folder_number:04d}")
+            event_log.emit("frame_skipped", frame=frame, folder=folder_number)
+            throughput.frames_total -= 1
+            continue
+
+        frame_start_time = time.perf_counter()
+        watchdog.heartbeat(frame=frame, folder=folder_number)
+        with timed_stage("frame_set"):
+            bpy.context.scene.frame_set(frame)
+        frame_set_seconds = time.perf_counter() - frame_start_time
+
+        # Render the image once and save the corresponding pose record
+        details = render_and_record_frame(frame, folder_number, frame_within_batch, ground_truth, frame - scene.frame_start)
+        details["stages"]["frame_set"] = round(frame_set_seconds, 4)
+        frames_rendered += 1
+
+        # Structured per-frame event plus a rolling throughput/ETA summary
+        frame_seconds = time.perf_counter() - frame_start_time
+        progress = throughput.add(frame_seconds)
+        event_log.emit("frame", frame=frame, folder=folder_number, frame_seconds=round(frame_seconds, 4),
+                       peak_rss_mb=peak_rss_mb(), **details)
+        event_log.emit("progress", **progress)
+        print(f"Progress: {progress['frames_done']}/{progress['frames_total']} frames, "
+              f"{progress['frames_per_hour']:.1f} frames/hour, ETA {progress['eta_seconds'] / 60:.1f} min")
+
+    # Wait for the writer to finish the last frames
+    with timed_stage("writer_drain"):
+        for ack in output_writer.flush():
+            record_written_frame(ack)
+    watchdog.stop()
+    return frames_rendered, time.perf_counter() - loop_start
+
+# Write the benchmark/stats report
+def write_stats(path, frames_rendered, loop_seconds):
+    stats = {
+        "seed": base_seed,
+        "num_scenes": args.num_scenes,
+        "render_profile": args.render_profile,
+        "render_settings": render_settings,
+        "resolution": [bpy.context.scene.render.resolution_x, bpy.context.scene.render.resolution_y],
+        "framing": framing,
+        "device": args.cycles_device,
+        "output_format": output_format,
+        "output_bytes": output_bytes_written,
+        "bytes_per_frame": round(output_bytes_written / frames_rendered) if frames_rendered else 0,
+        "stages": {name: {"seconds": round(entry["seconds"], 4), "count": entry["count"]}
+                   for name, entry in stage_times.items()},
+        "frames_rendered": frames_rendered,
+        "render_loop_seconds": round(loop_seconds, 4),
+        "frames_per_hour": round(frames_rendered / loop_seconds * 3600, 2) if loop_seconds > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    with open(path, 'w') as stats_file:
+        json.dump(stats, stats_file, indent=4)
+    print(f"Wrote stats: {path}")
+
+
+# Render entry point. Importing this module only defines the bpy layer; main() parses the
+# arguments, builds the scene and renders. The run state below is shared with the functions above.
+def main(argv=None):
+    global args, frames_per_folder, starting_folder_number, base_output_dir, worker_suffix, manifest_name
+    global timing_log_name, render_cameras, multi_view, seed, base_seed, scene_spec, event_log
+    global scene, hovering_drone, camera, flying_drone, secondary_camera, scratch_dir, output_writer
+
+    # Script arguments are everything after '--' on the Blender command line
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    args = parse_args(argv)
+
+    # Set the number of frames per folder
+    frames_per_folder = args.frames_per_folder
+
+    # In multi-scene mode, and for launcher --scenes workers, every scene fills exactly one sequence folder
+    if args.num_scenes > 1 and (args.scene_spec or args.frame_start or args.frame_end):
+        raise Exception("--num-scenes cannot be combined with --scene-spec, --frame-start or --frame-end.")
+    if layout.is_scene_sharded(args.num_scenes, args.worker_id, args.frame_start, args.frame_end):
+        if (args.total_frames or frames_per_folder) > frames_per_folder:
+            raise Exception("With --num-scenes each scene must fit in one folder (--total-frames <= --frames-per-folder).")
+
+    # Starting folder number
+    starting_folder_number = args.starting_folder_number
+
+    # Define the base output directory
+    base_output_dir = bpy.path.abspath(args.output_dir)
+
+    # Workers write their own manifest, timing log and event log shards
+    worker_suffix = "" if args.worker_id is None else f".worker{args.worker_id:02d}"
+    manifest_name = f"manifest{worker_suffix}.json"
+    timing_log_name = f"render_timing{worker_suffix}.jsonl"
+
+    # Cameras rendered for every frame
+    render_cameras = [name.strip() for name in args.cameras.split(",") if name.strip()]
+    for camera_name in render_cameras:
+        if camera_name not in CAMERA_OBJECTS:
+            raise Exception(f"Unknown camera '{camera_name}'; choose from {', '.join(CAMERA_OBJECTS)}.")
+    multi_view = len(render_cameras) > 1
+
+    # The ROI is projected through the static hovering camera
+    if (args.roi or args.roi_size) and "flying_camera" in render_cameras:
+        raise Exception("--roi and --roi-size need a static camera; they cannot be used with flying_camera.")
+    if args.roi_size and not args.roi:
+        raise Exception("--roi-size centres the crop on --roi; name the ROI objects as well.")
+    if args.border and args.roi:
+        raise Exception("Use either --border or --roi, not both.")
+
+    # Incremental rendering relies on a static camera and on a single composited image
+    if args.incremental and (render_cameras != ["camera"] or args.passes):
+        raise Exception("--incremental renders the static hovering camera only and cannot write extra --passes.")
+    # The cached backgrounds are composited at full frame size
+    if args.incremental and (args.border or args.roi):
+        raise Exception("--incremental cannot be combined with --border or --roi.")
+
+    # Pick the scene seed: explicit, recovered from the manifest when resuming, or freshly drawn
+    loaded_spec = load_scene_spec(args.scene_spec) if args.scene_spec else None
+    seed = loaded_spec["seed"] if loaded_spec else args.seed
+    if seed is None and args.resume:
+        previous_manifests = read_all_manifests(view_dir(starting_folder_number, view_of(render_cameras[0])))
+        if previous_manifests:
+            seed = previous_manifests[0]["seed"]
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    print(f"Scene seed: {seed}")
+
+    # Seed of the first scene; multi-scene runs use base_seed + scene index
+    base_seed = seed
+    scene_spec = loaded_spec or make_scene_spec(seed)
+    print(f"Scene spec: {spec_hash(scene_spec)}")
+    print(f"Trajectory validation: {scene_spec['flying_drone'].get('validation')}")
+
+    # Structured JSON-lines event log (stage timings, Cycles stats, memory, output bytes, throughput/ETA)
+    event_log = EventLog(os.path.join(base_output_dir, "logs", f"events{worker_suffix}.jsonl"))
+    event_log.emit("run_start", seed=seed, pid=os.getpid(), worker_id=args.worker_id, argv=argv)
+
+    # Count render calls and collect Cycles stats for every render
+    bpy.app.handlers.render_pre.append(count_render_invocation)
+    bpy.app.handlers.render_stats.append(capture_render_stats)
+
+    load_or_build_scene(scene_spec)
+
+    # Look up the scene objects by name (they are the same whether built or loaded)
+    scene = bpy.context.scene
+    hovering_drone = bpy.data.objects['Hovering Drone']
+    camera = bpy.data.objects['Drone Camera']
+    flying_drone = bpy.data.objects['Flying Drone']
+    secondary_camera = bpy.data.objects['Flying Drone Camera']
+
+    if args.build_only:
+        print("Scene is built and cached; exiting (--build-only).")
+        bpy.ops.wm.quit_blender()
+        sys.exit(0)
+
+    configure_render_settings()
+    configure_framing()
+
+    # Check GPU usage before rendering
+    check_gpu_usage()
+
+    bpy.context.scene.render.filepath = base_output_dir
+
+    # Ensure the output directory exists
+    output_dir = base_output_dir
+    os.makedirs(output_dir, exist_ok=True)
 
-print(f"Rendering complete. Images saved in {output_dir}")
+    # Start from the first requested camera (render_and_record_frame switches between them)
+    bpy.context.scene.camera = bpy.data.objects[CAMERA_OBJECTS[render_cameras[0]]]
 
-# Exit Blender after rendering (for headless operation)
-bpy.ops.wm.quit_blender()
\ No newline at end of file
+    # Finished frames go through the output writer; in async mode Blender writes EXRs to local scratch first
+    if args.output_writer == "async":
+        scratch_dir = tempfile.mkdtemp(prefix="nlos_scratch_", dir=args.scratch_dir)
+        output_writer = OutputWriter(max_pending=args.writer_queue)
+    else:
+        scratch_dir = None
+        output_writer = SyncOutputWriter()
+
+
+    # Render every scene. Scene 0 is the one built or loaded above; each further scene only swaps
+    # the randomized collection and the flying drone's animation and gets the next sequence folder.
+    frames_rendered = 0
+    loop_seconds = 0.0
+    for scene_index in range(args.num_scenes):
+        if scene_index > 0:
+            seed = base_seed + scene_index
+            starting_folder_number = args.starting_folder_number + scene_index
+            scene_spec = make_scene_spec(seed)
+            with timed_stage("scene_reset"):
+                clear_randomized()
+                populate_randomized(scene_spec)
+            print(f"Scene {scene_index + 1}/{args.num_scenes}: seed {seed}, seq_{starting_folder_number:04d}")
+        export_scene_outputs()
+        if args.incremental:
+            setup_incremental_rendering()
+
+        # Start rendering the frames and saving the pose records
+        event_log.emit("scene_ready", scene_index=scene_index, seed=seed, scene_spec=spec_hash(scene_spec),
+                       placement=scene_spec.get("placement"), trajectory_validation=scene_spec["flying_drone"].get("validation"),
+                       stages={name: round(entry["seconds"], 4) for name, entry in stage_times.items()},
+                       datablocks=datablock_counts(), peak_rss_mb=peak_rss_mb())
+        scene_frames, scene_seconds = render_images_and_json()
+        close_pose_sinks()
+        frames_rendered += scene_frames
+        loop_seconds += scene_seconds
+
+    output_writer.close()
+    if scratch_dir:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if args.stats_json:
+        write_stats(args.stats_json, frames_rendered, loop_seconds)
+
+    event_log.emit("run_end", frames_rendered=frames_rendered, loop_seconds=round(loop_seconds, 4),
+                   frames_per_hour=round(frames_rendered / loop_seconds * 3600, 2) if loop_seconds > 0 else 0.0,
+                   peak_rss_mb=peak_rss_mb())
+    event_log.close()
+
+    print(f"Rendering complete. Images saved in {output_dir}")
+
+    # Exit Blender after rendering (for headless operation)
+    bpy.ops.wm.quit_blender()
+
+
+if __name__ == "__main__":
+    main()
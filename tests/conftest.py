@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the nlos package and the top-level scripts importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+
+from nlos.instrumentation import EventLog, StallWatchdog, ThroughputTracker, parse_render_stats, watch_event_log
+
+
+def read_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_watch_event_log_reports_one_stall_per_quiet_period(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    event_log = EventLog(path)
+    stopped = threading.Event()
+    watcher = threading.Thread(target=watch_event_log, args=(path, 0.3, 0.05, stopped))
+    watcher.start()
+    time.sleep(0.1)
+    event_log.emit("heartbeat", frame=7, folder=5)
+    time.sleep(0.8)
+    event_log.emit("frame", frame=7)
+    time.sleep(0.1)
+    stopped.set()
+    watcher.join()
+    event_log.close()
+
+    stalls = [event for event in read_events(path) if event["event"] == "stall"]
+    assert len(stalls) == 1
+    assert stalls[0]["frame"] == 7 and stalls[0]["folder"] == 5
+    assert stalls[0]["idle_seconds"] >= 0.3
+
+
+def test_watchdog_process_fires_while_the_parent_is_busy(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    event_log = EventLog(path)
+    watchdog = StallWatchdog(event_log, stall_seconds=0.5, poll_seconds=0.1)
+    time.sleep(0.5)
+    watchdog.heartbeat(frame=1)
+    # A busy loop stands in for a render that never returns to the interpreter
+    deadline = time.monotonic() + 1.5
+    while time.monotonic() < deadline:
+        pass
+    watchdog.stop()
+    event_log.close()
+    assert [event["frame"] for event in read_events(path) if event["event"] == "stall"] == [1]
+
+
+def test_throughput_tracker_eta():
+    tracker = ThroughputTracker(frames_total=10, window=2)
+    tracker.add(10.0)
+    tracker.add(2.0)
+    summary = tracker.add(4.0)
+    assert summary["frames_done"] == 3
+    assert summary["mean_frame_seconds"] == 3.0
+    assert summary["frames_per_hour"] == 1200.0
+    assert summary["eta_seconds"] == 21.0
+
+
+def test_parse_render_stats():
+    line = "Fra:1 Mem:120.00M (Peak 140.00M) | Time:00:03.12 | Mem:80.10M, Peak:95.20M | Scene | Sample 512/1024"
+    assert parse_render_stats(line) == {"cycles_mem_mb": 80.1, "cycles_peak_mem_mb": 95.2,
+                                        "samples": 512, "samples_total": 1024}
+    assert parse_render_stats("Fra:1 | Synchronizing object") == {}
+
+
+def test_zero_stall_seconds_disables_the_watchdog(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    event_log = EventLog(path)
+    watchdog = StallWatchdog(event_log, stall_seconds=0)
+    assert watchdog.process is None
+    watchdog.heartbeat(frame=1)
+    watchdog.stop()
+    event_log.close()
+    assert read_events(path) == []
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import textwrap
+
+import pytest
+
+import launcher
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stand-in for the Blender executable: takes the launcher's command line and writes the per-scene
+# files where rendering.py's export_scene_outputs() would, using the same layout rules
+FAKE_BLENDER = textwrap.dedent("""\
+    import argparse
+    import json
+    import os
+    import sys
+
+    sys.path.insert(0, {repo_dir!r})
+    from nlos import layout
+
+    parser = argparse.ArgumentParser()
+    for option in ("--seed", "--num-scenes", "--starting-folder-number", "--worker-id", "--frame-start", "--frame-end"):
+        parser.add_argument(option, type=int, default=None)
+    parser.add_argument("--output-dir")
+    parser.add_argument("--build-only", action="store_true")
+    args, _ = parser.parse_known_args(sys.argv[sys.argv.index("--") + 1:])
+    if args.build_only:
+        sys.exit(0)
+
+    for index in range(args.num_scenes or 1):
+        folder = args.starting_folder_number + index
+        if not layout.writes_scene_files(args.worker_id, args.frame_start, args.frame_end):
+            continue
+        directory = layout.scene_files_dir(args.output_dir, folder, args.num_scenes or 1, args.worker_id,
+                                           args.frame_start, args.frame_end)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "scene_spec.json"), "w") as f:
+            json.dump({{"seed": args.seed + index, "worker_id": args.worker_id}}, f)
+""")
+
+
+@pytest.fixture
+def fake_blender(tmp_path):
+    path = tmp_path / "blender"
+    path.write_text(f"#!{sys.executable}\n" + FAKE_BLENDER.format(repo_dir=REPO_DIR))
+    path.chmod(0o755)
+    return str(path)
+
+
+def run_launcher(monkeypatch, fake_blender, output_dir, *options):
+    monkeypatch.setattr(sys, "argv", ["launcher.py", "--blender", fake_blender, "--output-dir", output_dir,
+                                      "--no-pin", "--seed", "100", *options])
+    launcher.main()
+
+
+def read_spec(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_scene_workers_with_one_scene_each_keep_their_own_spec(tmp_path, monkeypatch, fake_blender):
+    output_dir = str(tmp_path / "nlos_dataset")
+    run_launcher(monkeypatch, fake_blender, output_dir, "--scenes", "2", "--workers", "2",
+                 "--total-frames", "10", "--frames-per-folder", "10")
+
+    assert not os.path.exists(os.path.join(output_dir, "scene_spec.json"))
+    assert read_spec(os.path.join(output_dir, "seq_0005", "scene_spec.json")) == {"seed": 100, "worker_id": 0}
+    assert read_spec(os.path.join(output_dir, "seq_0006", "scene_spec.json")) == {"seed": 101, "worker_id": 1}
+
+
+def test_frame_workers_write_the_shared_spec_once(tmp_path, monkeypatch, fake_blender):
+    output_dir = str(tmp_path / "nlos_dataset")
+    run_launcher(monkeypatch, fake_blender, output_dir, "--workers", "3", "--total-frames", "30")
+
+    assert read_spec(os.path.join(output_dir, "scene_spec.json")) == {"seed": 100, "worker_id": 0}
+    assert not os.path.exists(os.path.join(output_dir, "seq_0005", "scene_spec.json"))
@@ -0,0 +1,95 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from nlos.pose_sink import PoseSink
+from nlos_loader import ExrHeader, FrameDataset, memmap_lines, read_exr, rle_decode
+
+# OpenEXR only writes the reference files; the loader decodes them without it
+OpenEXR = pytest.importorskip("OpenEXR", minversion="3.3")
+
+CODECS = {"NONE": "NO_COMPRESSION", "RLE": "RLE_COMPRESSION", "ZIPS": "ZIPS_COMPRESSION", "ZIP": "ZIP_COMPRESSION"}
+
+
+def sample_image(height, width, dtype, seed=0):
+    # Smooth ramps compress well; a noisy tail leaves some chunks stored uncompressed
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([x / width, y / height, (x + y) / (width + height), np.ones_like(x, dtype=np.float64)], axis=-1)
+    image[height // 2:] += np.random.default_rng(seed).normal(size=(height - height // 2, width, 4)) * 100
+    return image.astype(dtype)
+
+
+def write_exr(path, image, codec):
+    header = {"compression": getattr(OpenEXR, CODECS[codec]), "type": OpenEXR.scanlineimage}
+    channels = {name: np.ascontiguousarray(image[:, :, index]) for index, name in enumerate("RGBA")}
+    with OpenEXR.File(header, channels) as exr:
+        exr.write(path)
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+@pytest.mark.parametrize("dtype", [np.float16, np.float32])
+def test_read_exr_matches_written_pixels(tmp_path, codec, dtype):
+    image = sample_image(37, 23, dtype)
+    path = str(tmp_path / "frame.exr")
+    write_exr(path, image, codec)
+
+    header = ExrHeader(path)
+    assert header.compression == codec
+    assert (header.width, header.height) == (23, 37)
+    np.testing.assert_array_equal(read_exr(path, dtype=None), image)
+    np.testing.assert_array_equal(read_exr(path, channels=["B", "R"], dtype=None), image[:, :, [2, 0]])
+    assert read_exr(path).dtype == np.float32
+
+
+def test_uncompressed_files_are_memory_mapped(tmp_path):
+    path = str(tmp_path / "frame.exr")
+    write_exr(path, sample_image(8, 5, np.float32), "NONE")
+    assert isinstance(memmap_lines(ExrHeader(path)).base, np.memmap)
+    write_exr(path, sample_image(8, 5, np.float32), "ZIP")
+    assert memmap_lines(ExrHeader(path)) is None
+
+
+def test_missing_channel_is_reported(tmp_path):
+    path = str(tmp_path / "frame.exr")
+    write_exr(path, sample_image(4, 4, np.float16), "ZIP")
+    with pytest.raises(Exception, match="no channels"):
+        read_exr(path, channels=["Z"])
+
+
+def test_rle_decode_runs_and_literals():
+    # A run of 4 'a' (count 3), then 3 literal bytes (count -3)
+    assert rle_decode(bytes([3]) + b"a" + bytes([256 - 3]) + b"xyz") == b"aaaaxyz"
+
+
+def test_dataset_joins_frames_with_poses(tmp_path, capsys):
+    sequence = tmp_path / "seq_0005"
+    sequence.mkdir()
+    images = {}
+    frames = {}
+    sink = PoseSink(str(sequence))
+    for timestamp in range(1, 6):
+        name = f"frame_{timestamp:04d}.exr"
+        images[timestamp] = sample_image(6, 4, np.float16, seed=timestamp)
+        write_exr(str(sequence / name), images[timestamp], "ZIP")
+        frames[str(timestamp)] = {"image_path": name, "size": os.path.getsize(sequence / name), "sha256": ""}
+        sink.append({"timestamp": timestamp, "image_path": name, "drone_2_pose": {"position": {"x": float(timestamp)}}})
+    sink.close()
+    # Frame 5 was truncated after the manifest was written
+    frames["5"]["size"] += 1
+    (sequence / "manifest.json").write_text(json.dumps({"seed": 1, "frames": frames}))
+
+    dataset = FrameDataset.from_root(str(tmp_path))
+    assert len(dataset) == 4
+    # Indexing is silent; only the command line reports it
+    assert capsys.readouterr().out == ""
+    item = dataset[2]
+    assert item["frame"] == 3
+    assert item["pose"]["drone_2_pose"]["position"]["x"] == 3.0
+    np.testing.assert_array_equal(item["image"], images[3].astype(np.float32))
+
+    batches = list(dataset.iter_batches(batch_size=3, workers=2, prefetch=1))
+    assert [list(batch["frames"]) for batch in batches] == [[1, 2, 3], [4]]
+    assert batches[0]["images"].shape == (3, 6, 4, 4)
+    np.testing.assert_array_equal(batches[1]["poses"]["drone_2_pose.position.x"], [4.0])
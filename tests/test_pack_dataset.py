@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+import os
+import tarfile
+
+import pytest
+
+from pack_dataset import pack_sequence, parse_size, verify_index
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# A small multi-camera sequence; the "EXRs" are random bytes, packing never decodes them
+def make_sequence(root, frames=6):
+    sequence = root / "seq_0005"
+    contents = {}
+    for view in ("camera", "flying_camera"):
+        (sequence / view).mkdir(parents=True)
+        manifest = {"seed": 1, "frames": {}}
+        for frame in range(1, frames + 1):
+            name = f"frame_{frame:04d}.exr"
+            data = os.urandom(700 + 97 * frame)
+            (sequence / view / name).write_bytes(data)
+            contents[f"{view}/{name}"] = data
+            manifest["frames"][str(frame)] = {"image_path": name, "size": len(data), "sha256": sha256(data)}
+        text = json.dumps(manifest).encode()
+        (sequence / view / "manifest.json").write_bytes(text)
+        contents[f"{view}/manifest.json"] = text
+    for name, data in (("poses.npz", os.urandom(300)), ("render_timing.jsonl", b'{"frame": 1}\n')):
+        (sequence / name).write_bytes(data)
+        contents[name] = data
+    # Leftovers of interrupted writes are skipped
+    (sequence / "poses.stream.jsonl").write_text("{}\n")
+    (sequence / "camera" / "frame_0007.exr.tmp").write_bytes(b"partial")
+    return sequence, contents
+
+
+def read_member(directory, index, name, use_gzip=False):
+    entry = index["members"][name]
+    path = os.path.join(directory, index["shards"][entry["shard"]]["name"])
+    with (gzip.open(path, 'rb') if use_gzip else open(path, 'rb')) as f:
+        f.seek(entry["offset"])
+        return f.read(entry["size"])
+
+
+@pytest.mark.parametrize("use_gzip", [False, True])
+def test_offsets_point_at_member_data(tmp_path, use_gzip):
+    sequence, contents = make_sequence(tmp_path)
+    output = tmp_path / "packed"
+    index_path = pack_sequence(str(sequence), str(output), shard_size=4096, gzip=use_gzip)
+    with open(index_path) as f:
+        index = json.load(f)
+
+    assert len(index["shards"]) > 2
+    assert sorted(index["members"]) == sorted(contents)
+    assert index["frames"] == 12
+    for name, data in contents.items():
+        assert read_member(str(output), index, name, use_gzip) == data
+        assert index["members"][name]["sha256"] == sha256(data)
+    assert index["members"]["flying_camera/frame_0003.exr"]["frame"] == 3
+    # EXRs come first, in frame order within each camera
+    exr_shards = [index["members"][name]["shard"] for name in sorted(contents) if name.endswith(".exr")]
+    assert exr_shards == sorted(exr_shards)
+
+    assert verify_index(index_path) == []
+
+
+def test_verify_reports_corrupted_shards(tmp_path):
+    sequence, _ = make_sequence(tmp_path)
+    output = tmp_path / "packed"
+    index_path = pack_sequence(str(sequence), str(output), shard_size=4096)
+    with open(index_path) as f:
+        index = json.load(f)
+
+    entry = index["members"]["camera/frame_0002.exr"]
+    path = output / index["shards"][entry["shard"]]["name"]
+    data = bytearray(path.read_bytes())
+    data[entry["offset"]] ^= 0xFF
+    path.write_bytes(bytes(data))
+    os.remove(output / index["shards"][-1]["name"])
+
+    problems = verify_index(index_path)
+    assert any("SHA-256 does not match the index" in problem for problem in problems)
+    assert any("camera/frame_0002.exr does not match the index" in problem for problem in problems)
+    assert any("frame 2 does not match its manifest" in problem for problem in problems)
+    assert any(problem.endswith("missing") for problem in problems)
+
+
+def test_pack_rejects_frames_that_differ_from_the_manifest(tmp_path):
+    sequence, _ = make_sequence(tmp_path)
+    (sequence / "camera" / "frame_0004.exr").write_bytes(b"overwritten")
+    with pytest.raises(Exception, match="does not match the SHA-256"):
+        pack_sequence(str(sequence), str(tmp_path / "packed"), shard_size=4096)
+
+
+def test_pack_rejects_missing_frames(tmp_path):
+    sequence, _ = make_sequence(tmp_path)
+    os.remove(sequence / "flying_camera" / "frame_0006.exr")
+    with pytest.raises(Exception, match="missing on disk"):
+        pack_sequence(str(sequence), str(tmp_path / "packed"), shard_size=4096)
+
+
+def test_shards_are_plain_tar_archives(tmp_path):
+    sequence, contents = make_sequence(tmp_path)
+    output = tmp_path / "packed"
+    with open(pack_sequence(str(sequence), str(output), shard_size=1 << 20)) as f:
+        index = json.load(f)
+    assert len(index["shards"]) == 1
+    with tarfile.open(output / index["shards"][0]["name"]) as tar:
+        assert sorted(tar.getnames()) == sorted(contents)
+
+
+def test_parse_size():
+    assert parse_size("512") == 512
+    assert parse_size("4K") == 4096
+    assert parse_size("1.5m") == 3 << 19
+    assert parse_size("2GB") == 2 << 30
@@ -0,0 +1,109 @@
+import itertools
+import math
+import random
+
+import numpy as np
+import pytest
+
+from nlos.placement import SHAPE_BOUNDS, Placer, SpatialGrid, object_aabb, object_bounds
+from nlos.poses import euler_xyz_to_matrix
+from nlos.scene_spec import generate_scene_spec
+
+
+def random_rotation(rng):
+    return [rng.uniform(0, math.pi) for _ in range(3)]
+
+
+def place_many(count, seed, margin=0.05, floor_z=0.1):
+    rng = random.Random(seed)
+    placer = Placer(((-8, 8), (-8, 8)), floor_z=floor_z, margin=margin, max_attempts=50)
+    placed = []
+    for _ in range(count):
+        shape = rng.choice(sorted(SHAPE_BOUNDS))
+        rotation = random_rotation(rng)
+        scale = rng.uniform(0.5, 1.5)
+        result = placer.place(shape, rotation, scale, rng)
+        if result is not None:
+            placed.append((shape, rotation, scale) + result)
+    return placed
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_placed_footprints_do_not_overlap(seed):
+    margin = 0.05
+    placed = place_many(80, seed, margin=margin)
+    assert len(placed) > 20
+    for (*_, a), (*_, b) in itertools.combinations(placed, 2):
+        apart_x = a[1][0] + margin <= b[0][0] or b[1][0] + margin <= a[0][0]
+        apart_y = a[1][1] + margin <= b[0][1] or b[1][1] + margin <= a[0][1]
+        assert apart_x or apart_y
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_placed_objects_rest_on_the_floor(seed):
+    for shape, rotation, scale, location, aabb in place_many(40, seed, floor_z=0.1):
+        assert -8 <= location[0] <= 8 and -8 <= location[1] <= 8
+        assert aabb[0][2] == pytest.approx(0.1, abs=1e-9)
+        assert aabb == object_aabb(shape, location, rotation, scale)
+
+
+@pytest.mark.parametrize("shape", [shape for shape, (kind, _) in SHAPE_BOUNDS.items() if kind == "points"])
+def test_hull_shapes_touch_the_floor_at_a_hull_vertex(shape):
+    points = SHAPE_BOUNDS[shape][1]
+    rng = random.Random(shape)
+    for _ in range(200):
+        rotation = random_rotation(rng)
+        scale = rng.uniform(0.5, 1.5)
+        location, aabb = Placer(((-8, 8), (-8, 8)), floor_z=0.0).place(shape, rotation, scale, rng)
+        world = points @ euler_xyz_to_matrix(np.array([rotation]))[0].T * scale + location
+        assert world[:, 2].min() == pytest.approx(0.0, abs=1e-9)
+        np.testing.assert_allclose(aabb, [world.min(axis=0), world.max(axis=0)], atol=1e-9)
+
+
+def test_hull_point_sets():
+    assert len(SHAPE_BOUNDS["CONE"][1]) == 7
+    assert len(SHAPE_BOUNDS["TWISTED_CYLINDER"][1]) == 64
+    assert len(SHAPE_BOUNDS["SUBDIVIDED_CUBE"][1]) == 98
+    assert len(SHAPE_BOUNDS["MONKEY"][1]) == 66
+    # Suzanne is mirrored in x and fits her factory bounding box
+    monkey = SHAPE_BOUNDS["MONKEY"][1]
+    np.testing.assert_allclose(monkey[:, 0].min(), -monkey[:, 0].max())
+    np.testing.assert_allclose(monkey.max(axis=0), [1.3672, 0.8516, 0.9844])
+
+
+def test_torus_bounds_are_tight():
+    major, minor = SHAPE_BOUNDS["TORUS"][1]
+    u, v = np.meshgrid(np.linspace(0, 2 * math.pi, 360), np.linspace(0, 2 * math.pi, 90))
+    ring = major + minor * np.cos(v)
+    surface = np.column_stack([(ring * np.cos(u)).ravel(), (ring * np.sin(u)).ravel(), (minor * np.sin(v)).ravel()])
+    rng = random.Random(0)
+    for _ in range(50):
+        rotation = random_rotation(rng)
+        low, high = object_bounds("TORUS", rotation, 1.0)
+        world = surface @ euler_xyz_to_matrix(np.array([rotation]))[0].T
+        assert np.all(world.min(axis=0) >= low - 1e-9) and np.all(world.max(axis=0) <= high + 1e-9)
+        np.testing.assert_allclose(world.min(axis=0), low, atol=1e-3)
+
+
+def test_spatial_grid_matches_brute_force():
+    rng = np.random.default_rng(0)
+    grid = SpatialGrid(cell_size=1.0)
+    boxes = []
+    for _ in range(200):
+        x, y = rng.uniform(-10, 10, 2)
+        w, h = rng.uniform(0.1, 2.5, 2)
+        boxes.append((x, y, x + w, y + h))
+        grid.insert(boxes[-1])
+    for _ in range(200):
+        x, y = rng.uniform(-10, 10, 2)
+        query = (x, y, x + rng.uniform(0.1, 3), y + rng.uniform(0.1, 3))
+        expected = {index for index, box in enumerate(boxes)
+                    if query[0] < box[2] and box[0] < query[2] and query[1] < box[3] and box[1] < query[3]}
+        assert grid.query(query) == expected
+
+
+def test_scene_spec_objects_rest_on_the_carpet():
+    for seed in range(10):
+        spec = generate_scene_spec(seed)
+        for obj in spec["objects"]:
+            assert obj["aabb"][0][2] == pytest.approx(spec["config"]["floor_z"], abs=1e-9)
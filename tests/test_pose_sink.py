@@ -0,0 +1,103 @@
+import json
+import os
+
+import numpy as np
+
+from nlos.pose_sink import (POSES_NAME, PoseSink, flatten_record, load_poses, merge_pose_files, pose_files,
+                            read_npz_rows, read_pose_rows, unflatten_record)
+
+
+def record(timestamp):
+    return {
+        "timestamp": timestamp,
+        "image_path": f"frame_{timestamp:04d}.exr",
+        "drone_1_pose": {
+            "position": {"x": timestamp * 0.5, "y": -1.0, "z": 3.0},
+            "matrix_world": np.eye(4) * timestamp,
+        },
+    }
+
+
+def expected_row(timestamp):
+    return flatten_record(record(timestamp))
+
+
+def test_flatten_round_trip():
+    flat = flatten_record(record(3))
+    assert flat["drone_1_pose.position.x"] == 1.5
+    assert flat["drone_1_pose.matrix_world"] == (np.eye(4) * 3).tolist()
+    restored = unflatten_record(flat)
+    assert restored["drone_1_pose"]["position"] == record(3)["drone_1_pose"]["position"]
+
+
+def test_stream_then_npz(tmp_path):
+    sink = PoseSink(str(tmp_path))
+    for timestamp in (3, 1, 2):
+        sink.append(record(timestamp))
+    stream_path = tmp_path / (POSES_NAME + ".stream.jsonl")
+    assert len(stream_path.read_text().splitlines()) == 3
+    sink.close()
+
+    assert not stream_path.exists()
+    columns = load_poses(str(tmp_path / "poses.npz"))
+    np.testing.assert_array_equal(columns["timestamp"], [1, 2, 3])
+    assert columns["drone_1_pose.matrix_world"].shape == (3, 4, 4)
+    assert read_npz_rows(str(tmp_path / "poses.npz")) == {t: expected_row(t) for t in (1, 2, 3)}
+
+
+def test_resume_recovers_an_interrupted_stream(tmp_path):
+    sink = PoseSink(str(tmp_path))
+    sink.append(record(1))
+    sink.append(record(2))
+    sink.stream_file.write('{"timestamp": 3, "drone_1')  # Killed mid-write
+    sink.stream_file.close()
+
+    resumed = PoseSink(str(tmp_path), resume=True)
+    assert sorted(resumed.rows) == [1, 2]
+    resumed.append(record(3))
+    resumed.close()
+    assert read_pose_rows(str(tmp_path)) == {t: expected_row(t) for t in (1, 2, 3)}
+
+
+def test_without_resume_earlier_files_are_discarded(tmp_path):
+    sink = PoseSink(str(tmp_path))
+    sink.append(record(1))
+    sink.close()
+    fresh = PoseSink(str(tmp_path))
+    assert fresh.rows == {}
+    assert pose_files(str(tmp_path)) == []
+
+
+def test_merge_worker_files(tmp_path):
+    directory = str(tmp_path)
+    for worker, timestamps in enumerate([(1, 2), (5, 6), (3, 4)]):
+        sink = PoseSink(directory, name=f"{POSES_NAME}.worker{worker:02d}")
+        for timestamp in timestamps:
+            sink.append(record(timestamp))
+        # Worker 2 was interrupted and only left its stream file
+        if worker == 2:
+            sink.stream_file.close()
+        else:
+            sink.close()
+    # Poses merged by an earlier run are kept
+    previous = PoseSink(directory, name=POSES_NAME)
+    previous.append(record(0))
+    previous.close()
+
+    merge_pose_files(directory)
+    assert os.listdir(directory) == ["poses.npz"]
+    rows = read_npz_rows(os.path.join(directory, "poses.npz"))
+    assert rows == {t: expected_row(t) for t in range(7)}
+    np.testing.assert_array_equal(load_poses(os.path.join(directory, "poses.npz"))["timestamp"], np.arange(7))
+
+    # Merging an already merged directory leaves it alone
+    merge_pose_files(directory)
+    assert os.listdir(directory) == ["poses.npz"]
+
+
+def test_stream_lines_are_json(tmp_path):
+    sink = PoseSink(str(tmp_path), streaming=True)
+    sink.append(record(7))
+    line = (tmp_path / (POSES_NAME + ".stream.jsonl")).read_text().strip()
+    assert json.loads(line) == expected_row(7)
+    sink.close()
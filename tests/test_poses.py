@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+import pytest
+
+from nlos.poses import (compose_matrices, euler_xyz_to_matrix, matrix_to_euler_xyz, matrix_to_quaternion,
+                        normalized_rotation, pose_arrays, pose_record, world_matrices)
+
+
+def quaternion_to_matrix(q):
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=1)
+
+
+def random_euler(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(-math.pi, math.pi, count),
+                            rng.uniform(-math.pi / 2 + 1e-3, math.pi / 2 - 1e-3, count),
+                            rng.uniform(-math.pi, math.pi, count)])
+
+
+def test_matrix_matches_axis_rotations():
+    euler = random_euler(20)
+    for angles, matrix in zip(euler, euler_xyz_to_matrix(euler)):
+        x, y, z = angles
+        rx = np.array([[1, 0, 0], [0, math.cos(x), -math.sin(x)], [0, math.sin(x), math.cos(x)]])
+        ry = np.array([[math.cos(y), 0, math.sin(y)], [0, 1, 0], [-math.sin(y), 0, math.cos(y)]])
+        rz = np.array([[math.cos(z), -math.sin(z), 0], [math.sin(z), math.cos(z), 0], [0, 0, 1]])
+        np.testing.assert_allclose(matrix, rz @ ry @ rx, atol=1e-12)
+
+
+def test_euler_round_trip():
+    euler = random_euler(1000)
+    np.testing.assert_allclose(matrix_to_euler_xyz(euler_xyz_to_matrix(euler)), euler, atol=1e-9)
+
+
+@pytest.mark.parametrize("pitch", [math.pi / 2, -math.pi / 2])
+def test_gimbal_lock_reproduces_the_rotation(pitch):
+    rng = np.random.default_rng(1)
+    euler = np.column_stack([rng.uniform(-math.pi, math.pi, 50), np.full(50, pitch), rng.uniform(-math.pi, math.pi, 50)])
+    matrix = euler_xyz_to_matrix(euler)
+    recovered = matrix_to_euler_xyz(matrix)
+    np.testing.assert_allclose(recovered[:, 1], pitch, atol=1e-6)
+    np.testing.assert_allclose(recovered[:, 2], 0.0)
+    np.testing.assert_allclose(euler_xyz_to_matrix(recovered), matrix, atol=1e-9)
+
+
+def test_quaternion_round_trip():
+    matrix = euler_xyz_to_matrix(random_euler(1000, seed=2))
+    quaternion = matrix_to_quaternion(matrix)
+    np.testing.assert_allclose(np.linalg.norm(quaternion, axis=1), 1.0)
+    assert np.all(quaternion[:, 0] >= 0)
+    np.testing.assert_allclose(quaternion_to_matrix(quaternion), matrix, atol=1e-9)
+
+
+def test_quaternion_near_half_turns():
+    # Trace close to -1: w is tiny and another component has to be picked as the pivot
+    euler = np.array([[math.pi, 0, 0], [0, math.pi - 1e-7, 0], [0, 0, math.pi], [math.pi, 0, math.pi / 2],
+                      [math.pi / 2, math.pi / 2, 0], [0, -math.pi / 2, math.pi / 2]])
+    matrix = euler_xyz_to_matrix(euler)
+    np.testing.assert_allclose(quaternion_to_matrix(matrix_to_quaternion(matrix)), matrix, atol=1e-9)
+
+
+def test_compose_and_normalize_scale():
+    euler = random_euler(10, seed=3)
+    location = np.arange(30, dtype=np.float64).reshape(10, 3)
+    scale = np.tile([2.0, 0.5, 3.0], (10, 1))
+    matrix = compose_matrices(location, euler, scale)
+    np.testing.assert_allclose(matrix[:, :3, 3], location)
+    np.testing.assert_allclose(matrix[:, 3], np.tile([0, 0, 0, 1.0], (10, 1)))
+    np.testing.assert_allclose(normalized_rotation(matrix), euler_xyz_to_matrix(euler), atol=1e-12)
+
+
+def test_world_matrices_chain_parent_inverse():
+    frames = 4
+    parent = compose_matrices(np.tile([1.0, 2.0, 3.0], (frames, 1)), random_euler(frames, seed=4), np.ones((frames, 3)))
+    child = compose_matrices(np.tile([0.0, 0.0, 1.0], (frames, 1)), random_euler(frames, seed=5), np.ones((frames, 3)))
+    parent_inverse = np.linalg.inv(parent[0])
+    world = world_matrices([(parent, np.eye(4)), (child, parent_inverse)])
+    np.testing.assert_allclose(world, parent @ parent_inverse @ child)
+    assert world_matrices([(parent, np.eye(4))]) is parent
+
+
+def test_pose_record_layout():
+    euler = random_euler(3, seed=6)
+    pose = pose_arrays(compose_matrices(np.ones((3, 3)), euler, np.ones((3, 3))))
+    record = pose_record(pose, 1)
+    assert record["position"] == {"x": 1.0, "y": 1.0, "z": 1.0}
+    assert list(record["orientation"]) == ["roll", "pitch", "yaw"]
+    np.testing.assert_allclose([record["orientation"][key] for key in ("roll", "pitch", "yaw")], euler[1])
+    assert list(record["quaternion"]) == ["w", "x", "y", "z"]
+    assert np.array(record["matrix_world"]).shape == (4, 4)
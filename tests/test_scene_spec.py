@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from nlos.scene_spec import SCENE_SPEC_VERSION, generate_scene_spec, load_scene_spec, save_scene_spec, spec_hash
+
+
+def test_spec_round_trip(tmp_path):
+    spec = generate_scene_spec(1234)
+    path = str(tmp_path / "scene.json")
+    save_scene_spec(path, spec)
+    assert load_scene_spec(path) == spec
+    assert spec_hash(generate_scene_spec(1234)) == spec_hash(spec)
+
+
+def test_specs_of_another_version_are_rejected(tmp_path):
+    spec = generate_scene_spec(1)
+    spec["version"] = SCENE_SPEC_VERSION - 1
+    for obj in spec["objects"]:
+        del obj["aabb"]
+    path = tmp_path / "old.json"
+    path.write_text(json.dumps(spec))
+    with pytest.raises(Exception, match="expected"):
+        load_scene_spec(str(path))
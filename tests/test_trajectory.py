@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+import pytest
+
+from nlos.trajectory import (GRID_MIN_OBSTACLES, SegmentChecker, compute_trajectory, generate_valid_waypoints,
+                             segment_box_hits)
+
+ROOM = ((-10, 10), (-10, 10), (0, 49))
+START = (0.0, 0.0, 6.0)
+
+
+def random_boxes(count, seed):
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack([rng.uniform(-8, 8, count), rng.uniform(-8, 8, count), rng.uniform(0, 5, count)])
+    half = rng.uniform(0.2, 1.0, (count, 3))
+    return np.stack([centers - half, centers + half], axis=1).tolist()
+
+
+def make_checker(obstacles, max_speed=30.0, max_acceleration=60.0):
+    return SegmentChecker(obstacles, ROOM, clearance=0.3, max_speed=max_speed, max_acceleration=max_acceleration,
+                          segment_seconds=20 / 24)
+
+
+def hits(start, end, low=(0, 0, 0), high=(1, 1, 1)):
+    return bool(segment_box_hits(np.array([start], dtype=np.float64), np.array([end], dtype=np.float64),
+                                 np.array([low], dtype=np.float64), np.array([high], dtype=np.float64))[0, 0])
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ((-1, 0.5, 0.5), (2, 0.5, 0.5), True),       # straight through
+    ((-2, 0.5, 0.5), (-1, 0.5, 0.5), False),     # stops short of the box
+    ((2, 0.5, 0.5), (3, 0.5, 0.5), False),       # points away from the box
+    ((-1, 0.5, 0.5), (0, 0.5, 0.5), True),       # ends exactly on a face
+    ((0.5, 0.5, 0.5), (0.6, 0.5, 0.5), True),    # starts inside
+    ((0.5, 0.5, 0.5), (0.5, 0.5, 0.5), True),    # zero length, inside
+    ((2, 2, 2), (2, 2, 2), False),               # zero length, outside
+    ((-1, 1, 0.5), (2, 1, 0.5), True),           # slides along a face (parallel, on the plane)
+    ((-1, 1.01, 0.5), (2, 1.01, 0.5), False),    # parallel, just outside the plane
+    ((-1, 2, 0.5), (2, -1, 0.5), True),          # crosses an edge diagonally
+    ((-1, 0, 0.5), (1, 2, 0.5), True),           # touches the corner edge at x=0, y=1
+    ((-1, 0.1, 0.5), (1, 2.1, 0.5), False),      # misses the corner
+    ((-1, -1, -1), (2, 2, 2), True),             # space diagonal
+])
+def test_slab_edge_cases(start, end, expected):
+    assert hits(start, end) == expected
+
+
+def test_grid_lookup_matches_direct_test():
+    obstacles = random_boxes(GRID_MIN_OBSTACLES * 2, seed=0)
+    gridded = make_checker(obstacles)
+    assert gridded.grid is not None
+    rng = np.random.default_rng(1)
+    for _ in range(500):
+        start, end = rng.uniform(-9, 9, 3), rng.uniform(-9, 9, 3)
+        # Axis-aligned segments exercise the zero-width footprints
+        if rng.random() < 0.3:
+            end[:2] = start[:2]
+        direct = bool(segment_box_hits(start[None], end[None], gridded.box_min, gridded.box_max).any())
+        assert gridded.hits_obstacle(start, end) == direct
+
+
+@pytest.mark.parametrize("count", [10, GRID_MIN_OBSTACLES + 10])
+def test_generated_waypoints_pass_check_path(count):
+    checker = make_checker(random_boxes(count, seed=count))
+    for seed in range(20):
+        waypoints, stats = generate_valid_waypoints(START, 30, checker, rng=random.Random(seed))
+        assert stats["start_clear"]
+        assert checker.check_path(START, waypoints) == [None] * 30
+
+
+def test_check_path_agrees_with_sequential_checks():
+    checker = make_checker(random_boxes(30, seed=7), max_speed=15.0, max_acceleration=30.0)
+    rng = np.random.default_rng(8)
+    reasons = set()
+    for _ in range(50):
+        waypoints = np.column_stack([rng.uniform(-12, 12, 10), rng.uniform(-12, 12, 10), rng.uniform(0, 8, 10)])
+        previous, previous_velocity = np.array(START), None
+        expected = []
+        for point in waypoints:
+            expected.append(checker.check(previous, point, previous_velocity))
+            previous_velocity = (point - previous) / checker.segment_seconds
+            previous = point
+        assert checker.check_path(START, waypoints) == expected
+        reasons.update(expected)
+    assert reasons == {None, "room", "speed", "acceleration", "collision"}
+
+
+def test_held_segments_are_exempt_from_limits():
+    checker = make_checker([], max_speed=1.0, max_acceleration=1.0)
+    waypoints = [START, START, START]
+    assert checker.check_path(START, waypoints) == [None, None, None]
+
+
+def test_compute_trajectory_shapes_and_endpoints():
+    waypoints = np.array([[1.0, 0.0, 4.0], [1.0, 2.0, 4.0]])
+    trajectory = compute_trajectory(START, 1, 40, segment_frames=20, waypoints=waypoints)
+    assert trajectory["location"].shape == (40, 3)
+    np.testing.assert_array_equal(trajectory["frames"], np.arange(1, 41))
+    np.testing.assert_allclose(trajectory["location"][0], START)
+    np.testing.assert_allclose(trajectory["location"][20], waypoints[0])
+    np.testing.assert_allclose(trajectory["rotation_euler"][:, 0], np.pi / 2)
+    np.testing.assert_allclose(trajectory["rotation_euler"][20:, 2], np.pi / 2)